@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmarks.bench_de_json
+~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule times Update.de_json, Message.de_json and UpdateInfo.de_json on batches of realistic updates built
+from the tests/schema fixtures, From dicts and from JSON strings, and measures the memory each batch allocates.
+    python benchmarks/bench_de_json.py --output de_json.json
+    python benchmarks/bench_de_json.py --compare --relative --threshold 1.0
+    python benchmarks/bench_de_json.py --save-baseline
+Timings depend on the machine, --relative compares each case as a multiple of json.loads on the same batch instead,
+So the committed baseline gates CI on any runner.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import argparse
+import copy
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from report import compare_results, load_results, write_results
+from ttbotapi.objects import Message, Update, UpdateInfo
+
+
+SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests', 'schema')
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'de_json.json')
+KEYS = ('target', 'input', 'batch')
+REFERENCE = 'json.loads'
+
+
+def read_schema(name):
+    with open(os.path.join(SCHEMA, f'{name}.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_updates(count):
+    """
+    Returns count updates mixing the update types a bot usually receives,
+    Mostly new messages with links and attachments, then callbacks, edits and membership changes
+    :param int count: number of updates
+    :rtype: list[dict]
+    """
+    message, user = read_schema('Message'), read_schema('User')
+    updates = []
+    for i in range(count):
+        kind = i % 10
+        if kind < 6:
+            body = copy.deepcopy(message)
+            body['recipient']['chat_id'] = i
+            body['body']['mid'] = f'mid.{i}'
+            body['body']['seq'] = i
+            body['body']['text'] = f'message {i}'
+            updates.append({'update_type': 'message_created', 'timestamp': i, 'message': body,
+                            'user_locale': 'en'})
+        elif kind < 8:
+            updates.append({'update_type': 'message_callback', 'timestamp': i, 'message': copy.deepcopy(message),
+                            'callback': {'timestamp': i, 'callback_id': f'cb.{i}', 'payload': 'yes', 'user': user},
+                            'user_locale': 'en'})
+        elif kind == 8:
+            updates.append({'update_type': 'message_edited', 'timestamp': i, 'message': copy.deepcopy(message)})
+        else:
+            updates.append({'update_type': 'user_added', 'timestamp': i, 'chat_id': i, 'user': user,
+                            'inviter_id': 1, 'is_channel': False})
+    return updates
+
+
+def build_cases(batch):
+    """
+    Returns the benchmarked cases of a batch size
+    :param int batch: number of updates per batch
+    :return: list of (target, input, function parsing the whole batch)
+    :rtype: list[tuple]
+    """
+    updates = build_updates(batch)
+    messages = [x['message'] for x in updates if 'message' in x]
+    update_strings = [json.dumps(x) for x in updates]
+    message_strings = [json.dumps(x) for x in messages]
+    info = {'updates': updates, 'marker': 1}
+    info_string = json.dumps(info)
+    return [
+        (REFERENCE, 'str', lambda: [json.loads(x) for x in update_strings]),
+        ('Update', 'dict', lambda: [Update.de_json(x) for x in updates]),
+        ('Update', 'str', lambda: [Update.de_json(x) for x in update_strings]),
+        ('Message', 'dict', lambda: [Message.de_json(x) for x in messages]),
+        ('Message', 'str', lambda: [Message.de_json(x) for x in message_strings]),
+        ('UpdateInfo', 'dict', lambda: UpdateInfo.de_json(info)),
+        ('UpdateInfo', 'str', lambda: UpdateInfo.de_json(info_string)),
+        ('UpdateInfo.lazy', 'dict', lambda: UpdateInfo.de_json(info, lazy=True)),
+        ('UpdateInfo.lazy', 'str', lambda: UpdateInfo.de_json(info_string, lazy=True))
+    ]
+
+
+def measure_time(function, repeat, min_time):
+    """
+    Returns the per call timings of function, Each sample loops over enough calls to last at least min_time
+    :rtype: list[float]
+    """
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    samples = [elapsed / loops]
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat - 1):
+            started = time.perf_counter()
+            for _ in range(loops):
+                function()
+            samples.append((time.perf_counter() - started) / loops)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return samples
+
+
+def measure_memory(function):
+    """
+    Returns the peak bytes allocated while function runs, the bytes and the blocks still held by its result
+    :rtype: tuple
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        start = tracemalloc.get_traced_memory()[0]
+        result = function()
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(x.count_diff for x in after.compare_to(before, 'filename') if x.count_diff > 0)
+    del result
+    return peak - start, current - start, blocks
+
+
+def run(batches, repeat, min_time):
+    """
+    Returns the measured cases, relative is min_ms as a multiple of the REFERENCE case of the same batch,
+    Which parses the same updates with json.loads and so cancels out the speed of the machine
+    :rtype: list[dict]
+    """
+    results = []
+    for batch in batches:
+        reference = None
+        for target, iinput, function in build_cases(batch):
+            samples = measure_time(function, repeat, min_time)
+            peak, retained, blocks = measure_memory(function)
+            if target == REFERENCE:
+                reference = min(samples)
+            results.append({
+                'target': target,
+                'input': iinput,
+                'batch': batch,
+                'min_ms': round(min(samples) * 1000, 4),
+                'median_ms': round(statistics.median(samples) * 1000, 4),
+                'relative': round(min(samples) / reference, 3),
+                'per_update_us': round(min(samples) / batch * 1e6, 3),
+                'peak_bytes': peak,
+                'retained_bytes': retained,
+                'retained_blocks': blocks
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='de_json parsing microbenchmarks')
+    parser.add_argument('--batches', type=int, nargs='+', default=[100, 1000], help='updates per batch')
+    parser.add_argument('--repeat', type=int, default=7, help='timing samples per case')
+    parser.add_argument('--min-time', type=float, default=0.05, help='minimum seconds of one timing sample')
+    parser.add_argument('--output', default=None, help='JSON results file, - for the standard output')
+    parser.add_argument('--save-baseline', nargs='?', const=BASELINE, default=None,
+                        help=f'also write the results as the new baseline, {BASELINE} by default')
+    parser.add_argument('--compare', nargs='?', const=BASELINE, default=None,
+                        help='fail when a case regressed against this baseline file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed relative increase of min_ms, 0.2 fails a case that got 20%% slower')
+    parser.add_argument('--relative', action='store_true',
+                        help='compare the time relative to json.loads instead of min_ms, For a baseline saved on '
+                             'another machine')
+    parser.add_argument('--memory-threshold', type=float, default=None,
+                        help='also compare peak_bytes and retained_bytes with this allowed relative increase')
+    args = parser.parse_args(argv)
+    if args.compare and not os.path.exists(args.compare):
+        parser.error(f'no baseline at {args.compare}, Write one on this machine with --save-baseline first')
+
+    results = run(args.batches, args.repeat, args.min_time)
+    for x in results:
+        print(f"{x['target']:<16} {x['input']:<5} batch={x['batch']:<5} {x['min_ms']:>10.3f}ms "
+              f"x{x['relative']:<7.2f} {x['per_update_us']:>8.2f}us/update  peak={x['peak_bytes'] / 1024:>9.1f}KiB  "
+              f"retained={x['retained_bytes'] / 1024:>9.1f}KiB", file=sys.stderr)
+    if args.output:
+        write_results(args.output, 'de_json', results)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        write_results(args.save_baseline, 'de_json', results)
+    if args.compare:
+        thresholds = {'relative' if args.relative else 'min_ms': args.threshold}
+        if args.memory_threshold is not None:
+            thresholds.update(peak_bytes=args.memory_threshold, retained_bytes=args.memory_threshold)
+        regressions = compare_results(results, load_results(args.compare)['results'], KEYS, thresholds)
+        for case, metric, old, new, change in regressions:
+            print(f"REGRESSION {case} {metric}: {old} -> {new} (+{change:.1%})", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
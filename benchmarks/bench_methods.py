@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmarks.bench_methods
+~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule times the per call overhead of building a request, Through the Api bound once per bot, through
+the module functions of ttbotapi.methods and through the hand written functions they replaced (the baseline path),
+Against a transport that answers without any I/O.
+    python benchmarks/bench_methods.py --output methods.json
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import argparse
+import statistics
+import sys
+
+from bench_de_json import measure_time
+from report import write_results
+from ttbotapi import methods
+from ttbotapi.utils import make_request
+
+
+class NullTransport(object):
+    """
+    This class represents a transport answering every request with an empty result, So only the request building
+    is timed
+    """
+    base_url = 'http://127.0.0.1'
+
+    def request(self, http_method, api_method, api_url, params, files, json_body, proxies, timeout):
+        return {}
+
+
+# The hand written functions of ttbotapi.methods before the endpoints were declared, With the transport argument
+def baseline_get_bot_info(access_token, proxies, transport):
+    based_url = 'https://botapi.tamtam.chat'
+    http_method = 'GET'
+    api_method = r'me'
+    api_url = f'{based_url}/{api_method}?access_token={access_token}'
+    params = None
+    files = None
+    json_body = None
+    return make_request(http_method, api_method, api_url, params, files, json_body, proxies, transport)
+
+
+def baseline_get_chat(access_token, chat_id, proxies, transport):
+    based_url = 'https://botapi.tamtam.chat'
+    http_method = 'GET'
+    api_method = r'chats'
+    api_url = f'{based_url}/{api_method}/{chat_id}?access_token={access_token}'
+    params = None
+    files = None
+    json_body = None
+    return make_request(http_method, api_method, api_url, params, files, json_body, proxies, transport)
+
+
+def baseline_get_update(access_token, limit, timeout, marker, types, proxies, transport):
+    based_url = 'https://botapi.tamtam.chat'
+    http_method = 'GET'
+    api_method = r'updates'
+    api_url = f'{based_url}/{api_method}?access_token={access_token}'
+    params = {}
+    if limit:
+        params['limit'] = limit
+    if timeout:
+        params['timeout'] = timeout
+    if marker:
+        params['marker'] = marker
+    if types:
+        params['types'] = types
+    files = None
+    json_body = None
+    return make_request(http_method, api_method, api_url, params, files, json_body, proxies, transport)
+
+
+def baseline_send_message(access_token, user_id, chat_id, disable_link_preview, text, attachments, link, notify,
+                          formatter, proxies, transport):
+    based_url = 'https://botapi.tamtam.chat'
+    http_method = 'POST'
+    api_method = r'messages'
+    api_url = f'{based_url}/{api_method}?access_token={access_token}'
+    params = {}
+    if user_id:
+        params['user_id'] = user_id
+    if chat_id:
+        params['chat_id'] = chat_id
+    if disable_link_preview:
+        params['disable_link_preview'] = disable_link_preview
+    files = None
+    json_body = {}
+    if text:
+        json_body['text'] = text
+    if attachments:
+        json_body['attachments'] = attachments
+    if link:
+        json_body['link'] = link
+    if notify:
+        json_body['notify'] = notify
+    if formatter:
+        json_body['format'] = formatter
+    return make_request(http_method, api_method, api_url, params, files, json_body, proxies, transport)
+
+
+def build_cases(access_token):
+    """
+    Returns the benchmarked cases
+    :return: list of (method, path, function sending one request)
+    :rtype: list[tuple]
+    """
+    transport = NullTransport()
+    api = methods.Api(access_token, None, transport)
+    return [
+        ('get_bot_info', 'baseline', lambda: baseline_get_bot_info(access_token, None, transport)),
+        ('get_bot_info', 'api', lambda: api.get_bot_info()),
+        ('get_bot_info', 'function', lambda: methods.get_bot_info(access_token, None, transport)),
+        ('get_chat', 'baseline', lambda: baseline_get_chat(access_token, 1, None, transport)),
+        ('get_chat', 'api', lambda: api.get_chat(chat_id=1)),
+        ('get_chat', 'function', lambda: methods.get_chat(access_token, 1, None, transport)),
+        ('get_update', 'baseline', lambda: baseline_get_update(access_token, 100, 30, 7, None, None, transport)),
+        ('get_update', 'api', lambda: api.get_update(limit=100, timeout=30, marker=7, types=None)),
+        ('get_update', 'function', lambda: methods.get_update(access_token, 100, 30, 7, None, None, transport)),
+        ('send_message', 'baseline', lambda: baseline_send_message(access_token, None, 1, None, 'hello', None,
+                                                                   None, True, None, None, transport)),
+        ('send_message', 'api', lambda: api.send_message(chat_id=1, text='hello', notify=True)),
+        ('send_message', 'function', lambda: methods.send_message(access_token, None, 1, None, 'hello', None, None,
+                                                                  True, None, None, transport))
+    ]
+
+
+def run(repeat, min_time):
+    results = []
+    for method, path, function in build_cases('token'):
+        samples = measure_time(function, repeat, min_time)
+        results.append({
+            'method': method,
+            'path': path,
+            'min_ns': round(min(samples) * 1e9, 1),
+            'median_ns': round(statistics.median(samples) * 1e9, 1)
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='per call request building overhead')
+    parser.add_argument('--repeat', type=int, default=7, help='timing samples per case')
+    parser.add_argument('--min-time', type=float, default=0.05, help='minimum seconds of one timing sample')
+    parser.add_argument('--output', default=None, help='JSON results file, - for the standard output')
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.min_time)
+    for x in results:
+        print(f"{x['method']:<14} {x['path']:<9} {x['min_ns']:>9.1f}ns  median={x['median_ns']:>9.1f}ns",
+              file=sys.stderr)
+    if args.output:
+        write_results(args.output, 'methods', results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
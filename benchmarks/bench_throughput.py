@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmarks.bench_throughput
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule measures the end to end throughput of Bot.polling against a local stub of the TamTam Bot API,
+Every synthetic update goes through get_updates, the handler filters and a send_message reply.
+    python benchmarks/bench_throughput.py --updates 5000 --handlers 1 10 50 --output throughput.json
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import threading
+import time
+
+from report import percentile, write_results
+from ttbotapi import Bot
+from ttbotapi.utils import Transport
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests'))
+from stub_server import SyntheticServer  # noqa: E402
+
+
+FILTERS = ('none', 'chat_type', 'bot_command', 'regexp', 'func')
+
+
+def register_handlers(bot, count, ffilter):
+    """
+    Registers count handlers of which only the last matches the synthetic updates,
+    So every update is checked against all the filters of the chain
+    :param Bot bot: benchmarked bot
+    :param int count: number of handlers
+    :param str ffilter: filter type of the handlers, one of FILTERS
+    """
+    def reply(update):
+        bot.send_message(text=update.message.body.mid, chat_id=update.message.recipient.chat_id, user_id=None)
+
+    for i in range(count):
+        last = i == count - 1
+        if ffilter == 'chat_type':
+            filters = {'chat_type': 'dialog' if last else 'channel'}
+        elif ffilter == 'bot_command':
+            filters = {'bot_command': '/bench' if last else f'/command{i}'}
+        elif ffilter == 'regexp':
+            filters = {'regexp': '^/bench' if last else f'^/pattern{i}'}
+        elif ffilter == 'func':
+            filters = {'func': (lambda update: True) if last else (lambda update: False)}
+        else:
+            filters = {}
+        bot.update_handler(**filters)(reply)
+
+
+def run_case(updates, handlers, ffilter, limit, workers, pipelined, timeout):
+    """
+    Polls updates synthetic updates through a new bot and stub server
+    :return: the measured case
+    :rtype: dict
+    """
+    server = SyntheticServer(updates).start()
+    bot = Bot('token', transport=Transport(base_url=server.base_url, pool_maxsize=max(workers, 1) + 2),
+              workers=workers)
+    register_handlers(bot, handlers, ffilter)
+    poller = threading.Thread(target=bot.polling, kwargs={'limit': limit, 'timeout': 1, 'pipelined': pipelined},
+                              daemon=True)
+    started = time.perf_counter()
+    poller.start()
+    completed = server.done.wait(timeout)
+    elapsed = time.perf_counter() - started
+    bot.stop_polling()
+    poller.join()
+    server.stop()
+    latencies = server.latencies
+    return {
+        'handlers': handlers,
+        'filter': ffilter,
+        'limit': limit,
+        'workers': workers,
+        'pipelined': pipelined,
+        'updates': len(latencies),
+        'completed': completed,
+        'seconds': round(elapsed, 4),
+        'updates_per_second': round(len(latencies) / elapsed, 2),
+        'latency_p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'latency_p99_ms': round(percentile(latencies, 99) * 1000, 3)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='End to end polling throughput against a local stub server')
+    parser.add_argument('--updates', type=int, default=2000, help='updates per case')
+    parser.add_argument('--handlers', type=int, nargs='+', default=[1, 10, 50], help='handler counts')
+    parser.add_argument('--filters', nargs='+', default=list(FILTERS), choices=FILTERS, help='handler filter types')
+    parser.add_argument('--limits', type=int, nargs='+', default=[10, 100], help='get_updates batch limits')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 8], help='handler worker counts')
+    parser.add_argument('--pipelined', action='store_true', help='poll with pipelined=True')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds before a case is abandoned')
+    parser.add_argument('--output', default='-', help='JSON results file, - for the standard output')
+    args = parser.parse_args(argv)
+
+    results = []
+    for handlers, ffilter, limit, workers in itertools.product(args.handlers, args.filters, args.limits,
+                                                               args.workers):
+        result = run_case(args.updates, handlers, ffilter, limit, workers, args.pipelined, args.timeout)
+        results.append(result)
+        print(f"handlers={handlers:<4} filter={ffilter:<12} limit={limit:<4} workers={workers:<3} "
+              f"{result['updates_per_second']:>10.1f} updates/s  p50={result['latency_p50_ms']:.2f}ms  "
+              f"p99={result['latency_p99_ms']:.2f}ms", file=sys.stderr)
+    write_results(args.output, 'throughput', results)
+    return 0 if all(x['completed'] for x in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
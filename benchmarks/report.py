@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmarks.report
+~~~~~~~~~~~~~~~~~
+This submodule provides the helpers the benchmarks use to summarize and write their results.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import json
+import platform
+import sys
+import time
+
+
+def percentile(values, q):
+    """
+    Returns the q-th percentile of values using the nearest rank
+    :param list[float] values: samples
+    :param float q: percentile between 0 and 100
+    :rtype: float
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(q / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def environment():
+    """
+    Returns the description of the machine and interpreter the benchmark ran on
+    :rtype: dict
+    """
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    }
+
+
+def write_results(path, benchmark, results):
+    """
+    Writes the results as JSON to path, or to the standard output when path is None or '-'
+    :param str or None path: output file
+    :param str benchmark: name of the benchmark
+    :param list[dict] results: one dict per measured case
+    """
+    data = json.dumps({'benchmark': benchmark, 'environment': environment(), 'results': results}, indent=2)
+    if path is None or path == '-':
+        sys.stdout.write(data + '\n')
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data + '\n')
+
+
+def load_results(path):
+    """
+    Reads results written by write_results
+    :param str path: results file
+    :rtype: dict
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(results, baseline, keys, thresholds):
+    """
+    Compares results with the cases of a baseline that have the same keys,
+    A metric regresses when it is higher than its baseline value by more than its threshold
+    :param list[dict] results: measured cases
+    :param list[dict] baseline: baseline cases
+    :param tuple keys: fields identifying a case
+    :param dict thresholds: maximum relative increase of each compared metric, 0.2 allows 20% more
+    :return: list of (case, metric, baseline value, value, relative change), Cases missing from the baseline are skipped
+    :rtype: list[tuple]
+    """
+    cases = {tuple(x[k] for k in keys): x for x in baseline}
+    regressions = []
+    for result in results:
+        case = tuple(result[k] for k in keys)
+        if case not in cases:
+            continue
+        for metric, threshold in thresholds.items():
+            old, new = cases[case][metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            if change > threshold:
+                regressions.append((dict(zip(keys, case)), metric, old, new, change))
+    return regressions
@@ -25,5 +25,6 @@ setup(
                    'Programming Language :: Python :: 3.8',
                    'Programming Language :: Python :: 3.9'],
     license='GNU GPLv2',
-    install_requires=['requests']
+    install_requires=['requests'],
+    extras_require={'async': ['aiohttp']}
 )
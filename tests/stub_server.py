@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.stub_server
+~~~~~~~~~~~~~~~~~
+This submodule provides the local stub of the TamTam Bot API used by the tests and the benchmarks.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import json
+import queue
+import socket
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+
+USER = {"user_id": 1, "name": "stub", "username": "stub_bot", "is_bot": True, "last_activity_time": 0}
+CHAT = {"chat_id": 1, "type": "chat", "status": "active", "title": "stub", "last_event_time": 0,
+        "participants_count": 2, "is_public": False}
+
+
+def new_message_update(chat_id, text, mid='mid', chat_type='dialog', timestamp=0):
+    return {
+        "update_type": "message_created",
+        "timestamp": timestamp,
+        "message": {
+            "sender": USER,
+            "recipient": {"chat_id": chat_id, "chat_type": chat_type, "user_id": chat_id},
+            "timestamp": timestamp,
+            "body": {"mid": mid, "seq": timestamp, "text": text}
+        }
+    }
+
+
+class StubServer(object):
+    """
+    A threaded HTTP server answering /me, /messages, /chats and /updates,
+    Update batches are served from a queue filled with push_updates, every request is recorded in requests
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.updates = queue.Queue()
+        self.marker = 0
+        self.status = 200
+        self.max_wait = 1
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args):
+                pass
+
+            def respond(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = stub.read_body(url.path, self.rfile, length) if length else b''
+                stub.record(self.command, url.path, parse_qs(url.query), body)
+                status, result, *headers = stub.route(self.command, url.path, parse_qs(url.query), body)
+                data = json.dumps(result).encode()
+                self.send_response(status)
+                for key, value in (headers[0] if headers else {}).items():
+                    self.send_header(key, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = respond
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.server.request_queue_size = 128
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def read_body(self, path, rfile, length):
+        return rfile.read(length)
+
+    def record(self, http_method, path, query, body):
+        self.requests.append((http_method, path, query, body))
+
+    def push_updates(self, updates):
+        self.updates.put(updates)
+
+    def route(self, http_method, path, query, body):
+        if self.status != 200:
+            return self.status, {"code": "error", "message": "stub error"}
+        if path == '/me':
+            return 200, USER
+        if path == '/messages' and http_method == 'POST':
+            message = json.loads(body)
+            return 200, {"message": {"recipient": {"chat_id": int(query.get('chat_id', [0])[0]),
+                                                   "chat_type": "dialog", "user_id": 0},
+                                     "body": {"mid": "mid", "seq": 0, "text": message.get('text')}}}
+        if path == '/updates':
+            timeout = float(query.get('timeout', [30])[0])
+            try:
+                updates = self.updates.get(timeout=min(timeout, self.max_wait))
+            except queue.Empty:
+                updates = []
+            self.marker += 1
+            return 200, {"updates": updates, "marker": self.marker}
+        return 200, {"success": True, "message": None}
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SyntheticServer(StubServer):
+    """
+    A stub server serving synthetic update streams to the benchmarks, Requests are not recorded,
+    /updates serves batches of up to limit synthetic updates until total updates were served, Then empty batches.
+    A message sent with the mid of an update as text is its reply, The time from serving an update to receiving
+    its reply is recorded as its latency, done is set once every update has been answered
+    """
+
+    def __init__(self, total, chats=100, text='/bench', chat_type='dialog'):
+        """
+        :param int total: Number of updates to serve
+        :param int chats: Number of distinct chats the updates are spread over
+        :param str text: text of every message
+        :param str chat_type: chat type of every message
+        """
+        super().__init__()
+        self.total = total
+        self.chats = chats
+        self.text = text
+        self.chat_type = chat_type
+        self.served = 0
+        self.served_at = [0.0] * total
+        self.latencies = []
+        self.done = threading.Event()
+        self.__lock = threading.Lock()
+
+    def record(self, http_method, path, query, body):
+        pass
+
+    def next_batch(self, limit):
+        """
+        Returns the next batch of synthetic updates and records when each one was served
+        :param int limit: Maximum number of updates
+        :rtype: list[dict]
+        """
+        with self.__lock:
+            start = self.served
+            end = min(start + limit, self.total)
+            self.served = end
+            self.marker += 1
+            marker = self.marker
+        now = time.perf_counter()
+        for seq in range(start, end):
+            self.served_at[seq] = now
+        return [new_message_update(x % self.chats + 1, self.text, f'mid.{x}', self.chat_type, x)
+                for x in range(start, end)], marker
+
+    def reply(self, text):
+        """
+        Records the latency of the update answered by a sent message
+        :param str text: text of the sent message, the mid of the update
+        """
+        seq = int(text.rpartition('.')[2])
+        latency = time.perf_counter() - self.served_at[seq]
+        with self.__lock:
+            self.latencies.append(latency)
+            if len(self.latencies) == self.total:
+                self.done.set()
+
+    def route(self, http_method, path, query, body):
+        if path == '/me':
+            return 200, USER
+        if path == '/updates':
+            limit = int(query.get('limit', [100])[0])
+            updates, marker = self.next_batch(limit)
+            if not updates:
+                time.sleep(min(float(query.get('timeout', [30])[0]), 0.05))
+            return 200, {"updates": updates, "marker": marker}
+        if path == '/messages' and http_method == 'POST':
+            text = json.loads(body).get('text')
+            self.reply(text)
+            return 200, {"message": {"recipient": {"chat_id": int(query.get('chat_id', [0])[0]),
+                                                   "chat_type": self.chat_type, "user_id": 0},
+                                     "body": {"mid": "reply", "seq": 0, "text": text}}}
+        if path == '/chats':
+            return 200, {"chats": [CHAT], "marker": None}
+        if path.startswith('/chats/'):
+            return 200, CHAT
+        if path == '/uploads':
+            return 200, {"url": f"{self.base_url}/upload", "token": "token"}
+        return 200, {"success": True, "message": None}
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_async_bot
+~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for AsyncBot against a local stub server.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import asyncio
+import functools
+import os
+import tempfile
+import unittest
+
+from stub_server import StubServer, new_message_update
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from ttbotapi import AsyncBot, objects, utils
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class TestAsyncBot(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.stub = StubServer().start()
+        self.bot = AsyncBot(access_token='token', transport=utils.AsyncTransport(base_url=self.stub.base_url))
+
+    async def asyncTearDown(self):
+        await self.bot.close()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    async def test_get_bot_info(self):
+        user = await self.bot.get_bot_info()
+        self.assertEqual(user.username, "stub_bot")
+
+    async def test_concurrent_send_message(self):
+        await asyncio.gather(*(self.bot.send_message(text=f'{x}', chat_id=x, user_id=None) for x in range(1, 51)))
+        sent = [r for r in self.stub.requests if r[0] == 'POST' and r[1] == '/messages']
+        self.assertEqual(len(sent), 50)
+        self.assertEqual(sent[0][2]['access_token'], ['token'])
+
+    async def test_broadcast(self):
+        broadcast = self.bot.broadcast('news', range(1, 51), to='user', concurrency=10)
+        results = [x async for x in broadcast]
+        self.assertEqual(sorted(x.recipient for x in results), list(range(1, 51)))
+        self.assertEqual((broadcast.sent, broadcast.checkpoint), (50, 50))
+        sent = [r for r in self.stub.requests if r[0] == 'POST' and r[1] == '/messages']
+        self.assertEqual(sorted(int(r[2]['user_id'][0]) for r in sent), list(range(1, 51)))
+
+    async def test_polling(self):
+        received = []
+
+        @self.bot.update_handler(regexp='^hi')
+        async def hi(update):
+            received.append(update.message.body.text)
+            await self.bot.send_message(text='hello', chat_id=update.message.recipient.chat_id, user_id=None)
+            self.bot.stop_polling()
+
+        @self.bot.update_handler()
+        def other(update):
+            received.append('other')
+
+        self.stub.push_updates([new_message_update(1, 'bye'), new_message_update(1, 'hi there')])
+        await asyncio.wait_for(self.bot.polling(timeout=1), 10)
+        self.assertEqual(received, ['other', 'hi there'])
+
+    async def test_record_and_replay(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'updates.jsonl')
+            with utils.UpdateRecorder(path) as recorder:
+                bot = AsyncBot('token', transport=utils.AsyncTransport(base_url=self.stub.base_url), recorder=recorder)
+                bot.update_handler()(lambda update: bot.stop_polling())
+                self.stub.push_updates([new_message_update(1, 'hi'), new_message_update(2, 'there')])
+                await asyncio.wait_for(bot.polling(timeout=1), 10)
+                await bot.close()
+
+            received = []
+
+            @self.bot.update_handler()
+            async def handler(update):
+                received.append(update.message.body.text)
+
+            self.assertEqual(await self.bot.replay(path, speed=None), 2)
+        self.assertEqual(received, ['hi', 'there'])
+
+    async def test_checkpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = utils.FileCheckpointStore(os.path.join(directory, 'marker'), interval=60)
+            bot = AsyncBot('token', transport=utils.AsyncTransport(base_url=self.stub.base_url), checkpoint=store)
+
+            @bot.update_handler()
+            async def handler(update):
+                await asyncio.sleep(0.1)
+                bot.stop_polling()
+
+            self.stub.push_updates([new_message_update(1, 'hi')])
+            await asyncio.wait_for(bot.polling(timeout=1), 10)
+            await bot.close()
+            self.assertEqual((store.load(), store.writes), (self.stub.marker, 1))
+
+    async def test_process_new_updates(self):
+        def fail(prefix, update):
+            raise ValueError(prefix + update.message.body.text)
+
+        self.bot.update_handler()(functools.partial(fail, 'bad '))
+        with self.assertLogs(utils.logger, 'ERROR') as logs:
+            await self.bot.process_new_updates([objects.Update.de_json(new_message_update(1, 'hi'))])
+            await asyncio.sleep(0.1)
+        self.assertIn("ValueError('bad hi')", logs.output[0])
+
+    async def test_api_exception(self):
+        self.stub.status = 500
+        with self.assertRaises(utils.ApiException):
+            await self.bot.get_bot_info()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_broadcast
+~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for Bot.broadcast.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import json
+import unittest
+
+from stub_server import StubServer
+from ttbotapi import Bot
+from ttbotapi.broadcast import BroadcastProgress, BroadcastResult
+from ttbotapi.utils import ApiException, Transport
+
+
+class FailingStubServer(StubServer):
+    def route(self, http_method, path, query, body):
+        if path == '/messages' and int(query.get('chat_id', [0])[0]) % 10 == 3:
+            return 403, {"code": "chat.denied", "message": "stub error"}
+        return super().route(http_method, path, query, body)
+
+
+class TestBroadcast(unittest.TestCase):
+    def setUp(self):
+        self.server = FailingStubServer().start()
+        self.bot = Bot('token', transport=Transport(pool_maxsize=8, base_url=self.server.base_url))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_every_recipient_gets_one_result(self):
+        results = list(self.bot.broadcast('news', range(1, 101), concurrency=8))
+        self.assertEqual(sorted(x.recipient for x in results), list(range(1, 101)))
+        failed = [x for x in results if x.error]
+        self.assertEqual([x.recipient for x in sorted(failed)], [x for x in range(1, 101) if x % 10 == 3])
+        self.assertTrue(all(isinstance(x.error, ApiException) for x in failed))
+        self.assertEqual({json.loads(x[3])['text'] for x in self.server.requests}, {'news'})
+
+    def test_resume_from_checkpoint(self):
+        broadcast = self.bot.broadcast('news', range(1, 101), concurrency=4)
+        for i, _ in enumerate(broadcast):
+            if i == 40:
+                break
+        self.assertGreaterEqual(broadcast.checkpoint, 41 - 4)
+        checkpoint = broadcast.checkpoint
+        self.server.requests.clear()
+
+        resumed = self.bot.broadcast('news', range(1, 101), concurrency=4, start=checkpoint)
+        results = list(resumed)
+        self.assertEqual(sorted(x.index for x in results), list(range(checkpoint, 100)))
+        self.assertEqual(resumed.checkpoint, 100)
+        self.assertEqual(resumed.sent + resumed.failed, 100 - checkpoint)
+
+    def test_invalid_recipient_type(self):
+        with self.assertRaises(ValueError):
+            self.bot.broadcast('news', [1], to='channel')
+
+
+class TestBroadcastProgress(unittest.TestCase):
+    def test_checkpoint_waits_for_leading_recipients(self):
+        progress = BroadcastProgress(start=10)
+        for index in (12, 11, 14):
+            progress.complete(BroadcastResult(index, index, None, None))
+        self.assertEqual(progress.checkpoint, 10)
+        progress.complete(BroadcastResult(10, 10, None, ValueError()))
+        self.assertEqual(progress.checkpoint, 13)
+        self.assertEqual((progress.sent, progress.failed), (3, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_cache
+~~~~~~~~~~~~~~~~
+This submodule provides tests for the lookup cache of Bot.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import time
+import unittest
+
+from stub_server import StubServer, USER
+from ttbotapi import Bot
+from ttbotapi.objects import Update
+from ttbotapi.utils import TTLCache, Transport
+
+
+CHAT = {"chat_id": 7, "type": "chat", "status": "active", "title": "chat", "last_event_time": 0,
+        "participants_count": 2, "is_public": False}
+
+
+class ChatStubServer(StubServer):
+    def route(self, http_method, path, query, body):
+        if path == '/chats/7' and http_method == 'GET':
+            return 200, CHAT
+        if path == '/chats/7/members/me':
+            return 200, USER
+        if path == '/chats/7/members/admins':
+            return 200, {"members": [USER]}
+        return super().route(http_method, path, query, body)
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_ttl_and_lru(self):
+        cache = TTLCache(maxsize=2, ttl=0.1)
+        cache.set(('a',), 1)
+        cache.set(('b',), 2)
+        self.assertEqual(cache.get(('a',)), 1)
+        cache.set(('c',), 3)
+        self.assertIsNone(cache.get(('b',)))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get(('a',)))
+        self.assertEqual(cache.stats(), {'size': 1, 'hits': 1, 'misses': 2, 'evictions': 1, 'invalidations': 0})
+
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        cache = TTLCache()
+
+        def load():
+            cache.invalidate(('chat', 1))
+            return 'stale'
+
+        self.assertEqual(cache.get_or_load(('chat', 1), load), 'stale')
+        self.assertIsNone(cache.get(('chat', 1)))
+
+
+class TestBotCache(unittest.TestCase):
+    def setUp(self):
+        self.server = ChatStubServer().start()
+        self.cache = TTLCache(ttl=60)
+        self.bot = Bot('token', transport=Transport(base_url=self.server.base_url), cache=self.cache)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def count(self, path):
+        return len([x for x in self.server.requests if x[1] == path])
+
+    def test_lookups_are_cached(self):
+        for _ in range(5):
+            self.assertEqual(self.bot.get_chat(7).title, 'chat')
+            self.assertEqual(self.bot.get_chat_membership(7).user_id, 1)
+            self.assertEqual(self.bot.get_chat_admins(7).members[0].user_id, 1)
+            self.assertEqual(self.bot.get_bot_info().username, 'stub_bot')
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(self.cache.stats()['hits'], 16)
+
+    def test_updates_invalidate_entries(self):
+        self.bot.get_chat(7)
+        self.bot.get_chat_membership(7)
+        self.bot.get_chat_admins(7)
+
+        self.bot.process_new_updates([Update.de_json({"update_type": "chat_title_changed", "timestamp": 0,
+                                                      "chat_id": 7, "title": "new"})])
+        self.bot.get_chat(7)
+        self.bot.get_chat_membership(7)
+        self.assertEqual((self.count('/chats/7'), self.count('/chats/7/members/me')), (2, 1))
+
+        self.bot.process_new_updates([Update.de_json({"update_type": "user_removed", "timestamp": 0,
+                                                      "chat_id": 7, "user": USER, "admin_id": 2})])
+        self.bot.get_chat_membership(7)
+        self.bot.get_chat_admins(7)
+        self.assertEqual((self.count('/chats/7/members/me'), self.count('/chats/7/members/admins')), (2, 2))
+
+        self.bot.process_new_updates([Update.de_json({"update_type": "user_added", "timestamp": 0,
+                                                      "chat_id": 8, "user": USER, "inviter_id": 2})])
+        self.bot.get_chat_admins(7)
+        self.assertEqual(self.count('/chats/7/members/admins'), 2)
+
+    def test_without_cache(self):
+        bot = Bot('token', transport=Transport(base_url=self.server.base_url))
+        bot.get_chat(7)
+        bot.get_chat(7)
+        self.assertEqual(self.count('/chats/7'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
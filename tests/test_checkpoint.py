@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_checkpoint
+~~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for the durable polling marker.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from stub_server import StubServer, new_message_update
+from ttbotapi import Bot
+from ttbotapi.utils import FileCheckpointStore, SqliteCheckpointStore, Transport
+
+
+class TestCheckpointStores(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_file_store_batches_writes(self):
+        path = os.path.join(self.directory.name, 'marker')
+        store = FileCheckpointStore(path, interval=60, every=3)
+        self.assertIsNone(store.load())
+        store.commit(1)
+        store.commit(2)
+        self.assertEqual((store.load(), store.writes), (None, 0))
+        store.commit(3)
+        store.commit(4)
+        self.assertEqual((store.load(), store.writes), (3, 1))
+        store.close()
+        self.assertEqual(FileCheckpointStore(path).load(), 4)
+
+    def test_sqlite_store_keys(self):
+        path = os.path.join(self.directory.name, 'markers.sqlite')
+        first, second = SqliteCheckpointStore(path, 'first', interval=0), SqliteCheckpointStore(path, 'second')
+        first.commit(10)
+        second.commit(20)
+        second.close()
+        first.close()
+        stores = [SqliteCheckpointStore(path, x) for x in ('first', 'second', 'third')]
+        self.assertEqual([x.load() for x in stores], [10, 20, None])
+        for store in stores:
+            store.close()
+
+
+class TestBotCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'marker')
+
+    def tearDown(self):
+        self.server.stop()
+        self.directory.cleanup()
+
+    def test_marker_waits_for_handlers(self):
+        store = FileCheckpointStore(self.path, interval=0)
+        bot = Bot('token', transport=Transport(base_url=self.server.base_url), workers=2, checkpoint=store)
+        release, handled = threading.Event(), []
+
+        @bot.update_handler()
+        def handler(update):
+            if update.message.body.text == 'slow':
+                release.wait(10)
+            handled.append(update.message.body.text)
+
+        self.server.push_updates([new_message_update(1, 'slow')])
+        self.server.push_updates([new_message_update(2, 'fast')])
+        poller = threading.Thread(target=bot.polling, kwargs={'timeout': 1})
+        poller.start()
+        deadline = time.monotonic() + 10
+        while 'fast' not in handled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(handled, ['fast'])
+        self.assertIsNone(store.load())
+
+        release.set()
+        bot.stop_polling()
+        poller.join(10)
+        self.assertEqual(store.load(), self.server.marker)
+
+        marker = self.server.marker
+        bot = Bot('token', transport=Transport(base_url=self.server.base_url),
+                  checkpoint=FileCheckpointStore(self.path))
+        bot.poll_once(timeout=0)
+        self.assertEqual(self.server.requests[-1][2]['marker'], [str(marker + 1)])
+
+    def test_marker_is_written_without_further_batches(self):
+        store = FileCheckpointStore(self.path, interval=0.2)
+        bot = Bot('token', transport=Transport(base_url=self.server.base_url), workers=2, checkpoint=store)
+        bot.update_handler()(lambda update: time.sleep(0.3))
+
+        self.server.max_wait = 10
+        self.server.push_updates([new_message_update(1, 'slow')])
+        poller = threading.Thread(target=bot.polling, kwargs={'timeout': 10})
+        poller.start()
+        try:
+            deadline = time.monotonic() + 5
+            while store.load() is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(store.load(), 1)
+            self.assertEqual(self.server.marker, 1)
+        finally:
+            bot.stop_polling()
+            self.server.push_updates([])
+            poller.join(10)
+
+
+if __name__ == '__main__':
+    unittest.main()
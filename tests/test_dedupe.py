@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_dedupe
+~~~~~~~~~~~~~~~~~
+This submodule provides tests for the duplicate update filter.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import time
+import unittest
+
+from stub_server import USER, new_message_update
+from ttbotapi import Bot
+from ttbotapi.objects import LazyUpdate, Update
+from ttbotapi.utils import DedupeFilter, update_identity
+
+
+CALLBACK = {"update_type": "message_callback", "timestamp": 5, "user_locale": "en",
+            "callback": {"timestamp": 5, "callback_id": "cb.1", "payload": "yes", "user": USER}}
+USER_ADDED = {"update_type": "user_added", "timestamp": 7, "chat_id": 3, "user": USER, "inviter_id": 2}
+
+
+class TestDedupeFilter(unittest.TestCase):
+    def test_update_identity(self):
+        for update_class in (Update, LazyUpdate):
+            self.assertEqual(update_identity(update_class.de_json(new_message_update(1, 'hi', mid='mid.1'))),
+                             ('message_created', 'mid.1'))
+            self.assertEqual(update_identity(update_class.de_json(CALLBACK)), ('message_callback', 'cb.1'))
+            self.assertEqual(update_identity(update_class.de_json(USER_ADDED)), ('user_added', 7, 3, 1, None))
+
+    def test_window_and_maxsize(self):
+        dedupe = DedupeFilter(maxsize=2, window=0.1, key=lambda x: x)
+        self.assertEqual([dedupe.is_duplicate(x) for x in ('a', 'b', 'a', 'c', 'a', 'c')],
+                         [False, False, True, False, False, True])
+        self.assertEqual(len(dedupe), 2)
+        time.sleep(0.1)
+        self.assertFalse(dedupe.is_duplicate('c'))
+        self.assertEqual(dedupe.stats(), {'size': 1, 'passed': 5, 'dropped': 2})
+
+    def test_bot_drops_duplicates(self):
+        dedupe = DedupeFilter()
+        bot = Bot('token', dedupe=dedupe)
+        handled = []
+        bot.update_handler(['message_created', 'message_callback'])(lambda update: handled.append(update.update_type))
+
+        updates = [new_message_update(1, 'hi', mid='mid.1'), CALLBACK, new_message_update(1, 'hi', mid='mid.2')]
+        bot.process_new_updates([Update.de_json(x) for x in updates])
+        bot.process_new_updates([Update.de_json(x) for x in updates[:2]])
+        self.assertEqual(handled, ['message_created', 'message_callback', 'message_created'])
+        self.assertEqual(dedupe.dropped, 2)
+
+    def test_every_edit_passes(self):
+        dedupe = DedupeFilter()
+        bot = Bot('token', dedupe=dedupe)
+        handled = []
+        bot.update_handler('message_edited')(lambda update: handled.append(update.message.body.text))
+
+        edits = [dict(new_message_update(1, text, mid='mid.1', timestamp=timestamp), update_type='message_edited')
+                 for text, timestamp in (('first', 100), ('second', 200))]
+        bot.process_new_updates([Update.de_json(x) for x in edits])
+        bot.process_new_updates([Update.de_json(x) for x in edits])
+        self.assertEqual(handled, ['first', 'second'])
+        self.assertEqual(dedupe.dropped, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_dispatcher
+~~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for Bot update dispatching against a local stub server.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import random
+import socket
+import threading
+import time
+import unittest
+
+import requests
+
+from stub_server import StubServer, new_message_update
+from ttbotapi import Bot, objects, utils
+
+
+class TestDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubServer().start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def new_bot(self, **kwargs):
+        return Bot(access_token='token', transport=utils.Transport(base_url=self.stub.base_url), **kwargs)
+
+    def test_worker_pool_keeps_chat_order(self):
+        bot = self.new_bot(workers=4, queue_size=10)
+        received = {}
+        running = []
+        lock = threading.Lock()
+        updates = [new_message_update(chat_id, f'{seq}') for seq in range(20) for chat_id in range(1, 9)]
+
+        @bot.update_handler()
+        def handler(update):
+            with lock:
+                running.append(1)
+                concurrency = len(running)
+            time.sleep(random.random() / 100)
+            with lock:
+                received.setdefault(update.message.recipient.chat_id, []).append(int(update.message.body.text))
+                running.pop()
+                if sum(len(x) for x in received.values()) == len(updates):
+                    bot.stop_polling()
+            self.concurrency = max(getattr(self, 'concurrency', 0), concurrency)
+
+        self.stub.push_updates(updates)
+        bot.polling(timeout=1)
+        self.assertEqual(sorted(received), list(range(1, 9)))
+        for chat_id, seqs in received.items():
+            self.assertEqual(seqs, list(range(20)))
+        self.assertGreater(self.concurrency, 1)
+
+    def test_handler_for_many_update_types(self):
+        bot = self.new_bot()
+        received = []
+
+        @bot.update_handler(update_type=['message_created', 'message_edited', 'chat_title_changed'])
+        def handler(update):
+            received.append(update.update_type)
+
+        with self.assertRaises(ValueError):
+            bot.update_handler(update_type='message_create')(handler)
+
+        updates = [new_message_update(1, 'x'), dict(new_message_update(1, 'y'), update_type='message_edited'),
+                   {'update_type': 'chat_title_changed', 'timestamp': 0, 'chat_id': 1, 'title': 't'},
+                   {'update_type': 'bot_started', 'timestamp': 0, 'chat_id': 1}]
+        bot.process_new_updates([objects.Update.de_json(x) for x in updates])
+        self.assertEqual(received, ['message_created', 'message_edited', 'chat_title_changed'])
+
+    def test_handler_exceptions_are_logged(self):
+        for kwargs in ({}, {'workers': 2}):
+            bot = self.new_bot(**kwargs)
+            received = []
+
+            @bot.update_handler()
+            def handler(update):
+                received.append(update.message.body.text)
+                if update.message.body.text == 'fail':
+                    raise RuntimeError('handler failed')
+                bot.stop_polling()
+
+            self.stub.push_updates([new_message_update(1, 'fail'), new_message_update(1, 'next')])
+            with self.assertLogs(utils.logger, 'ERROR') as logs:
+                bot.polling(timeout=1)
+            self.assertEqual(received, ['fail', 'next'])
+            self.assertIn('handler failed', logs.output[0])
+
+    def test_pipelined_polling(self):
+        bot = self.new_bot()
+        received = []
+
+        @bot.update_handler()
+        def handler(update):
+            received.append(update.message.body.text)
+            if len(received) == 30:
+                bot.stop_polling()
+
+        for batch in range(10):
+            self.stub.push_updates([new_message_update(1, f'{batch}-{x}') for x in range(3)])
+        bot.polling(timeout=1, pipelined=True)
+        self.assertEqual(received, [f'{batch}-{x}' for batch in range(10) for x in range(3)])
+        markers = [int(r[2]['marker'][0]) for r in self.stub.requests if r[1] == '/updates']
+        self.assertEqual(markers, list(range(1, len(markers) + 1)))
+
+    def test_webhook(self):
+        bot = self.new_bot()
+        received = []
+        done = threading.Event()
+
+        @bot.update_handler()
+        def handler(update):
+            received.append(update.message.body.text)
+            if len(received) == 5:
+                done.set()
+
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        thread = threading.Thread(target=bot.webhook, kwargs={'host': '127.0.0.1', 'port': port, 'secret': 's3cr3t'})
+        thread.start()
+        url = f'http://127.0.0.1:{port}'
+        session = requests.Session()
+        for _ in range(100):
+            try:
+                self.assertEqual(session.post(f'{url}/wrong', json=new_message_update(1, 'x')).status_code, 404)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.05)
+        for x in range(5):
+            self.assertEqual(session.post(f'{url}/s3cr3t', json=new_message_update(1, f'{x}')).status_code, 200)
+        self.assertTrue(done.wait(5))
+        bot.stop_webhook()
+        thread.join()
+        self.assertEqual(received, [f'{x}' for x in range(5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
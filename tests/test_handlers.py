@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_handlers
+~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for the update handlers registry.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import random
+import re
+import unittest
+
+from stub_server import new_message_update
+from ttbotapi.handlers import HandlerRegistry, CombinedRegexp
+from ttbotapi.objects import Update
+
+
+class TestHandlerRegistry(unittest.TestCase):
+    def test_regexp_is_compiled_once(self):
+        registry = HandlerRegistry()
+        update_handler = registry.add('message_created', print, regexp='^hi')
+        self.assertIsInstance(update_handler['filters']['regexp'], re.Pattern)
+        self.assertIs(registry.find_handler(Update.de_json(new_message_update(1, 'Hi there'))), update_handler)
+        self.assertIsNone(registry.find_handler(Update.de_json(new_message_update(1, 'oh hi'))))
+
+    def test_combined_regexp_finds_first_matching_handler(self):
+        random.seed(0)
+        words = [f'word{x}' for x in range(200)]
+        patterns = [(rf'\b{x}\b', ['dialog'] if i % 3 else ['chat']) for i, x in enumerate(words)]
+        patterns.insert(50, (r'(to)day', None))
+        registry = HandlerRegistry()
+        for pattern, chat_type in patterns:
+            registry.add('message_created', pattern, regexp=pattern, chat_type=chat_type)
+
+        for _ in range(500):
+            text = ' '.join(random.sample(words + ['today', 'none'] * 50, 3))
+            expected = None
+            for pattern, chat_type in patterns:
+                if (chat_type is None or 'dialog' in chat_type) and re.search(pattern, text, re.IGNORECASE):
+                    expected = pattern
+                    break
+            update_handler = registry.find_handler(Update.de_json(new_message_update(1, text)))
+            self.assertEqual(update_handler and update_handler['function'], expected, text)
+
+    def test_combinable(self):
+        self.assertTrue(CombinedRegexp.is_combinable(re.compile('hi', re.IGNORECASE)))
+        self.assertFalse(CombinedRegexp.is_combinable(re.compile('(hi)', re.IGNORECASE)))
+        self.assertFalse(CombinedRegexp.is_combinable(re.compile('hi')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_methods
+~~~~~~~~~~~~~~~~~~
+This submodule provides tests for the endpoint table of ttbotapi.methods.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import unittest
+
+from stub_server import StubServer
+from ttbotapi import Bot, methods
+from ttbotapi.utils import Transport
+
+
+class RecordingTransport(object):
+    base_url = 'http://stub'
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, http_method, api_method, api_url, params, files, json_body, proxies, timeout):
+        self.requests.append((http_method, api_method, api_url, params, files, json_body, timeout))
+        return {}
+
+
+class TestEndpoint(unittest.TestCase):
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            methods.Endpoint('get', 'GOT', 'me')
+        with self.assertRaises(ValueError):
+            methods.Endpoint('get', 'GET', '/me')
+        with self.assertRaises(ValueError):
+            methods.Endpoint('get', 'GET', 'chats/{chat_id}', query=('chat_id',))
+        with self.assertRaises(ValueError):
+            methods.Endpoint('get', 'GET', 'messages', query=('from',))
+        with self.assertRaises(ValueError):
+            methods.Endpoint('get', 'GET', 'messages', query=('ffrom',), aliases={'to': 'to'})
+
+    def test_request_template(self):
+        transport = RecordingTransport()
+        api = methods.Api('token', None, transport)
+        api.get_update(limit=100, timeout=30, marker=0)
+        api.pin_message(chat_id=7, message_id='mid', notify=False)
+        api.get_messages(chat_id=7, ffrom=1, to=2)
+        api.send_message(chat_id=7, json_body=b'{"text":"hi"}')
+        self.assertEqual(transport.requests, [
+            ('GET', 'updates', 'http://stub/updates?access_token=token', {'limit': 100, 'timeout': 30}, None, None,
+             40),
+            ('PUT', 'chats', 'http://stub/chats/7/pin?access_token=token', None, None,
+             {'message_id': 'mid', 'notify': False}, 14.99),
+            ('GET', 'messages', 'http://stub/messages?access_token=token', {'chat_id': 7, 'from': 1, 'to': 2}, None,
+             None, 14.99),
+            ('POST', 'messages', 'http://stub/messages?access_token=token', {'chat_id': 7}, None, b'{"text":"hi"}',
+             14.99)
+        ])
+        with self.assertRaises(TypeError):
+            api.get_chat(chat_id=7, title='chat')
+        with self.assertRaises(TypeError):
+            api.get_chat()
+        with self.assertRaises(TypeError):
+            api.get_bot_info(chat_id=7)
+        with self.assertRaises(TypeError):
+            api.edit_chat_info(title='chat')
+        with self.assertRaises(TypeError):
+            api.send_message(chat_id=7, txt='hi')
+        with self.assertRaises(ValueError):
+            api.call('get_everything')
+
+    def test_functions_match_api(self):
+        function_transport, api_transport = RecordingTransport(), RecordingTransport()
+        methods.edit_chat_info('token', 7, None, 'title', None, True, None, function_transport)
+        methods.construct_message('token', 's', None, None, 'hint', None, None, None, None, function_transport)
+        methods.get_upload_url('token', None, 'image', None, function_transport)
+        api = methods.Api('token', None, api_transport)
+        api.call('edit_chat_info', chat_id=7, title='title', notify=True)
+        api.construct_message(session_id='s', hint='hint')
+        api.get_upload_url(ttype='image')
+        self.assertEqual(function_transport.requests, api_transport.requests)
+        self.assertEqual(api_transport.requests[1][3], {'session_id': 's'})
+        self.assertEqual(api_transport.requests[2][3], {'type': 'image'})
+
+    def test_message_body_matches_endpoint(self):
+        transport = RecordingTransport()
+        methods.Api('token', None, transport).send_message(chat_id=7, text='hi', notify=True, formatter='html')
+        self.assertEqual(methods.build_message_body('hi', None, None, True, 'html'), transport.requests[0][5])
+        self.assertEqual(transport.requests[0][5], {'text': 'hi', 'notify': True, 'format': 'html'})
+
+
+class TestApiStub(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.transport = Transport(base_url=self.server.base_url)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.stop()
+
+    def test_every_transport(self):
+        api = methods.Api('token', None, self.transport)
+        self.assertEqual(api.get_bot_info()['username'], 'stub_bot')
+        api.send_message(chat_id=5, text='hi')
+        method, path, query, body = self.server.requests[-1]
+        self.assertEqual((method, path, query), ('POST', '/messages', {'access_token': ['token'], 'chat_id': ['5']}))
+
+    def test_zero_timeout_is_sent(self):
+        bot = Bot('token', transport=self.transport)
+        bot.poll_once(timeout=0)
+        methods.Api('token', None, self.transport).get_update(limit=10, timeout=0)
+        for method, path, query, body in self.server.requests:
+            self.assertEqual((path, query['timeout']), ('/updates', ['0']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,8 +8,11 @@ This submodule provides tests for a TamTam Available objects.
 :license: GPLv2, see LICENSE for more details.
 """
 
+import tracemalloc
 import unittest
+from unittest.mock import Mock, patch
 from ttbotapi.objects import *
+from ttbotapi.utils import set_json_backend, json_loads, json_dumps_bytes
 
 
 class TestUser(unittest.TestCase):
@@ -39,5 +42,95 @@ class TestChat(unittest.TestCase):
         self.assertEqual(chat.chat_id, 0)
 
 
+class TestLazyUpdate(unittest.TestCase):
+    with open("schema/Message.json") as f:
+        data = f'{{"update_type": "message_created", "timestamp": 0, "message": {f.read()}}}'
+
+    def test_lazy_update(self):
+        update = Update.de_json(self.data)
+        lazy = LazyUpdate.de_json(self.data)
+        self.assertIsInstance(lazy, Update)
+        self.assertEqual(lazy.update_type, update.update_type)
+        self.assertEqual(lazy.message.sender.name, update.message.sender.name)
+        self.assertEqual(lazy.message.recipient.chat_type, update.message.recipient.chat_type)
+        self.assertEqual(lazy.message.body.text, update.message.body.text)
+        self.assertEqual(lazy.message.body.markup[0].length, update.message.body.markup[0].length)
+        self.assertIsNone(lazy.user)
+        with self.assertRaises(AttributeError):
+            lazy.unknown
+
+    def test_lazy_update_parses_on_access(self):
+        de_json = Mock(wraps=User.de_json)
+        with patch.dict(LazyMessage.lazy_fields, {'sender': ('sender', de_json)}):
+            lazy = LazyUpdate.de_json(self.data)
+            self.assertEqual(lazy.update_type, 'message_created')
+            self.assertEqual(lazy.message.body.text, 'string')
+            de_json.assert_not_called()
+            lazy.message.sender
+            lazy.message.sender
+            de_json.assert_called_once()
+
+
+class TestSlots(unittest.TestCase):
+    with open("schema/Message.json") as f:
+        data = f'{{"update_type": "message_created", "timestamp": 0, "message": {f.read()}}}'
+
+    @staticmethod
+    def dict_backed(cls):
+        namespace = {k: v for k, v in vars(cls).items() if k not in cls.__slots__ and k != '__slots__'}
+        return type(cls.__name__, (object,), namespace)
+
+    @staticmethod
+    def traced_memory(create, count=1000):
+        tracemalloc.start()
+        objects = [create() for _ in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objects
+        return size
+
+    def test_no_instance_dict(self):
+        update = Update.de_json(self.data)
+        for obj in (update, update.message, update.message.sender, update.message.recipient, update.message.body,
+                    update.message.body.attachments[0], update.message.body.markup[0], LazyUpdate.de_json(self.data)):
+            self.assertFalse(hasattr(obj, '__dict__'), type(obj).__name__)
+
+    def test_memory(self):
+        args = ('message_created', 0) + (None,) * 16
+        dict_update = self.dict_backed(Update)
+        slots_size = self.traced_memory(lambda: Update(*args))
+        dict_size = self.traced_memory(lambda: dict_update(*args))
+        self.assertLess(slots_size, dict_size * 0.9)
+
+
+class TestJsonBackend(unittest.TestCase):
+    def tearDown(self):
+        set_json_backend()
+
+    def test_backends(self):
+        for backend in ('json', None):
+            set_json_backend(backend)
+            self.assertEqual(User.check_type(b'{"user_id": 1}'), {"user_id": 1})
+            self.assertEqual(json_loads(BotCommand('start', 'é').to_json()), {"name": "start", "description": "é"})
+            self.assertEqual(json_loads(json_dumps_bytes({"n": 2 ** 70})), {"n": 2 ** 70})
+        with self.assertRaises(ValueError):
+            set_json_backend('pickle')
+
+    def test_output_is_the_same_on_every_backend(self):
+        value = {"text": "é/ü", "items": [1, 2.5, None, True], "nested": {"n": 2 ** 40}}
+        command = BotCommand('start', 'é/ü')
+        outputs = []
+        for backend in ('orjson', 'ujson', 'json'):
+            try:
+                set_json_backend(backend)
+            except ImportError:
+                continue
+            outputs.append((json_dumps_bytes(value), command.to_json(), repr(command)))
+        self.assertEqual(outputs[-1], ('{"text":"é/ü","items":[1,2.5,null,true],"nested":{"n":1099511627776}}'.encode(),
+                                       '{"name": "start", "description": "\\u00e9/\\u00fc"}',
+                                       '{"name": "start", "description": "\\u00e9/\\u00fc"}'))
+        self.assertEqual(len(set(outputs)), 1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_pagination
+~~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for the prefetching iter_* bot methods.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+
+from stub_server import StubServer, USER
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from ttbotapi import AsyncBot, Bot
+from ttbotapi.utils import AsyncTransport, Transport, iter_pages
+
+
+def new_chat(chat_id):
+    return {"chat_id": chat_id, "type": "chat", "status": "active", "title": f"chat {chat_id}",
+            "last_event_time": 0, "participants_count": 2, "is_public": False}
+
+
+def new_message(mid, timestamp):
+    return {"sender": USER, "recipient": {"chat_id": 1, "chat_type": "chat", "user_id": 0}, "timestamp": timestamp,
+            "body": {"mid": mid, "seq": 0, "text": mid}}
+
+
+class PagedStubServer(StubServer):
+    """
+    Serves chat_count chats and members with integer markers, and messages with three messages per timestamp
+    """
+
+    def __init__(self, chat_count=250, message_count=230):
+        super().__init__()
+        self.chat_count = chat_count
+        self.messages = [new_message(f'mid{x}', 1000 - x // 3) for x in range(message_count)]
+        self.delay = 0
+
+    def route(self, http_method, path, query, body):
+        time.sleep(self.delay)
+        count = int(query.get('count', [50])[0])
+        start = int(query.get('marker', [0])[0])
+        end = min(start + count, self.chat_count)
+        marker = end if end < self.chat_count else None
+        if path == '/chats':
+            return 200, {"chats": [new_chat(x) for x in range(start, end)], "marker": marker}
+        if path.endswith('/members'):
+            return 200, {"members": [dict(USER, user_id=x) for x in range(start, end)], "marker": marker}
+        if path == '/messages' and http_method == 'GET':
+            ffrom = int(query.get('from', [10 ** 9])[0])
+            to = int(query.get('to', [0])[0])
+            return 200, {"messages": [x for x in self.messages if to <= x['timestamp'] <= ffrom][:count]}
+        return super().route(http_method, path, query, body)
+
+
+class TestIterPages(unittest.TestCase):
+    def setUp(self):
+        self.server = PagedStubServer().start()
+        self.bot = Bot('token', transport=Transport(base_url=self.server.base_url))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_iter_all_chats(self):
+        chats = list(self.bot.iter_all_chats(count=100))
+        self.assertEqual([x.chat_id for x in chats], list(range(250)))
+        self.assertEqual([x[2].get('marker') for x in self.server.requests], [None, ['100'], ['200']])
+
+    def test_iter_chat_members(self):
+        members = list(self.bot.iter_chat_members(1, count=30, marker=60))
+        self.assertEqual([x.user_id for x in members], list(range(60, 250)))
+
+    def test_iter_messages(self):
+        messages = list(self.bot.iter_messages(1, count=20))
+        self.assertEqual([x.body.text for x in messages], [f'mid{x}' for x in range(230)])
+
+    def test_iter_messages_with_one_timestamp(self):
+        self.server.messages = [new_message(f'mid{x}', 1000) for x in range(5)]
+        self.assertEqual(len(list(self.bot.iter_messages(1, count=5))), 5)
+
+    def test_next_page_is_prefetched(self):
+        self.server.delay = 0.1
+        start = time.monotonic()
+        for x in self.bot.iter_all_chats(count=50):
+            if x.chat_id % 50 == 0:
+                time.sleep(0.1)
+        prefetched = time.monotonic() - start
+        start = time.monotonic()
+        for x in self.bot.iter_all_chats(count=50, prefetch=False):
+            if x.chat_id % 50 == 0:
+                time.sleep(0.1)
+        self.assertLess(prefetched, time.monotonic() - start - 0.2)
+
+    def test_at_most_two_pages_are_held(self):
+        fetched = []
+        lock = threading.Lock()
+
+        def fetch_page(marker):
+            with lock:
+                fetched.append(marker)
+            marker = marker or 0
+            return range(marker, marker + 10), marker + 10 if marker < 90 else None
+
+        pages = iter_pages(fetch_page)
+        for x in pages:
+            time.sleep(0.001)
+            with lock:
+                self.assertLessEqual(len(fetched) * 10 - x, 20)
+        self.assertEqual(len(fetched), 10)
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class TestAsyncIterPages(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = PagedStubServer().start()
+        self.bot = AsyncBot('token', transport=AsyncTransport(base_url=self.server.base_url))
+
+    async def asyncTearDown(self):
+        await self.bot.close()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_iter_all_chats(self):
+        chats = [x.chat_id async for x in self.bot.iter_all_chats(count=100)]
+        self.assertEqual(chats, list(range(250)))
+
+    async def test_iter_messages(self):
+        messages = [x.body.text async for x in self.bot.iter_messages(1, count=20)]
+        self.assertEqual(messages, [f'mid{x}' for x in range(230)])
+
+    async def test_early_exit(self):
+        async for x in self.bot.iter_chat_members(1, count=10):
+            if x.user_id == 15:
+                break
+        await asyncio.sleep(0.05)
+        self.assertLessEqual(len(self.server.requests), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_process_dispatch
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for dispatching updates to worker processes.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+import unittest
+
+from stub_server import StubServer, new_message_update
+from ttbotapi import Bot
+from ttbotapi.utils import ProcessPool, Transport
+
+
+@unittest.skipIf('fork' not in multiprocessing.get_all_start_methods(), "fork is not available")
+class TestProcessDispatch(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def sent(self):
+        return [json.loads(x[3])['text'] for x in self.server.requests if x[1] == '/messages']
+
+    def test_updates_are_sharded_by_chat(self):
+        bot = Bot('token', transport=Transport(base_url=self.server.base_url), processes=3)
+        seen = []
+
+        @bot.update_handler()
+        def handler(update):
+            seen.append(update.message.body.text)
+            bot.send_message(text=f'{os.getpid()} {update.message.recipient.chat_id} {update.message.body.text}',
+                             chat_id=update.message.recipient.chat_id, user_id=None)
+
+        for batch in range(5):
+            self.server.push_updates([new_message_update(chat, f'{batch}') for chat in range(1, 9)])
+        poller = threading.Thread(target=bot.polling, kwargs={'timeout': 1})
+        poller.start()
+        deadline = time.monotonic() + 10
+        while len(self.sent()) < 40 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        bot.stop_polling()
+        poller.join(10)
+
+        replies = [x.split() for x in self.sent()]
+        self.assertEqual(len(replies), 40)
+        self.assertEqual(seen, [])
+        pids = {chat: {pid for pid, x, _ in replies if x == chat} for _, chat, _ in replies}
+        self.assertTrue(all(len(x) == 1 for x in pids.values()))
+        self.assertGreater(len(set().union(*pids.values())), 1)
+        self.assertNotIn(str(os.getpid()), set().union(*pids.values()))
+        for chat in pids:
+            self.assertEqual([text for _, x, text in replies if x == chat], ['0', '1', '2', '3', '4'])
+
+    def test_restart_clears_marks(self):
+        pool = ProcessPool(lambda payload: time.sleep(0.2), processes=2)
+        with self.assertRaises(ValueError):
+            pool.submit(1, b'x')
+        pool.start()
+        pool.submit(1, b'x')
+        stale = pool.mark()
+        pool.stop()
+        pool.start()
+        try:
+            self.assertEqual(pool.pending(), [0, 0])
+            self.assertTrue(pool.done(stale))
+            pool.submit(1, b'x')
+            mark = pool.mark()
+            self.assertFalse(pool.done(mark))
+            pool.join()
+            self.assertTrue(pool.done(mark))
+        finally:
+            pool.stop()
+
+    def test_dead_worker_is_restarted(self):
+        def handle(payload):
+            if payload == b'exit':
+                os._exit(1)
+
+        pool = ProcessPool(handle, processes=2)
+        pool.start()
+        try:
+            pool.submit(1, b'exit')
+            deadline = time.monotonic() + 5
+            while len(multiprocessing.active_children()) > 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            mark = pool.mark()
+            pool.submit(1, b'x')
+            pool.submit(1, b'x')
+            pool.join()
+            self.assertTrue(pool.done(mark))
+            self.assertEqual(pool.pending(), [0, 0])
+            pool.submit(1, b'exit')
+        finally:
+            pool.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
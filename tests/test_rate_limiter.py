@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_rate_limiter
+~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for the outbound rate limiter.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+
+from stub_server import StubServer
+from ttbotapi import Bot
+from ttbotapi.utils import RateLimiter, TokenBucket, Transport
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(10, 5)
+        now = time.monotonic()
+        waits = [bucket.reserve() - now for _ in range(15)]
+        self.assertTrue(all(x < 0.05 for x in waits[:5]))
+        for i, x in enumerate(waits[5:], 1):
+            self.assertAlmostEqual(x, i / 10, delta=0.05)
+        self.assertEqual(bucket.state()['tokens'], 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_limits_hold_with_many_threads(self):
+        limiter = RateLimiter(rate=50, burst=5, chat_rate=10, chat_burst=1)
+        sent = []
+        lock = threading.Lock()
+
+        def send(chat_id):
+            for _ in range(5):
+                limiter.acquire(chat_id)
+                with lock:
+                    sent.append((time.monotonic(), chat_id))
+
+        threads = [threading.Thread(target=send, args=(x % 4,)) for x in range(8)]
+        start = time.monotonic()
+        for x in threads:
+            x.start()
+        for x in threads:
+            x.join()
+
+        self.assertEqual(len(sent), 40)
+        for chat_id in range(4):
+            times = sorted(t for t, c in sent if c == chat_id)
+            self.assertGreaterEqual(times[-1] - start, (len(times) - 1) / 10 - 0.02)
+        times = sorted(t for t, c in sent)
+        for i in range(len(times) - 6):
+            self.assertGreaterEqual(times[i + 6] - times[i], 0.02 - 0.005)
+        stats = limiter.stats()
+        self.assertEqual(stats['chats'], 4)
+        self.assertGreater(stats['waits'], 0)
+        self.assertEqual(limiter.chat_state(0)['capacity'], 1)
+        self.assertIsNone(limiter.chat_state(5))
+
+    def test_idle_chats_are_evicted(self):
+        limiter = RateLimiter(rate=1000, chat_rate=1000, max_chats=10)
+        for x in range(100):
+            limiter.reserve_chat(x)
+        self.assertLessEqual(limiter.stats()['chats'], 10)
+
+    def test_busy_chat_does_not_delay_other_chats(self):
+        limiter = RateLimiter(rate=30, chat_rate=1)
+        waits = [limiter.reserve_chat('A') for _ in range(50)]
+        self.assertGreater(waits[-1], 45)
+        self.assertEqual(limiter.reserve_chat('B'), 0)
+        self.assertLess(limiter.reserve(), 0.1)
+        self.assertLess(limiter.stats()['global']['refill_in'], 0.1)
+        start = time.monotonic()
+        limiter.acquire('C')
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_acquire_async(self):
+        limiter = RateLimiter(rate=20, burst=1, chat_rate=None)
+
+        async def main():
+            await asyncio.gather(*(limiter.acquire_async(x) for x in range(6)))
+
+        start = time.monotonic()
+        asyncio.run(main())
+        self.assertGreaterEqual(time.monotonic() - start, 5 / 20 - 0.02)
+
+    def test_bot_waits_instead_of_failing(self):
+        server = StubServer()
+        server.start()
+        try:
+            bot = Bot('token', transport=Transport(base_url=server.base_url),
+                      rate_limiter=RateLimiter(rate=100, chat_rate=20, chat_burst=1))
+            start = time.monotonic()
+            for _ in range(5):
+                bot.send_message('hi', 1, None)
+            self.assertGreaterEqual(time.monotonic() - start, 4 / 20 - 0.02)
+            self.assertEqual(len([x for x in server.requests if x[1] == '/messages']), 5)
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_retry_policy
+~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for the transport retry policy.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import socket
+import time
+import unittest
+from email.utils import formatdate
+
+import requests
+
+from stub_server import StubServer
+from ttbotapi import Bot
+from ttbotapi.utils import ApiException, RetryPolicy, Transport, backoff_delay, parse_retry_after
+
+
+class FlakyStubServer(StubServer):
+    """
+    Answers each path with the queued (status, headers) failures first, then normally
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.failures = {}
+
+    def route(self, http_method, path, query, body):
+        if self.failures.get(path):
+            status, headers = self.failures[path].pop(0)
+            return status, {"code": "error", "message": "stub error"}, headers
+        return super().route(http_method, path, query, body)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.server = FlakyStubServer().start()
+        self.policy = RetryPolicy(max_retries=3, backoff=0.01, max_backoff=0.05)
+        self.bot = Bot('token', transport=Transport(base_url=self.server.base_url, retry_policy=self.policy))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_retries_server_errors(self):
+        self.server.failures['/me'] = [(503, {}), (500, {})]
+        self.assertEqual(self.bot.get_bot_info().username, 'stub_bot')
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.policy.stats(), {'retries': {'me': 2}, 'failures': {}})
+
+    def test_permanent_error_is_not_retried(self):
+        self.server.failures['/me'] = [(403, {})]
+        with self.assertRaises(ApiException) as cm:
+            self.bot.get_bot_info()
+        self.assertEqual(cm.exception.status_code, 403)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.policy.stats(), {'retries': {}, 'failures': {'me': 1}})
+
+    def test_gives_up_after_max_retries(self):
+        self.server.failures['/me'] = [(502, {})] * 10
+        with self.assertRaises(ApiException):
+            self.bot.get_bot_info()
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_honors_retry_after(self):
+        self.server.failures['/messages'] = [(429, {'Retry-After': '0.3'})]
+        start = time.monotonic()
+        self.bot.send_message('hi', 1, None)
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        self.assertEqual(self.policy.retries['messages'], 1)
+
+    def test_retry_after_above_limit_raises(self):
+        self.policy.max_retry_after = 1
+        self.server.failures['/me'] = [(429, {'Retry-After': '120'})]
+        with self.assertRaises(ApiException) as cm:
+            self.bot.get_bot_info()
+        self.assertEqual(cm.exception.retry_after, '120')
+
+    def test_http_methods(self):
+        self.policy.http_methods = ('GET',)
+        self.server.failures['/messages'] = [(503, {})]
+        with self.assertRaises(ApiException):
+            self.bot.send_message('hi', 1, None)
+        self.server.failures['/messages'] = [(429, {})]
+        self.bot.send_message('hi', 1, None)
+
+    def test_post_read_timeout_is_not_retried_by_default(self):
+        policy = RetryPolicy(max_retries=3, backoff=0.01)
+        self.assertIsNone(policy.get_delay('POST', 'messages', 0, requests.ReadTimeout()))
+        self.assertIsNotNone(policy.get_delay('GET', 'messages', 0, requests.ReadTimeout()))
+        self.assertIsNotNone(RetryPolicy(http_methods=None).get_delay('POST', 'messages', 0, requests.ReadTimeout()))
+        self.server.failures['/messages'] = [(503, {})]
+        with self.assertRaises(ApiException):
+            self.bot.send_message('hi', 1, None)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_retries_connection_errors(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        bot = Bot('token', transport=Transport(base_url=f'http://127.0.0.1:{port}', retry_policy=self.policy))
+        with self.assertRaises(requests.ConnectionError):
+            bot.get_bot_info()
+        self.assertEqual(self.policy.stats(), {'retries': {'me': 3}, 'failures': {'me': 1}})
+
+
+class TestBackoff(unittest.TestCase):
+    def test_backoff_is_capped_and_jittered(self):
+        delays = [backoff_delay(x, 0.25, 2) for x in range(100)]
+        self.assertTrue(all(0 <= x <= 2 for x in delays))
+        self.assertGreater(len(set(delays)), 90)
+        self.assertTrue(all(backoff_delay(0, 0.25, 2) <= 0.25 for _ in range(100)))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('5'), 5)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 30, usegmt=True)), 30, delta=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_runner
+~~~~~~~~~~~~~~~~~
+This submodule provides tests for BotRunner.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import collections
+import multiprocessing
+import queue
+import threading
+import time
+import unittest
+
+from stub_server import StubServer, new_message_update
+from ttbotapi import BotRunner
+from ttbotapi.utils import Transport
+
+
+class TokenStubServer(StubServer):
+    """
+    Serves a separate update queue to each access token, The token 'bad' is rejected,
+    An empty queue is waited on like a long poll for up to max_wait seconds
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queues = collections.defaultdict(queue.Queue)
+
+    def route(self, http_method, path, query, body):
+        token = query.get('access_token', [''])[0]
+        if path == '/updates':
+            if token == 'bad':
+                return 401, {"code": "verify.token", "message": "Invalid access_token"}
+            try:
+                updates = self.queues[token].get(timeout=min(float(query.get('timeout', [30])[0]), self.max_wait))
+            except queue.Empty:
+                updates = []
+            return 200, {"updates": updates, "marker": 1}
+        return super().route(http_method, path, query, body)
+
+
+class TestBotRunner(unittest.TestCase):
+    def setUp(self):
+        self.server = TokenStubServer().start()
+        self.runner = BotRunner(Transport(base_url=self.server.base_url), workers=4, dispatchers=2, idle_interval=0.05)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def runner_threads(self):
+        return {x.name for x in threading.enumerate() if x.name.startswith(('RunnerLoop', 'RunnerDispatcher'))}
+
+    def test_many_bots_share_threads(self):
+        received = []
+        threads = set()
+        lock = threading.Lock()
+
+        def add_bot(i):
+            bot = self.runner.add(f'token{i}', name=f'bot{i}')
+
+            @bot.update_handler()
+            def handler(update):
+                bot.send_message(text='pong', chat_id=update.message.recipient.chat_id, user_id=None)
+                with lock:
+                    received.append((i, update.message.body.text))
+                    threads.update(self.runner_threads())
+                    if len(received) == 20:
+                        self.runner.stop()
+
+        for i in range(10):
+            add_bot(i)
+            self.server.queues[f'token{i}'].put([new_message_update(i, f'a{i}')])
+            self.server.queues[f'token{i}'].put([new_message_update(i, f'b{i}')])
+        self.runner.add('bad', name='bad')
+
+        runner = threading.Thread(target=self.runner.run)
+        runner.start()
+        runner.join(10)
+        self.assertFalse(runner.is_alive())
+        self.assertIn('RunnerLoop', threads)
+        self.assertLessEqual(len(threads), 3)
+        self.assertFalse(self.runner_threads())
+        self.assertFalse([x for x in threading.enumerate() if x.name.startswith('RunnerWorker')])
+
+        self.assertEqual(sorted(received), sorted([(i, f'{x}{i}') for i in range(10) for x in 'ab']))
+        for i in range(10):
+            self.assertLess(received.index((i, f'a{i}')), received.index((i, f'b{i}')))
+        stats = self.runner.stats()['bots']
+        self.assertEqual([stats[f'bot{i}']['updates'] for i in range(10)], [2] * 10)
+        self.assertGreaterEqual(stats['bad']['errors'], 1)
+        self.assertEqual(stats['bad']['updates'], 0)
+
+    def test_long_polls_run_together(self):
+        self.server.max_wait = 10
+        self.runner.timeout = 10
+        handled = threading.Event()
+        for i in range(20):
+            bot = self.runner.add(f'token{i}', name=f'bot{i}')
+        bot.update_handler()(lambda update: handled.set())
+        self.runner.start()
+        try:
+            deadline = time.monotonic() + 5
+            while len(self.server.requests) < 20 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(self.server.requests), 20)
+            self.assertLessEqual(len(self.runner_threads()), 3)
+            self.server.queues['token19'].put([new_message_update(19, 'hi')])
+            self.assertTrue(handled.wait(2))
+        finally:
+            self.runner.stop()
+            started = time.monotonic()
+            self.runner.join()
+        self.assertLess(time.monotonic() - started, 5)
+
+    @unittest.skipIf('fork' not in multiprocessing.get_all_start_methods(), "fork is not available")
+    def test_join_stops_bot_processes(self):
+        self.runner.add('token', processes=2)
+        self.runner.start()
+        self.assertEqual(len(multiprocessing.active_children()), 2)
+        self.runner.stop()
+        self.runner.join()
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_duplicate_name(self):
+        self.runner.add('token', name='bot')
+        with self.assertRaises(ValueError):
+            self.runner.add('other', name='bot')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_transport
+~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for the pooled keep-alive Transport.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import threading
+import unittest
+from unittest import mock
+
+from ttbotapi.utils import Transport
+
+
+class TestTransport(unittest.TestCase):
+    def test_close_closes_per_thread_sessions(self):
+        transport = Transport(per_thread=True)
+        sessions = []
+
+        def run():
+            sessions.append(transport.get_session())
+            sessions.append(transport.get_session())
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(x) for x in sessions}), 3)
+
+        closed = []
+        for session in set(sessions):
+            session.close = mock.Mock(side_effect=lambda session=session: closed.append(session))
+        transport.close()
+        self.assertEqual(len(closed), 3)
+
+    def test_thread_gets_new_session_after_close(self):
+        transport = Transport(per_thread=True)
+        session = transport.get_session()
+        transport.close()
+        self.assertIsNot(transport.get_session(), session)
+        transport.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_update_log
+~~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for recording and replaying update streams.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import unittest
+
+from stub_server import StubServer, new_message_update
+from ttbotapi import Bot
+from ttbotapi.utils import Transport, UpdateLog, UpdateRecorder
+
+
+def write_log(path, times):
+    """
+    Writes a log without index holding one batch of a single update per recorded time
+    """
+    with open(path, 'w') as f:
+        for i, recorded in enumerate(times):
+            batch = {'time': recorded, 'marker': i, 'updates': [new_message_update(i, f'text {i}', mid=f'mid.{i}')]}
+            f.write(json.dumps(batch) + '\n')
+
+
+class TestUpdateLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'updates.jsonl')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_polling_records_batches(self):
+        server = StubServer().start()
+        self.addCleanup(server.stop)
+        recorder = UpdateRecorder(self.path)
+        bot = Bot('token', transport=Transport(base_url=server.base_url), recorder=recorder)
+
+        @bot.update_handler()
+        def handler(update):
+            if update.message.body.text == 'last':
+                bot.stop_polling()
+
+        server.push_updates([new_message_update(1, 'a'), new_message_update(2, 'b')])
+        server.push_updates([new_message_update(1, 'last')])
+        poller = threading.Thread(target=bot.polling, kwargs={'timeout': 1})
+        poller.start()
+        poller.join(10)
+        recorder.close()
+        self.assertEqual((recorder.batches, recorder.updates), (2, 3))
+        self.assertEqual(os.path.getsize(self.path + '.idx'), 2 * struct.calcsize('<QdI'))
+
+        with UpdateLog(self.path) as log:
+            self.assertEqual((len(log), log.updates), (2, 3))
+            texts = [[x['message']['body']['text'] for x in batch] for _, batch in log.iter_batches()]
+        self.assertEqual(texts, [['a', 'b'], ['last']])
+
+    def test_log_without_index_is_scanned(self):
+        write_log(self.path, [100.0, 101.0, 102.0, 103.0])
+        with open(self.path, 'ab') as f:
+            f.write(b'{"time": 104.0, "upd')
+        with UpdateLog(self.path) as log:
+            self.assertEqual((len(log), log.duration), (4, 3.0))
+            self.assertEqual([x for x, _ in log.iter_batches(start=101.0, end=102.5)], [101.0, 102.0])
+
+    def test_replay_speed(self):
+        write_log(self.path, [100.0, 100.2, 100.4])
+        with UpdateLog(self.path) as log:
+            for speed, low, high in ((1.0, 0.4, 0.6), (4.0, 0.1, 0.2), (None, 0, 0.05)):
+                started = time.monotonic()
+                self.assertEqual(sum(len(x) for x in log.replay(speed)), 3)
+                self.assertTrue(low <= time.monotonic() - started < high, speed)
+
+    def test_bot_replay(self):
+        write_log(self.path, [100.0, 100.01, 100.02])
+        bot = Bot('token', transport=Transport(base_url='http://127.0.0.1:9'), workers=2)
+        received = []
+
+        @bot.update_handler()
+        def handler(update):
+            received.append(update.message.body.mid)
+
+        self.assertEqual(bot.replay(self.path, speed=None), 3)
+        self.assertEqual(sorted(received), ['mid.0', 'mid.1', 'mid.2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_upload
+~~~~~~~~~~~~~~~~~
+This submodule provides tests for streaming file uploads.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import tracemalloc
+import unittest
+
+from stub_server import StubServer
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from ttbotapi import AsyncBot, Bot
+from ttbotapi.utils import AsyncTransport, MultipartStream, Transport
+
+
+class UploadStubServer(StubServer):
+    """
+    Hands out upload urls and hashes uploaded bodies chunk by chunk, so it holds no body in memory
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.uploads = []
+        self.lock = threading.Lock()
+
+    def read_body(self, path, rfile, length):
+        if path != '/upload-target':
+            return super().read_body(path, rfile, length)
+        boundary = rfile.readline()
+        head = len(boundary)
+        line = None
+        while line != b'\r\n':
+            line = rfile.readline()
+            head += len(line)
+        remaining = length - head - len(boundary.strip()) - 6
+        digest = hashlib.sha256()
+        while remaining:
+            chunk = rfile.read(min(remaining, 65536))
+            digest.update(chunk)
+            remaining -= len(chunk)
+        rfile.read(len(boundary.strip()) + 6)
+        return digest.hexdigest().encode()
+
+    def route(self, http_method, path, query, body):
+        if path == '/uploads':
+            return 200, {"url": f"{self.base_url}/upload-target", "token": f"token-{query['type'][0]}"}
+        if path == '/upload-target':
+            with self.lock:
+                self.uploads.append(body.decode())
+            return 200, {"photos": {"size": {"token": "photo-token"}}}
+        return super().route(http_method, path, query, body)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TestMultipartStream(unittest.TestCase):
+    def test_body_matches_between_path_and_file_object(self):
+        with tempfile.NamedTemporaryFile(suffix='.bin') as f:
+            f.write(os.urandom(300000))
+            f.flush()
+            with MultipartStream(f.name, chunk_size=65536) as stream:
+                body = b''.join(stream)
+                self.assertEqual(len(body), len(stream))
+            f.seek(0)
+            stream = MultipartStream(f, filename=os.path.basename(f.name), chunk_size=1000)
+            other = b''.join(stream)
+        boundary = body[2:34]
+        self.assertEqual(other.replace(other[2:34], boundary), body)
+        self.assertIn(b'filename="' + os.path.basename(f.name).encode() + b'"', body)
+
+    def test_progress_and_rewind(self):
+        calls = []
+        stream = MultipartStream(io.BytesIO(b'x' * 2500), filename='x', chunk_size=1000,
+                                 progress=lambda sent, total: calls.append((sent, total)))
+        first = b''.join(stream)
+        self.assertEqual(calls, [(1000, 2500), (2000, 2500), (2500, 2500)])
+        stream.rewind()
+        self.assertEqual(b''.join(stream), first)
+
+
+class TestUpload(unittest.TestCase):
+    def setUp(self):
+        self.server = UploadStubServer().start()
+        self.bot = Bot('token', transport=Transport(base_url=self.server.base_url))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_upload_large_file_in_constant_memory(self):
+        size = 64 * 1048576
+        with tempfile.NamedTemporaryFile() as f:
+            for _ in range(size // 1048576):
+                f.write(os.urandom(1048576))
+            f.flush()
+            progress = []
+            tracemalloc.start()
+            try:
+                payload = self.bot.upload(f.name, 'video', progress=lambda sent, total: progress.append(sent))
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.assertEqual(self.server.uploads, [file_digest(f.name)])
+        self.assertEqual(payload, {"photos": {"size": {"token": "photo-token"}}, "token": "token-video"})
+        self.assertEqual(progress[-1], size)
+        self.assertLess(peak, 8 * 1048576)
+
+    def test_upload_many(self):
+        sources = [io.BytesIO(os.urandom(100000 + x)) for x in range(6)]
+        progress = {}
+        payloads = self.bot.upload_many(sources, 'file', concurrency=3,
+                                        progress=lambda source, sent, total: progress.__setitem__(id(source), sent))
+        self.assertEqual([x['token'] for x in payloads], ['token-file'] * 6)
+        self.assertEqual(sorted(self.server.uploads), sorted(hashlib.sha256(x.getvalue()).hexdigest() for x in sources))
+        self.assertEqual(sorted(progress.values()), [100000 + x for x in range(6)])
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class TestAsyncUpload(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = UploadStubServer().start()
+        self.bot = AsyncBot('token', transport=AsyncTransport(base_url=self.server.base_url))
+
+    async def asyncTearDown(self):
+        await self.bot.close()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_upload_many(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for x in range(4):
+                paths.append(os.path.join(directory, f'{x}.bin'))
+                with open(paths[-1], 'wb') as f:
+                    f.write(os.urandom(3 * 1048576 + x))
+            payloads = await self.bot.upload_many(paths, 'audio', concurrency=2)
+            expected = sorted(file_digest(x) for x in paths)
+        self.assertEqual([x['token'] for x in payloads], ['token-audio'] * 4)
+        self.assertEqual(sorted(self.server.uploads), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_upload_cache
+~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for the content addressed upload cache.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from test_upload import UploadStubServer
+from ttbotapi import Bot
+from ttbotapi.utils import SqliteUploadCache, Transport, UploadCache, hash_source
+
+
+class CacheBackendTests(object):
+    def new_cache(self, maxsize=10000, ttl=None):
+        raise NotImplementedError
+
+    def test_lru_and_ttl(self):
+        cache = self.new_cache(maxsize=2, ttl=0.2)
+        cache.set('a', {'token': 'a'})
+        time.sleep(0.01)
+        cache.set('b', {'token': 'b'})
+        time.sleep(0.01)
+        self.assertEqual(cache.get('a'), {'token': 'a'})
+        time.sleep(0.01)
+        cache.set('c', {'token': 'c'})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+        time.sleep(0.2)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats(), {'size': 1, 'hits': 1, 'misses': 2})
+
+    def test_key_depends_on_type_and_content(self):
+        cache = self.new_cache()
+        data = io.BytesIO(b'\x00' * 3000000)
+        data.seek(10)
+        key = cache.key(data, 'image', chunk_size=65536)
+        self.assertEqual(data.tell(), 10)
+        self.assertEqual(key, cache.key(io.BytesIO(b'\x00' * 2999990), 'image'))
+        self.assertNotEqual(key, cache.key(io.BytesIO(b'\x00' * 2999990), 'file'))
+
+
+class TestUploadCache(CacheBackendTests, unittest.TestCase):
+    def new_cache(self, maxsize=10000, ttl=None):
+        return UploadCache(maxsize, ttl)
+
+
+class TestSqliteUploadCache(CacheBackendTests, unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'uploads.sqlite')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def new_cache(self, maxsize=10000, ttl=None):
+        cache = SqliteUploadCache(self.path, maxsize, ttl)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_entries_survive_restarts(self):
+        cache = self.new_cache()
+        cache.set('image:1', {'photos': {'size': {'token': 't'}}})
+        cache.close()
+        self.assertEqual(self.new_cache().get('image:1'), {'photos': {'size': {'token': 't'}}})
+
+
+class TestBotUploadCache(unittest.TestCase):
+    def setUp(self):
+        self.server = UploadStubServer().start()
+        self.cache = UploadCache()
+        self.bot = Bot('token', transport=Transport(base_url=self.server.base_url), upload_cache=self.cache)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_repeat_upload_reuses_the_payload(self):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(os.urandom(100000))
+            f.flush()
+            payload = self.bot.upload(f.name, 'image')
+            requests = len(self.server.requests)
+            f.seek(0)
+            self.assertEqual(self.bot.upload(io.BytesIO(f.read()), 'image'), payload)
+            self.assertEqual(len(self.server.requests), requests)
+            self.bot.upload(f.name, 'file')
+        self.assertEqual(len(self.server.uploads), 2)
+        self.assertEqual(self.cache.stats(), {'size': 2, 'hits': 1, 'misses': 2})
+
+    def test_non_seekable_stream(self):
+        data = os.urandom(100000)
+
+        def pipe():
+            reader, writer = os.pipe()
+            threading.Thread(target=lambda: (os.write(writer, data), os.close(writer))).start()
+            return open(reader, 'rb')
+
+        with pipe() as f:
+            self.assertFalse(f.seekable())
+            with self.assertRaises(ValueError):
+                hash_source(f)
+            payload = self.bot.upload(f, 'image')
+        with pipe() as f:
+            self.assertEqual(self.bot.upload(f, 'image'), payload)
+        self.assertEqual(len(self.server.uploads), 1)
+        self.assertEqual(self.cache.stats(), {'size': 1, 'hits': 1, 'misses': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
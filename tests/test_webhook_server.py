@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""
+tests.test_webhook_server
+~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides tests for the WebHook receiver server.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import http.client
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+
+from ttbotapi.utils import WebhookServer
+
+
+class TestWebhookServer(unittest.TestCase):
+    def setUp(self):
+        self.bodies = []
+
+    def new_server(self, **kwargs):
+        server = WebhookServer(self.bodies.extend, host='127.0.0.1', port=0, **kwargs)
+        self.addCleanup(server.stop)
+        return server
+
+    def post(self, server, body, headers):
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=5)
+        try:
+            connection.putrequest('POST', '/')
+            for name, value in headers.items():
+                connection.putheader(name, value)
+            connection.endheaders(body)
+            return connection.getresponse().status
+        finally:
+            connection.close()
+
+    def test_bad_content_length(self):
+        server = self.new_server()
+        server.start()
+        self.assertEqual(self.post(server, b'{}', {'Content-Length': 'two'}), 400)
+        self.assertEqual(self.post(server, b'{}', {'Content-Length': '-2'}), 400)
+        self.assertEqual(self.post(server, b'{}', {'Content-Length': '2'}), 200)
+        self.assertEqual((server.received, server.rejected), (1, 0))
+
+    def test_stop_without_serving(self):
+        server = self.new_server()
+        thread = threading.Thread(target=server.stop, daemon=True)
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_stop_racing_serve_forever(self):
+        for _ in range(20):
+            server = self.new_server()
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            server.stop()
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+        server = self.new_server()
+        server.stop()
+        server.serve_forever()
+
+    @unittest.skipIf(shutil.which('openssl') is None, "openssl is not installed")
+    def test_slow_tls_client_does_not_block_others(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        certfile, keyfile = os.path.join(directory.name, 'cert.pem'), os.path.join(directory.name, 'key.pem')
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj',
+                        '/CN=127.0.0.1', '-keyout', keyfile, '-out', certfile], check=True, capture_output=True)
+        server = self.new_server(certfile=certfile, keyfile=keyfile)
+        server.start()
+
+        # Connects without ever starting the TLS handshake
+        slow = socket.create_connection(('127.0.0.1', server.server_port))
+        self.addCleanup(slow.close)
+        time.sleep(0.1)
+        context = ssl.create_default_context(cafile=certfile)
+        context.check_hostname = False
+        connection = http.client.HTTPSConnection('127.0.0.1', server.server_port, timeout=5, context=context)
+        try:
+            connection.request('POST', '/', b'{}')
+            self.assertEqual(connection.getresponse().status, 200)
+        finally:
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,3 +9,5 @@ ttbotapi
 from .utils import logger
 from .objects import BotCommand, NewMessage
 from .bot import Bot
+from .async_bot import AsyncBot
+from .runner import BotRunner
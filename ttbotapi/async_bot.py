@@ -0,0 +1,809 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.async_bot
+~~~~~~~~~~~~~~~~~~
+This submodule provides an asyncio Bot with the same api surface as ttbotapi.Bot,
+It requires aiohttp, install it with `pip install ttbotapi[async]`
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+import asyncio
+import collections
+import functools
+import inspect
+
+from . import utils
+from . import methods
+from . import objects
+from . import handlers
+from . import broadcast
+
+
+class AsyncBot:
+    def __init__(self, access_token, proxies=None, transport=None, pool_size=100, max_tasks=1000, lazy_updates=False,
+                 rate_limiter=None, cache=None, upload_cache=None, recorder=None, checkpoint=None, dedupe=None):
+        """
+        Use this class to create an asyncio bot instance, Every api method is a coroutine
+        :param str access_token: Bot token gain by @PrimeBot
+        :param dict or None proxies: Dictionary mapping protocol to the URL of the proxy
+        :param utils.AsyncTransport or None transport: pooled asyncio HTTP transport
+        :param int pool_size: Maximum number of simultaneous connections when the bot creates its own transport
+        :param int max_tasks: Maximum number of handlers running at the same time
+        :param bool lazy_updates: Parse each update attribute on first access instead of the whole update at once
+        :param utils.RateLimiter or None rate_limiter: paces outgoing messages and actions, Calls wait for a token
+                                                       instead of failing, Pass one to share the limits between bots
+        :param utils.TTLCache or None cache: caches get_chat, get_chat_membership, get_chat_admins and get_bot_info,
+                                             Entries of a chat are invalidated by its chat_title_changed, user_added,
+                                             user_removed, bot_added and bot_removed updates
+        :param utils.UploadCache or None upload_cache: reuses the payload of a file with the same type and content
+                                                       instead of uploading it again
+        :param utils.UpdateRecorder or None recorder: appends every batch received by get_updates to an update log,
+                                                      Replay it with replay
+        :param utils.CheckpointStore or None checkpoint: durable store of the polling marker, Polling resumes from it
+                                                         after a restart, A marker is committed once the handlers of
+                                                         its batch and of every batch before it finished
+        :param utils.DedupeFilter or None dedupe: drops updates already dispatched, E.g. redelivered by the WebHook
+                                                  or fetched again after a restart
+        """
+        self.__transport = transport or utils.AsyncTransport(pool_size=pool_size)
+        self.__api = methods.Api(access_token, proxies, self.__transport)
+        self.__max_tasks = max_tasks
+        self.__lazy_updates = lazy_updates
+        self.__rate_limiter = rate_limiter
+        self.__cache = cache
+        self.__upload_cache = upload_cache
+        self.__recorder = recorder
+        self.__checkpoint = checkpoint
+        self.__dedupe = dedupe
+        self.__batch_marks = collections.deque()
+
+        self.__stop_polling = None
+        self.__semaphore = None
+        self.__tasks = set()
+
+        self.__last_marker = (checkpoint.load() if checkpoint else None) or 0
+
+        self.__update_handlers = handlers.HandlerRegistry()
+
+    def update_handler(self, update_type='message_created', chat_type=None, bot_command=None, regexp=None, func=None):
+        """
+        Update handler decorator, Handlers can be coroutine functions or plain functions,
+        An exception raised by a handler is logged and the next update is handled
+        :param str or list update_type: specify one or a list of allowed_updates to take action
+        :param str or list or None chat_type: list of chat types (dialog, chat, channel)
+        :param str or list or None bot_command: Bot Commands like (/start, /help)
+        :param str or None regexp: Sequence of characters that define a search pattern
+        :param function or None func: any python function that return True On success like (lambda)
+        :return: filtered Update`
+        """
+
+        def decorator(handler):
+            self.__update_handlers.add(update_type, handler, chat_type=chat_type, bot_command=bot_command,
+                                       regexp=regexp, func=func)
+            return handler
+
+        return decorator
+
+    async def polling(self, none_stop=False, limit=100, timeout=30, types=None):
+        """
+        This coroutine retrieves Updates automatically and notify listeners and message handlers accordingly,
+        Every handler runs in its own task so a slow handler never blocks polling
+        Warning: Do not call this function more than once!
+        :param bool none_stop: Do not stop polling when an ApiException or a connection error occurs,
+                               Polling waits a jittered backoff, capped at 30 seconds and reset after a success
+        :param int limit: Maximum number of updates to be retrieved
+        :param int timeout: Timeout in seconds for long polling
+        :param list[str] or None types: Comma separated list of update types your bot want to receive
+        :return:
+        """
+        errors = 0
+        utils.logger.info('POLLING STARTED')
+        self.__stop_polling = asyncio.Event()
+        flusher = asyncio.ensure_future(self.__flush_checkpoints()) if self.__checkpoint is not None else None
+
+        while not self.__stop_polling.is_set():
+            try:
+                await self.__retrieve_updates(limit, timeout, types)
+                errors = 0
+            except (utils.ApiException,) + self.__transport.connection_errors as e:
+                utils.logger.error(e)
+                if not none_stop:
+                    self.__stop_polling.set()
+                    utils.logger.info("Exception Occurred, POLLING STOPPED")
+                else:
+                    error_interval = utils.backoff_delay(errors, 0.25, 30)
+                    errors += 1
+                    utils.logger.info(f"Waiting for {error_interval:.2f} seconds until retry")
+                    await asyncio.sleep(error_interval)
+
+        if self.__tasks:
+            await asyncio.gather(*self.__tasks, return_exceptions=True)
+        if flusher is not None:
+            flusher.cancel()
+        self.flush_checkpoint()
+        utils.logger.info('POLLING STOPPED')
+
+    def stop_polling(self):
+        """
+        Stops polling after the current get_updates call returns
+        """
+        if self.__stop_polling is not None:
+            self.__stop_polling.set()
+
+    async def replay(self, log, speed=1.0, start=None, end=None):
+        """
+        Feeds an update log recorded with a recorder through the handlers, Nothing is requested from the API,
+        This coroutine returns when the log ends or stop_polling is called and every handler task has finished
+        :param str or utils.UpdateLog log: log file or an opened UpdateLog
+        :param float or None speed: 1.0 for the original speed, 2.0 for twice as fast, None or 0 for full speed
+        :param float or None start: Skip batches recorded before this unix time
+        :param float or None end: Stop at the first batch recorded after this unix time
+        :return: Number of replayed updates
+        :rtype: int
+        """
+        update_log = utils.UpdateLog(log) if isinstance(log, str) else log
+        update_class = objects.LazyUpdate if self.__lazy_updates else objects.Update
+        replayed = 0
+        self.__stop_polling = asyncio.Event()
+        try:
+            async for batch in update_log.replay_async(speed, start, end):
+                if self.__stop_polling.is_set():
+                    break
+                await self.process_new_updates([update_class.de_json(x) for x in batch])
+                replayed += len(batch)
+            if self.__tasks:
+                await asyncio.gather(*self.__tasks, return_exceptions=True)
+        finally:
+            if update_log is not log:
+                update_log.close()
+        return replayed
+
+    async def close(self):
+        """
+        Closes the transport and its pooled connections
+        """
+        await self.__transport.close()
+
+    async def __retrieve_updates(self, limit, timeout, types=None):
+        """
+        Retrieves any updates from the TamTam API
+        :return:
+        """
+        marker = (self.__last_marker + 1)
+        updates = await self.get_updates(limit, timeout, marker, types)
+        if updates.marker and updates.marker > self.__last_marker:
+            self.__last_marker = updates.marker
+        tasks = await self.__dispatch_updates(updates.updates)
+        if self.__checkpoint is not None and updates.marker:
+            self.__batch_marks.append((updates.marker, tasks))
+            self.__commit_checkpoint()
+
+    async def process_new_updates(self, updates):
+        """
+        Notifies handlers about updates received by any source (polling, WebHook or your own server)
+        :param list[objects.Update] updates: list of updates
+        :return:
+        """
+        await self.__dispatch_updates(updates)
+
+    async def __dispatch_updates(self, updates):
+        """
+        Schedules the handler tasks of updates
+        :param list[objects.Update] updates: list of updates
+        :return: the scheduled handler tasks
+        :rtype: list[asyncio.Task]
+        """
+        tasks = []
+        for update in updates:
+            if self.__dedupe is not None and self.__dedupe.is_duplicate(update):
+                continue
+            if self.__cache is not None and update.update_type in handlers.CACHE_INVALIDATIONS:
+                self.__invalidate(update.chat_id, *handlers.CACHE_INVALIDATIONS[update.update_type])
+            if self.__update_handlers.get(update.update_type):
+                task = await self.__notify_update_handler(update)
+                if task is not None:
+                    tasks.append(task)
+        return tasks
+
+    def __commit_checkpoint(self):
+        """
+        Commits the marker of the last batch whose handler tasks, and the tasks of every batch before it, are done
+        :return:
+        """
+        marker = None
+        while self.__batch_marks and all(x.done() for x in self.__batch_marks[0][1]):
+            marker = self.__batch_marks.popleft()[0]
+        if marker is not None:
+            self.__checkpoint.commit(marker)
+
+    async def __flush_checkpoints(self):
+        """
+        Runs while polling, Commits the batches whose handlers finished since the last batch arrived and writes the
+        checkpoint once its interval passed, So a long poll without updates does not hold them
+        """
+        while True:
+            await asyncio.sleep(max(self.__checkpoint.interval / 2, 0.05))
+            self.__commit_checkpoint()
+            self.__checkpoint.flush_due()
+
+    def flush_checkpoint(self):
+        """
+        Commits the markers of the batches whose handlers finished and writes the checkpoint now,
+        Polling calls it when it stops
+        """
+        if self.__checkpoint is not None:
+            self.__commit_checkpoint()
+            self.__checkpoint.flush()
+
+    async def __cached(self, key, load):
+        if self.__cache is None:
+            return await load()
+        return await self.__cache.get_or_load_async(key, load)
+
+    def __invalidate(self, chat_id, *lookups):
+        if self.__cache is not None:
+            self.__cache.invalidate(*((x, chat_id) for x in lookups))
+
+    async def __throttle(self, chat_id=None):
+        if self.__rate_limiter:
+            await self.__rate_limiter.acquire_async(chat_id)
+
+    async def __exec_task(self, task, *args, **kwargs):
+        try:
+            if inspect.iscoroutinefunction(task):
+                await task(*args, **kwargs)
+            else:
+                task(*args, **kwargs)
+        except Exception as e:
+            utils.logger.error(f"Handler {getattr(task, '__name__', task)} raised {e!r}")
+        finally:
+            self.__semaphore.release()
+
+    async def __notify_update_handler(self, update):
+        """
+        Notifies the first matching update handler, The handler is scheduled as a task
+        :param objects.Update update:
+        :return: the handler task, None if no handler matches
+        :rtype: asyncio.Task or None
+        """
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.__max_tasks)
+        update_handler = self.__update_handlers.find_handler(update)
+        if update_handler:
+            await self.__semaphore.acquire()
+            task = asyncio.ensure_future(self.__exec_task(update_handler['function'], update))
+            self.__tasks.add(task)
+            task.add_done_callback(self.__tasks.discard)
+            return task
+        return None
+
+    async def get_bot_info(self):
+        """
+        Get info about current bot
+        :return: On Success, a User object
+        :rtype: objects.User
+        """
+        async def load():
+            resp = await self.__api.get_bot_info()
+            return objects.User.de_json(resp)
+
+        return await self.__cached(('get_bot_info',), load)
+
+    async def edit_bot_info(self, name=None, username=None, description=None, commands=None, photo=None):
+        """
+        Edits current bot info,
+        Fill only the fields you want to update,
+        All remaining fields will stay untouched
+        :param str or None name: Visible name of bot
+        :param str or None username: Bot unique identifier
+        :param str or None description: Bot description up to 16k characters long
+        :param list[objects.BotCommand] or None commands: Commands supported by bot, Pass empty list to remove commands
+        :param any photo: Request to set bot photo
+        :return: On Success, a User object
+        :rtype: objects.User
+        """
+        resp = await self.__api.edit_bot_info(name=name, username=username, description=description, commands=commands,
+                                              photo=photo)
+        if self.__cache is not None:
+            self.__cache.invalidate(('get_bot_info',))
+        return objects.User.de_json(resp)
+
+    async def get_all_chats(self, count=50, marker=None):
+        """
+        Get information about chats that bot participated in
+        :param int or None count: Number of chats requested
+        :param int or None marker: Points to Next data page
+        :return: On Success, ChatInfo Object
+        :rtype: objects.ChatInfo
+        """
+        resp = await self.__api.get_all_chats(count=count, marker=marker)
+        return objects.ChatInfo.de_json(resp)
+
+    async def iter_all_chats(self, count=100, marker=None, prefetch=True):
+        """
+        Iterate over all chats that bot participated in, following markers page by page,
+        The next page is fetched while the current one is consumed, So at most two pages are held in memory
+        :param int count: Number of chats requested per page
+        :param int or None marker: Marker of the first page, None to start from the beginning
+        :param bool prefetch: Fetch the next page while the current page is consumed
+        :return: async generator of Chat Objects
+        :rtype: collections.abc.AsyncIterator[objects.Chat]
+        """
+        async def fetch_page(page_marker):
+            chat_info = await self.get_all_chats(count, page_marker)
+            return chat_info.chats, chat_info.marker
+
+        async for x in utils.aiter_pages(fetch_page, marker, prefetch):
+            yield x
+
+    async def get_chat_by_link(self, chat_link):
+        """
+        Get chat/channel information by its public link or dialog with user by username
+        :param str chat_link: Public chat link or username
+        :return: On Success, a Chat Object
+        :rtype: objects.Chat
+        """
+        resp = await self.__api.get_chat_by_link(chat_link=chat_link)
+        return objects.Chat.de_json(resp)
+
+    async def get_chat(self, chat_link):
+        """
+        Get info about chat
+        :param chat_link: Requested chat identifier
+        :return: On Success, a Chat Object
+        :rtype: objects.Chat
+        """
+        async def load():
+            resp = await self.__api.get_chat(chat_id=chat_link)
+            return objects.Chat.de_json(resp)
+
+        return await self.__cached(('get_chat', chat_link), load)
+
+    async def edit_chat_info(self, chat_id, icon=None, title=None, pin=None, notify=True):
+        """
+        Edit chat info
+        :param int chat_id: chat identifier
+        :param any icon: Request to attach image
+        :param str or None title: chat title
+        :param str or None pin: Identifier of message to be pinned in chat
+        :param bool notify: By default, participants will be notified about change with system message in chat/channel
+        :return: On Success, a Chat Object
+        :rtype: objects.Chat
+        """
+        resp = await self.__api.edit_chat_info(chat_id=chat_id, icon=icon, title=title, pin=pin, notify=notify)
+        self.__invalidate(chat_id, 'get_chat')
+        return objects.Chat.de_json(resp)
+
+    async def send_action(self, chat_id, action):
+        """
+        Send bot action to chat
+        :param int chat_id: chat identifier
+        :param str action: Enum: "typing_on" "sending_photo" "sending_video" "sending_audio" "sending_file" "mark_seen"
+                             Different actions to send to chat members
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        await self.__throttle(chat_id)
+        resp = await self.__api.send_action(chat_id=chat_id, action=action)
+        return objects.Response.de_json(resp)
+
+    async def get_pinned_message(self, chat_id):
+        """
+        Get pinned message in chat or channel
+        :param int chat_id: chat identifier
+        :return: On success, a Message Object
+        :rtype: objects.Message
+        """
+        resp = await self.__api.get_pinned_message(chat_id=chat_id)
+        if resp:
+            return objects.Message.de_json(resp['message'])
+        return resp
+
+    async def pin_message(self, chat_id, message_id, notify=True):
+        """
+        Pins message in chat or channel
+        :param int chat_id: chat identifier
+        :param str message_id: Identifier of message to be pinned in chat
+        :param bool notify: By default, participants will be notified about change with system message in chat/channel
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        resp = await self.__api.pin_message(chat_id=chat_id, message_id=message_id, notify=notify)
+        return objects.Response.de_json(resp)
+
+    async def unpin_message(self, chat_id):
+        """
+        Unpins message in chat or channel
+        :param int chat_id: chat identifier
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        resp = await self.__api.unpin_message(chat_id=chat_id)
+        return objects.Response.de_json(resp)
+
+    async def get_chat_membership(self, chat_id):
+        """
+        Get chat membership info for current bot
+        :param int chat_id: chat identifier
+        :return: User Object, On success
+        :rtype: objects.User
+        """
+        async def load():
+            resp = await self.__api.get_chat_membership(chat_id=chat_id)
+            return objects.User.de_json(resp)
+
+        return await self.__cached(('get_chat_membership', chat_id), load)
+
+    async def leave_chat(self, chat_id):
+        """
+        Removes bot from chat members
+        :param int chat_id: chat identifier
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        resp = await self.__api.leave_chat(chat_id=chat_id)
+        self.__invalidate(chat_id, *handlers.CHAT_LOOKUPS)
+        return objects.Response.de_json(resp)
+
+    async def get_chat_admins(self, chat_id):
+        """
+        Get all chat administrator, Bot must be administrator in requested chat
+        :param int chat_id: chat identifier
+        :return: On success, MemberInfo
+        :rtype: objects.MemberInfo
+        """
+        async def load():
+            resp = await self.__api.get_chat_admins(chat_id=chat_id)
+            return objects.MemberInfo.de_json(resp)
+
+        return await self.__cached(('get_chat_admins', chat_id), load)
+
+    async def get_chat_members(self, chat_id, user_ids=None, marker=None, count=20):
+        """
+        Get users participated in chat
+        :param int chat_id: chat identifier
+        :param list[int] or None user_ids: users identifier
+        :param int or None marker: a Marker
+        :param int count: Default 20, Count
+        :return: On success, MemberInfo
+        :rtype: objects.MemberInfo
+        """
+        resp = await self.__api.get_members(chat_id=chat_id, user_ids=user_ids, marker=marker, count=count)
+        return objects.MemberInfo.de_json(resp)
+
+    async def iter_chat_members(self, chat_id, count=100, marker=None, prefetch=True):
+        """
+        Iterate over all users participated in chat, following markers page by page,
+        The next page is fetched while the current one is consumed, So at most two pages are held in memory
+        :param int chat_id: chat identifier
+        :param int count: Number of members requested per page
+        :param int or None marker: Marker of the first page, None to start from the beginning
+        :param bool prefetch: Fetch the next page while the current page is consumed
+        :return: async generator of User Objects
+        :rtype: collections.abc.AsyncIterator[objects.User]
+        """
+        async def fetch_page(page_marker):
+            member_info = await self.get_chat_members(chat_id, None, page_marker, count)
+            return member_info.members, member_info.marker
+
+        async for x in utils.aiter_pages(fetch_page, marker, prefetch):
+            yield x
+
+    async def add_members(self, chat_id, user_ids):
+        """
+        Adds members to chat
+        :param int chat_id: chat identifier
+        :param list[int] user_ids: users identifier
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        resp = await self.__api.add_members(chat_id=chat_id, user_ids=user_ids)
+        self.__invalidate(chat_id, *handlers.CHAT_LOOKUPS)
+        return objects.Response.de_json(resp)
+
+    async def remove_member(self, chat_id, user_ids, block=False):
+        """
+        Removes member for chat
+        :param chat_id: chat identifier
+        :param user_ids: users identifier
+        :param block: Set to True if user should be blocked in chat
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        resp = await self.__api.remove_member(chat_id=chat_id, user_id=user_ids, block=block)
+        self.__invalidate(chat_id, *handlers.CHAT_LOOKUPS)
+        return objects.Response.de_json(resp)
+
+    async def get_messages(self, chat_id=None, message_ids=None, ffrom=None, to=None, count=50):
+        """
+        Get messages in chat
+        :param int or None chat_id: Chat identifier
+        :param int or None message_ids: Messages identifier
+        :param int or None ffrom: Start time for requested messages
+        :param int or None to: End time for requested messages
+        :param int count:
+        :return: On Success, Array of Messages
+        :rtype: list[objects.Message]
+        """
+        resp = await self.__api.get_messages(chat_id=chat_id, message_ids=message_ids, ffrom=ffrom, to=to, count=count)
+        messages = []
+        for x in resp['messages']:
+            messages.append(objects.Message.de_json(x))
+        return messages
+
+    async def iter_messages(self, chat_id, ffrom=None, to=None, count=100, prefetch=True):
+        """
+        Iterate over messages in chat from newest to oldest, page by page,
+        Each page starts at the oldest timestamp of the previous one, Messages sharing that timestamp are not repeated,
+        The next page is fetched while the current one is consumed, So at most two pages are held in memory
+        :param int chat_id: Chat identifier
+        :param int or None ffrom: Start time for requested messages, None for the latest message
+        :param int or None to: End time for requested messages, Must be less than ffrom
+        :param int count: Number of messages requested per page
+        :param bool prefetch: Fetch the next page while the current page is consumed
+        :return: async generator of Message Objects
+        :rtype: collections.abc.AsyncIterator[objects.Message]
+        """
+        async def fetch_page(page_marker):
+            page_from, seen = page_marker or (ffrom, set())
+            messages = await self.get_messages(chat_id, None, page_from, to, count)
+            page = [x for x in messages if x.body.mid not in seen]
+            if len(messages) < count or not page:
+                return page, None
+            oldest = min(x.timestamp for x in messages)
+            oldest_mids = {x.body.mid for x in messages if x.timestamp == oldest}
+            return page, (oldest, seen | oldest_mids if oldest == page_from else oldest_mids)
+
+        async for x in utils.aiter_pages(fetch_page, None, prefetch):
+            yield x
+
+    async def send_message(self, text, chat_id, user_id, attachments=None, link=None, formatter=None, notify=True,
+                           disable_link_preview=False):
+        """
+        Send a message to chat
+        :param str text: Message text
+        :param int or None chat_id: Fill this if you send message to chat
+        :param int or None user_id: Fill this parameter if you want to send message to user
+        :param list[object] attachments: Message attachments
+        :param object or None link: Link to Message
+        :param str or None formatter: Enum: "markdown" "html" If set, message text will be formatted
+        :param bool notify: If false, chat participants would not be notified
+        :param bool disable_link_preview: If false, server will not generate media preview for links in text
+        :return: On Success, a Message object
+        :rtype: objects.Message
+        """
+        await self.__throttle(chat_id or ('user', user_id))
+        resp = await self.__api.send_message(user_id=user_id, chat_id=chat_id,
+                                             disable_link_preview=disable_link_preview, text=text,
+                                             attachments=attachments, link=link, notify=notify, formatter=formatter)
+        return objects.Message.de_json(resp)
+
+    def broadcast(self, text, recipients, attachments=None, link=None, formatter=None, notify=True,
+                  disable_link_preview=False, to='chat', concurrency=100, start=0):
+        """
+        Send the same message to many chats or users, The body is serialized once and sent with at most
+        concurrency requests in flight over the pooled connections, The rate_limiter of the bot is respected
+        :param str text: Message text
+        :param iterable recipients: chat identifiers, or user identifiers when to is 'user'
+        :param list[object] attachments: Message attachments
+        :param object or None link: Link to Message
+        :param str or None formatter: Enum: "markdown" "html" If set, message text will be formatted
+        :param bool notify: If false, chat participants would not be notified
+        :param bool disable_link_preview: If false, server will not generate media preview for links in text
+        :param str to: Enum: "chat" "user" Kind of identifiers in recipients
+        :param int concurrency: Maximum number of requests in flight
+        :param int start: Number of leading recipients to skip, Pass the checkpoint of an interrupted broadcast
+        :return: iterable of BroadcastResult in completion order, Its checkpoint attribute is the resume point
+        :rtype: broadcast.AsyncBroadcast
+        """
+        if to not in broadcast.RECIPIENT_TYPES:
+            raise ValueError(f"to should be one of {broadcast.RECIPIENT_TYPES}, not {to!r}")
+        json_body = utils.json_dumps_bytes(methods.build_message_body(text, attachments, link, notify, formatter))
+
+        async def send(recipient):
+            chat_id, user_id = (recipient, None) if to == 'chat' else (None, recipient)
+            await self.__throttle(chat_id or ('user', user_id))
+            resp = await self.__api.send_message(user_id=user_id, chat_id=chat_id,
+                                                 disable_link_preview=disable_link_preview, json_body=json_body)
+            return objects.Message.de_json(resp)
+
+        return broadcast.AsyncBroadcast(send, recipients, concurrency, start)
+
+    async def edit_message(self, message_id, text, attachments=None, link=None, notify=True, formatter=None):
+        """
+        Edit existing message
+        :param str message_id: Message identifier
+        :param str text: Message text
+        :param list[object] or None attachments: Message attachments
+        :param str or None link: Link to message
+        :param bool notify: If false, chat participants would not be notified
+        :param str or None formatter: Enum: "markdown" "html" If set, message text will be formatted
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        await self.__throttle()
+        resp = await self.__api.edit_message(message_id=message_id, text=text, attachments=attachments, link=link,
+                                             notify=notify, formatter=formatter)
+        return objects.Response.de_json(resp)
+
+    async def delete_message(self, message_id):
+        """
+        Delete existing message
+        :param str message_id: Message identifier
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        await self.__throttle()
+        resp = await self.__api.delete_message(message_id=message_id)
+        return objects.Response.de_json(resp)
+
+    async def get_message(self, message_id):
+        """
+        Get existing message
+        :param str message_id: Message identifier
+        :return: On Success, a Message Object
+        :rtype: objects.Message
+        """
+        resp = await self.__api.get_message(message_id=message_id)
+        return objects.Message.de_json(resp)
+
+    async def answer_on_callback(self, callback_id, message=None, notification=False):
+        """
+        This method should be called to send an answer after a user has clicked the button
+        :param str callback_id: Identifies a button clicked by user
+        :param message: Fill this if you want to modify current message
+        :param notification: Fill this if you want to send one time notification to user
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        await self.__throttle()
+        resp = await self.__api.answer_on_callback(callback_id=callback_id, message=message, notification=notification)
+        return objects.Response.de_json(resp)
+
+    async def construct_message(self, session_id, messages=None, allow_user_input=False, hint=None, data=None,
+                                keyboard=None, placeholder=None):
+        """
+        Sends answer on construction request
+        :param str session_id: Constructor session identifier
+        :param list[object] or None messages: Array of prepared messages
+        :param bool allow_user_input: If true user can send any input manually Otherwise, only keyboard will be shown
+        :param str or None hint: Hint to user. Will be shown on top of keyboard
+        :param str or None data: In this property you can store any additional data up to 8KB,
+                                 We send this data back to bot within the next construction request,
+                                 It is handy to store here any state of construction session
+        :param object or None keyboard: Keyboard to show to user in constructor mode
+        :param str or None placeholder: Text to show over the text field
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        await self.__throttle()
+        resp = await self.__api.construct_message(session_id=session_id, messages=messages,
+                                                  allow_user_input=allow_user_input, hint=hint, data=data,
+                                                  keyboard=keyboard, placeholder=placeholder)
+        return objects.Response.de_json(resp)
+
+    async def get_subscriptions(self):
+        """
+        In case your bot gets data via WebHook, the method returns list of all subscriptions
+        :return: On Success, Array of Subscriptions object
+        :rtype: list[objects.Subscription]
+        """
+        resp = await self.__api.get_subscriptions()
+        subscriptions = []
+        for x in resp:
+            subscriptions.append(objects.Subscription.de_json(x))
+        return subscriptions
+
+    async def subscribe(self, url, update_types=None, version=None):
+        """
+        Subscribes bot to receive updates via WebHook
+        :param str url: URL of HTTP(S)-endpoint of your bot. Must starts with http(s)://
+        :param list[str] or None update_types: List of update types your bot want to receive
+        :param str or None version: Version of API, Affects model representation
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        resp = await self.__api.subscribe(url=url, update_types=update_types, version=version)
+        return objects.Response.de_json(resp)
+
+    async def unsubscribe(self, url):
+        """
+        Unsubscribes bot from receiving updates via WebHook
+        :param str url:
+        :return: On success, Response Object
+        :rtype: objects.Response
+        """
+        resp = await self.__api.unsubscribe(url=url)
+        return objects.Response.de_json(resp)
+
+    async def get_updates(self, limit=100, timeout=30, marker=None, types=None):
+        """
+        You can use this method for getting updates in case your bot is not subscribed to WebHook,
+        The method is based on long polling
+        :param int limit: Maximum number of updates to be retrieved
+        :param int timeout: Timeout in seconds for long polling
+        :param int or None marker: Pass None to get updates you didn't get yet
+        :param list[str] or None types: Comma separated list of update types your bot want to receive
+        :return: On Success, UpdateInfo object
+        :rtype: objects.UpdateInfo
+        """
+        resp = await self.__api.get_update(limit=limit, timeout=timeout, marker=marker, types=types)
+        if self.__recorder is not None:
+            # The recorder writes, And may fsync, the log file, So it runs on the default executor
+            await asyncio.get_running_loop().run_in_executor(None, self.__recorder.record, resp)
+        return objects.UpdateInfo.de_json(resp, self.__lazy_updates)
+
+    async def get_upload_url(self, data, ttype):
+        """
+        Returns the URL for the subsequent file upload
+        :param any data: file to be uploaded
+        :param ttype: type of the file
+        :return: On Success, Url of uploaded file
+        :rtype: str
+        """
+        resp = await self.__api.get_upload_url(data=data, ttype=ttype)
+        return resp
+
+    async def upload(self, source, ttype, filename=None, progress=None, chunk_size=1048576):
+        """
+        Uploads a file chunk by chunk, So the memory used does not depend on the file size,
+        A local file is read through a memory map, With an upload_cache a file already uploaded is not sent again,
+        A non seekable stream (E.g. a pipe or an HTTP response) is spooled to a temporary file first
+        :param str or os.PathLike or io.BufferedIOBase source: path of a local file or a binary file object
+        :param str ttype: Enum: "image" "video" "audio" "file" type of the file
+        :param str or None filename: file name sent to the server, Defaults to the base name of source
+        :param function or None progress: callable receiving (bytes sent, total bytes) as the upload goes on
+        :param int chunk_size: bytes read from the file at once
+        :return: On Success, the attachment payload holding the token of the uploaded file
+        :rtype: dict
+        """
+        # Spooling, hashing and the cache (E.g. SqliteUploadCache) block, So they run on the default executor
+        loop = asyncio.get_running_loop()
+        spooled = await loop.run_in_executor(None, utils.spool, source, chunk_size)
+        try:
+            key = None
+            if self.__upload_cache is not None:
+                key = await loop.run_in_executor(None, self.__upload_cache.key, spooled, ttype, chunk_size)
+                payload = await loop.run_in_executor(None, self.__upload_cache.get, key)
+                if payload is not None:
+                    return payload
+
+            resp = await self.__api.get_upload_url(ttype=ttype)
+            with utils.MultipartStream(spooled, filename or utils.source_filename(source), chunk_size=chunk_size,
+                                       progress=progress) as stream:
+                result = await self.__api.upload_file(resp['url'], stream)
+            payload = self.__upload_payload(resp, result)
+            if key is not None:
+                await loop.run_in_executor(None, self.__upload_cache.set, key, payload)
+            return payload
+        finally:
+            if spooled is not source:
+                spooled.close()
+
+    async def upload_many(self, sources, ttype, concurrency=4, progress=None, chunk_size=1048576):
+        """
+        Uploads many files at the same time, Each one chunk by chunk
+        :param list sources: paths of local files or binary file objects
+        :param str ttype: Enum: "image" "video" "audio" "file" type of the files
+        :param int concurrency: Maximum number of uploads running at the same time
+        :param function or None progress: callable receiving (source, bytes sent, total bytes) as each upload goes on
+        :param int chunk_size: bytes read from each file at once
+        :return: On Success, the attachment payloads in the order of sources
+        :rtype: list[dict]
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def upload(source):
+            file_progress = functools.partial(progress, source) if progress else None
+            async with semaphore:
+                return await self.upload(source, ttype, progress=file_progress, chunk_size=chunk_size)
+
+        return list(await asyncio.gather(*(upload(x) for x in sources)))
+
+    @staticmethod
+    def __upload_payload(resp, result):
+        payload = dict(result) if isinstance(result, dict) else {}
+        if 'token' in resp:
+            payload.setdefault('token', resp['token'])
+        return payload
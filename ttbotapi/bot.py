@@ -6,47 +6,89 @@ ttbotapi.bot
 :copyright: (c) 2022 by Mustafa Asaad.
 :license: GPLv2, see LICENSE for more details.
 """
+import collections
+import functools
+import queue
 import threading
 import time
-import re
+from concurrent.futures import ThreadPoolExecutor
 
 from . import utils
 from . import methods
 from . import objects
+from . import handlers
+from . import broadcast
 
 
 class Bot:
-    def __init__(self, access_token, proxies=None):
+    def __init__(self, access_token, proxies=None, transport=None, pool_size=10, workers=0, queue_size=100,
+                 lazy_updates=False, rate_limiter=None, cache=None, upload_cache=None, recorder=None,
+                 worker_pool=None, processes=0, checkpoint=None, dedupe=None):
         """
         Use this class to create a bot instance
         :param str access_token: Bot token gain by @PrimeBot
         :param dict or None proxies: Dictionary mapping protocol to the URL of the proxy
-        """
-        self.__access_token = access_token
-        self.__proxies = proxies
+        :param utils.Transport or None transport: pooled HTTP transport, Pass one to share connections between bots
+        :param int pool_size: Maximum number of keep-alive connections when the bot creates its own transport
+        :param int workers: Number of handler worker threads, 0 runs handlers inline on the polling thread,
+                            Updates of the same chat are handled in order while different chats run concurrently
+        :param int queue_size: Maximum number of pending updates per worker before polling waits
+        :param utils.WorkerPool or None worker_pool: handler worker pool shared with other bots, Used instead of
+                                                     workers and queue_size, The bot never stops it
+        :param int processes: Number of handler worker processes, Updates are sharded by chat over forked processes so
+                              CPU bound handlers use several cores, Updates of the same chat are handled in order,
+                              Handlers are inherited by fork so register them before polling starts,
+                              Each process has its own copy of cache, rate_limiter and any other state,
+                              Dedupe and cache invalidation run once in the poller before an update is sent
+        :param utils.CheckpointStore or None checkpoint: durable store of the polling marker, Polling resumes from it
+                                                         after a restart, A marker is committed once the handlers of
+                                                         its batch and of every batch before it finished
+        :param utils.DedupeFilter or None dedupe: drops updates already dispatched, E.g. redelivered by the WebHook
+                                                  or fetched again after a restart
+        :param bool lazy_updates: Parse each update attribute on first access instead of the whole update at once,
+                                  Updates without a handler for their update_type are never parsed
+        :param utils.RateLimiter or None rate_limiter: paces outgoing messages and actions, Calls wait for a token
+                                                       instead of failing, Pass one to share the limits between bots
+        :param utils.TTLCache or None cache: caches get_chat, get_chat_membership, get_chat_admins and get_bot_info,
+                                             Entries of a chat are invalidated by its chat_title_changed, user_added,
+                                             user_removed, bot_added and bot_removed updates
+        :param utils.UploadCache or None upload_cache: reuses the payload of a file with the same type and content
+                                                       instead of uploading it again
+        :param utils.UpdateRecorder or None recorder: appends every batch received by get_updates to an update log,
+                                                      Replay it with replay
+        """
+        self.__transport = transport or utils.Transport(pool_maxsize=pool_size)
+        self.__api = methods.Api(access_token, proxies, self.__transport)
+        self.__worker_pool = worker_pool or (utils.WorkerPool(workers, queue_size) if workers else None)
+        self.__own_worker_pool = worker_pool is None
+        self.__process_pool = utils.ProcessPool(self.__handle_payload, processes, self.__enter_worker_process,
+                                                name='HandlerProcess') if processes else None
+        self.__lazy_updates = lazy_updates
+        # Updates sent to worker processes keep their raw dict, So they are parsed lazily by the poller
+        self.__lazy_dispatch = lazy_updates or bool(processes)
+        self.__rate_limiter = rate_limiter
+        self.__cache = cache
+        self.__upload_cache = upload_cache
+        self.__recorder = recorder
+        self.__checkpoint = checkpoint
+        self.__dedupe = dedupe
+        self.__batch_marks = collections.deque()
+        self.__checkpoint_lock = threading.Lock()
 
         self.__stop_polling = threading.Event()
 
-        self.__last_marker = 0
-
-        self.__message_callback_handlers = []
-        self.__message_created_handlers = []
-        self.__message_removed_handlers = []
-        self.__message_edited_handlers = []
-        self.__bot_added_handlers = []
-        self.__bot_removed_handlers = []
-        self.__user_added_handlers = []
-        self.__user_removed_handlers = []
-        self.__bot_started_handlers = []
-        self.__chat_title_changed_handlers = []
-        self.__message_construction_request_handlers = []
-        self.__message_constructed_handlers = []
-        self.__message_chat_created_handlers = []
+        self.__last_marker = (checkpoint.load() if checkpoint else None) or 0
+        self.__fetcher = None
+        self.__batches = queue.Queue(maxsize=1)
+        self.__webhook_server = None
+
+        self.__update_handlers = handlers.HandlerRegistry()
 
     def update_handler(self, update_type='message_created', chat_type=None, bot_command=None, regexp=None, func=None):
         """
-        Update handler decorator
-        :param str or list update_type: specify one of allowed_updates to take action
+        Update handler decorator, An exception raised by a handler is logged and the next update is handled,
+        Whether handlers run inline, on worker threads or in worker processes
+        :param str or list update_type: specify one or a list of allowed_updates to take action
         :param str or list or None chat_type: list of chat types (dialog, chat, channel)
         :param str or list or None bot_command: Bot Commands like (/start, /help)
         :param str or None regexp: Sequence of characters that define a search pattern
@@ -55,282 +97,381 @@ class Bot:
         """
 
         def decorator(handler):
-            if 'message_callback' in update_type:
-                self.__message_callback_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                                  bot_command=bot_command,
-                                                                                  regexp=regexp, func=func))
-            elif 'message_created' in update_type:
-                self.__message_created_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                                 bot_command=bot_command,
-                                                                                 regexp=regexp, func=func))
-            elif 'message_removed' in update_type:
-                self.__message_removed_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                                 bot_command=bot_command,
-                                                                                 regexp=regexp, func=func))
-            elif 'message_edited' in update_type:
-                self.__message_edited_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                                bot_command=bot_command,
-                                                                                regexp=regexp, func=func))
-            elif 'bot_added' in update_type:
-                self.__bot_added_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                           bot_command=bot_command,
-                                                                           regexp=regexp, func=func))
-            elif 'bot_removed' in update_type:
-                self.__bot_removed_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                             bot_command=bot_command,
-                                                                             regexp=regexp, func=func))
-            elif 'user_added' in update_type:
-                self.__user_added_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                            bot_command=bot_command,
-                                                                            regexp=regexp, func=func))
-            elif 'user_removed' in update_type:
-                self.__user_removed_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                              bot_command=bot_command,
-                                                                              regexp=regexp, func=func))
-            elif 'bot_started' in update_type:
-                self.__bot_started_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                             bot_command=bot_command,
-                                                                             regexp=regexp, func=func))
-            elif 'chat_title_changed' in update_type:
-                self.__chat_title_changed_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                                    bot_command=bot_command,
-                                                                                    regexp=regexp, func=func))
-            elif 'message_construction_request' in update_type:
-                self.__message_construction_request_handlers.append(
-                    self.__build_handler_dict(handler, chat_type=chat_type,
-                                              bot_command=bot_command,
-                                              regexp=regexp, func=func))
-            elif 'message_constructed' in update_type:
-                self.__message_constructed_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                                     bot_command=bot_command,
-                                                                                     regexp=regexp, func=func))
-            elif 'message_chat_created' in update_type:
-                self.__message_chat_created_handlers.append(self.__build_handler_dict(handler, chat_type=chat_type,
-                                                                                      bot_command=bot_command,
-                                                                                      regexp=regexp, func=func))
+            self.__update_handlers.add(update_type, handler, chat_type=chat_type, bot_command=bot_command,
+                                       regexp=regexp, func=func)
             return handler
 
         return decorator
 
-    @staticmethod
-    def __build_handler_dict(handler, **filters):
-        """
-        Builds a dictionary for a handler
-        :param handler: functions name
-        :param filters: functions filters
-        :return: Return Dictionary type for handlers
-        :rtype: dict
-        """
-        return {
-            'function': handler,
-            'filters': filters
-        }
-
-    def polling(self, none_stop=False, limit=100, timeout=30, types=None):
+    def polling(self, none_stop=False, limit=100, timeout=30, types=None, pipelined=False):
         """
         This function creates a new Thread that calls an internal __retrieve_updates function
         This allows the bot to retrieve Updates automatically and notify listeners and message handlers accordingly
         Warning: Do not call this function more than once!
         Always get updates
-        :param bool none_stop: Do not stop polling when an ApiException occurs
+        :param bool none_stop: Do not stop polling when an ApiException or a connection error occurs,
+                               Polling waits a jittered backoff, capped at 30 seconds and reset after a success
         :param limit:
         :param int timeout: Timeout in seconds for long polling
         :param types:
+        :param bool pipelined: Fetch the next batch on a background thread while the current batch is dispatched
         :return:
         """
         interval = 0
-        error_interval = 0.25
+        errors = 0
         utils.logger.info('POLLING STARTED')
+        self.__stop_polling.clear()
+        self.start_process_pool()
+        flusher = None
+        if self.__checkpoint is not None:
+            flusher = threading.Thread(target=self.__flush_checkpoints, name='CheckpointFlusher', daemon=True)
+            flusher.start()
 
         while not self.__stop_polling.wait(interval):
             try:
-                self.__retrieve_updates(limit, timeout, types)
-            except utils.ApiException as e:
+                if pipelined:
+                    self.__retrieve_pipelined_updates(limit, timeout, types)
+                else:
+                    self.__retrieve_updates(limit, timeout, types)
+                errors = 0
+            except (utils.ApiException,) + self.__transport.connection_errors as e:
                 utils.logger.error(e)
                 if not none_stop:
                     self.__stop_polling.set()
                     utils.logger.info("Exception Occurred, POLLING STOPPED")
                 else:
-                    utils.logger.info(f"Waiting for {error_interval} seconds until retry")
+                    error_interval = utils.backoff_delay(errors, 0.25, 30)
+                    errors += 1
+                    utils.logger.info(f"Waiting for {error_interval:.2f} seconds until retry")
                     time.sleep(error_interval)
-                    error_interval *= 2
             except KeyboardInterrupt:
                 utils.logger.info("KeyboardInterrupt Occurred")
                 self.__stop_polling.set()
                 utils.logger.info('POLLING STOPPED')
                 break
 
-    def __retrieve_updates(self, limit, timeout, types=None):
+        if pipelined:
+            self.__drain_pipelined_updates()
+        self.__stop_worker_pool()
+        if flusher is not None:
+            flusher.join()
+        self.flush_checkpoint()
+
+    def stop_polling(self):
         """
-        Retrieves any updates from the TamTam API
+        Stops polling after the current get_updates call returns
+        """
+        self.__stop_polling.set()
+
+    def webhook(self, host='0.0.0.0', port=8080, path='/', secret=None, queue_size=1000, certfile=None, keyfile=None):
+        """
+        Receives Updates pushed by TamTam to the url passed to subscribe and notify handlers accordingly,
+        Updates go through the same dispatch pipeline as polling, This function blocks until stop_webhook is called
+        :param str host: Interface to listen on
+        :param int port: Port to listen on
+        :param str path: Url path of the webhook
+        :param str or None secret: Secret path segment appended to path, Subscribe with url ending in path/secret
+        :param int queue_size: Maximum number of received updates waiting to be dispatched
+        :param str or None certfile: TLS certificate file, Serve https when set
+        :param str or None keyfile: TLS private key file
+        :return:
+        """
+        self.start_process_pool()
+        self.__webhook_server = utils.WebhookServer(self.__process_webhook_updates, host, port, path, secret,
+                                                    queue_size, certfile=certfile, keyfile=keyfile)
+        try:
+            self.__webhook_server.serve_forever()
+        except KeyboardInterrupt:
+            utils.logger.info("KeyboardInterrupt Occurred")
+        finally:
+            self.__stop_worker_pool()
+
+    def stop_webhook(self):
+        """
+        Stops the WebHook server, The updates already received are dispatched first
+        """
+        if self.__webhook_server:
+            self.__webhook_server.stop()
+
+    def replay(self, log, speed=1.0, start=None, end=None):
+        """
+        Feeds an update log recorded with a recorder through the handlers, Nothing is requested from the API,
+        This function blocks until the log ends or stop_polling is called
+        :param str or utils.UpdateLog log: log file or an opened UpdateLog
+        :param float or None speed: 1.0 for the original speed, 2.0 for twice as fast, None or 0 for full speed
+        :param float or None start: Skip batches recorded before this unix time
+        :param float or None end: Stop at the first batch recorded after this unix time
+        :return: Number of replayed updates
+        :rtype: int
+        """
+        update_log = utils.UpdateLog(log) if isinstance(log, str) else log
+        update_class = objects.LazyUpdate if self.__lazy_dispatch else objects.Update
+        replayed = 0
+        self.__stop_polling.clear()
+        self.start_process_pool()
+        try:
+            for batch in update_log.replay(speed, start, end):
+                if self.__stop_polling.is_set():
+                    break
+                self.process_new_updates([update_class.de_json(x) for x in batch])
+                replayed += len(batch)
+        except KeyboardInterrupt:
+            utils.logger.info("KeyboardInterrupt Occurred")
+        finally:
+            if update_log is not log:
+                update_log.close()
+            self.__stop_worker_pool()
+        return replayed
+
+    def __process_webhook_updates(self, bodies):
+        """
+        Parses raw WebHook bodies and notifies handlers
+        :param list[bytes] bodies: raw update bodies
         :return:
         """
-        marker = (self.__last_marker + 1)
-        updates = self.get_updates(limit, timeout, marker, types)
+        updates = []
+        update_class = objects.LazyUpdate if self.__lazy_dispatch else objects.Update
+        for body in bodies:
+            try:
+                updates.append(update_class.de_json(body))
+            except (ValueError, KeyError) as e:
+                utils.logger.error(f"Invalid WebHook update {e!r}")
+        self.process_new_updates(updates)
+
+    def poll_once(self, limit=100, timeout=30, types=None):
+        """
+        Retrieves one batch of updates and notifies handlers, Use it to drive the bot from your own loop or scheduler
+        :param int limit: Maximum number of updates to be retrieved
+        :param int timeout: Timeout in seconds for long polling, 0 returns at once
+        :param list[str] or None types: Comma separated list of update types your bot want to receive
+        :return: Number of retrieved updates
+        :rtype: int
+        """
+        self.start_process_pool()
+        return self.__retrieve_updates(limit, timeout, types)
+
+    @property
+    def next_marker(self):
+        """
+        The marker the next get_updates call passes, So updates that were dispatched are not fetched again
+        :rtype: int
+        """
+        return self.__last_marker + 1
+
+    def dispatch_updates(self, resp):
+        """
+        Notifies handlers about a get_updates response fetched outside the bot (E.g. by BotRunner), It is recorded
+        and its marker is committed like a batch retrieved by poll_once
+        :param dict resp: get_updates response, The JSON object with updates and marker
+        :return: Number of dispatched updates
+        :rtype: int
+        """
+        updates = self.__parse_updates(resp)
         self.__process_new_updates(updates)
+        return len(updates.updates)
 
-    def __process_new_updates(self, updates):
-        new_message_callback = []
-        new_message_created = []
-        new_message_removed = []
-        new_message_edited = []
-        new_bot_added = []
-        new_bot_removed = []
-        new_user_added = []
-        new_user_removed = []
-        new_bot_started = []
-        new_chat_title_changed = []
-        new_message_construction_request = []
-        new_message_constructed = []
-        new_message_chat_created = []
+    def stop(self):
+        """
+        Stops the worker processes and the worker pool owned by the bot once their queued updates are handled,
+        Then writes the checkpoint, polling does it when it stops, Call it when you drive the bot with poll_once,
+        dispatch_updates or process_new_updates
+        """
+        self.__stop_worker_pool()
+        self.flush_checkpoint()
 
-        if updates.marker > self.__last_marker:
-            self.__last_marker = updates.marker
-        for update in updates.updates:
-            if update.update_type == 'message_callback':
-                new_message_callback.append(update)
-            if update.update_type == 'message_created':
-                new_message_created.append(update)
-            if update.update_type == 'message_removed':
-                new_message_removed.append(update)
-            if update.update_type == 'message_edited':
-                new_message_edited.append(update)
-            if update.update_type == 'bot_added':
-                new_bot_added.append(update)
-            if update.update_type == 'bot_removed':
-                new_bot_removed.append(update)
-            if update.update_type == 'user_added':
-                new_user_added.append(update)
-            if update.update_type == 'user_removed':
-                new_user_removed.append(update)
-            if update.update_type == 'bot_started':
-                new_bot_started.append(update)
-            if update.update_type == 'chat_title_changed':
-                new_chat_title_changed.append(update)
-            if update.update_type == 'message_construction_request':
-                new_message_construction_request.append(update)
-            if update.update_type == 'message_constructed':
-                new_message_constructed.append(update)
-            if update.update_type == 'message_chat_created':
-                new_message_chat_created.append(update)
-
-        if len(updates.updates) > 0:
-            if len(new_message_callback) > 0:
-                self.__process_new_message_callback(new_message_callback)
-            if len(new_message_created) > 0:
-                self.__process_new_message_created(new_message_created)
-            if len(new_message_removed) > 0:
-                self.__process_new_message_removed(new_message_removed)
-            if len(new_message_edited) > 0:
-                self.__process_new_message_edited(new_message_edited)
-            if len(new_bot_added) > 0:
-                self.__process_new_bot_added(new_bot_added)
-            if len(new_bot_removed) > 0:
-                self.__process_new_bot_removed(new_bot_removed)
-            if len(new_user_added) > 0:
-                self.__process_new_user_added(new_user_added)
-            if len(new_user_removed) > 0:
-                self.__process_new_user_removed(new_user_removed)
-            if len(new_bot_started) > 0:
-                self.__process_new_bot_started(new_bot_started)
-            if len(new_message_construction_request) > 0:
-                self.__process_new_message_construction_request(new_message_construction_request)
-            if len(new_message_constructed) > 0:
-                self.__process_new_message_constructed(new_message_constructed)
-            if len(new_message_chat_created) > 0:
-                self.__process_new_message_chat_created(new_message_chat_created)
-
-    def __check_update_handler(self, update_handler, update):
-        """
-        check update handler
-        :param update_handler:
-        :param update:
-        :return:
+    def __retrieve_updates(self, limit, timeout, types=None):
         """
-        for filters, filter_value in update_handler['filters'].items():
-            if filter_value is None:
-                continue
+        Retrieves any updates from the TamTam API
+        :return: Number of retrieved updates
+        """
+        updates = self.get_updates(limit, timeout, self.next_marker, types)
+        self.__process_new_updates(updates)
+        return len(updates.updates)
 
-            if not self.__check_filter(filters, filter_value, update):
-                return False
+    def __fetch_updates(self, limit, timeout, types):
+        """
+        Retrieves updates on the fetcher thread, The next request is sent as soon as a batch arrives,
+        Any exception is handed over to the polling thread and ends the fetcher
+        :return:
+        """
+        marker = self.__last_marker
+        while not self.__stop_polling.is_set():
+            try:
+                updates = self.get_updates(limit, timeout, marker + 1, types)
+            except Exception as e:
+                self.__batches.put(e)
+                break
+            if updates.marker and updates.marker > marker:
+                marker = updates.marker
+            self.__batches.put(updates)
 
-        return True
+    def __retrieve_pipelined_updates(self, limit, timeout, types=None):
+        """
+        Dispatches the next prefetched batch, Starts the fetcher thread when it is not running
+        :return:
+        """
+        if self.__fetcher is None or not self.__fetcher.is_alive():
+            self.__fetcher = threading.Thread(target=self.__fetch_updates, args=(limit, timeout, types),
+                                              name='FetcherThread', daemon=True)
+            self.__fetcher.start()
+        updates = self.__batches.get()
+        if isinstance(updates, Exception):
+            raise updates
+        self.__process_new_updates(updates)
 
-    @staticmethod
-    def __check_filter(filters, filter_value, update):
+    def __drain_pipelined_updates(self):
         """
-        check filters
-        :param filters:
-        :param filter_value:
-        :param update:
+        Waits for the in-flight request and dispatches the batches already fetched,
+        Their marker has been sent to the server, So dropping them would lose updates
         :return:
         """
-        if filters == 'chat_type':
-            return update.message.recipient.chat_type in filter_value
-        elif filters == 'regexp':
-            return update.message.body.text and re.search(filter_value, update.message.body.text, re.IGNORECASE)
-        elif filters == 'func':
-            return filter_value(update)
-        elif filters == 'bot_command':
-            return update.message.body.text in filter_value
-        else:
-            return False
+        while (self.__fetcher is not None and self.__fetcher.is_alive()) or not self.__batches.empty():
+            try:
+                updates = self.__batches.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if not isinstance(updates, Exception):
+                self.__process_new_updates(updates)
+        self.__fetcher = None
 
-    @staticmethod
-    def __exec_task(task, *args, **kwargs):
-        task(*args, **kwargs)
+    def __process_new_updates(self, updates):
+        if updates.marker > self.__last_marker:
+            self.__last_marker = updates.marker
+        self.process_new_updates(updates.updates)
+        if self.__checkpoint is not None and updates.marker:
+            pool = self.__process_pool or self.__worker_pool
+            self.__batch_marks.append((updates.marker, pool.mark() if pool else None))
+            self.__commit_checkpoint()
 
-    def __notify_update_handler(self, handlers, new_updates):
+    def __commit_checkpoint(self):
         """
-        Notifies update handlers
-        :param list handlers:
-        :param list new_updates:
+        Commits the marker of the last batch whose handlers, and the handlers of every batch before it, finished
         :return:
         """
-        for update in new_updates:
-            for update_handler in handlers:
-                if self.__check_update_handler(update_handler, update):
-                    self.__exec_task(update_handler['function'], update)
+        pool = self.__process_pool or self.__worker_pool
+        marker = None
+        with self.__checkpoint_lock:
+            while self.__batch_marks:
+                mark = self.__batch_marks[0][1]
+                if mark is not None and pool is not None and not pool.done(mark):
                     break
+                marker = self.__batch_marks.popleft()[0]
+            if marker is not None:
+                self.__checkpoint.commit(marker)
 
-    def __process_new_message_callback(self, new_message_callback):
-        self.__notify_update_handler(self.__message_callback_handlers, new_message_callback)
+    def __flush_checkpoints(self):
+        """
+        Runs on the flusher thread while polling, Commits the batches whose handlers finished since the last batch
+        arrived and writes the checkpoint once its interval passed, So a long poll without updates does not hold them
+        """
+        while not self.__stop_polling.wait(max(self.__checkpoint.interval / 2, 0.05)):
+            self.__commit_checkpoint()
+            self.__checkpoint.flush_due()
 
-    def __process_new_message_created(self, new_message_created):
-        self.__notify_update_handler(self.__message_created_handlers, new_message_created)
+    def flush_checkpoint(self):
+        """
+        Commits the markers of the batches whose handlers finished and writes the checkpoint now,
+        Polling calls it when it stops
+        """
+        if self.__checkpoint is not None:
+            self.__commit_checkpoint()
+            self.__checkpoint.flush()
 
-    def __process_new_message_removed(self, new_message_removed):
-        self.__notify_update_handler(self.__message_removed_handlers, new_message_removed)
+    def process_new_updates(self, updates):
+        """
+        Notifies handlers about updates received by any source (polling, WebHook or your own server)
+        :param list[objects.Update] updates: list of updates
+        :return:
+        """
+        self.start_process_pool()
+        for update in updates:
+            if self.__dedupe is not None and self.__dedupe.is_duplicate(update):
+                continue
+            if self.__cache is not None and update.update_type in handlers.CACHE_INVALIDATIONS:
+                self.__invalidate(update.chat_id, *handlers.CACHE_INVALIDATIONS[update.update_type])
+            if self.__update_handlers.get(update.update_type):
+                if self.__process_pool and isinstance(update, objects.LazyUpdate):
+                    self.__process_pool.submit(self.__get_update_key(update), utils.json_dumps_bytes(update.raw))
+                elif self.__worker_pool:
+                    self.__worker_pool.submit(self.__get_update_key(update), self.__handle_update, update)
+                else:
+                    self.__handle_update(update)
 
-    def __process_new_message_edited(self, new_message_edited):
-        self.__notify_update_handler(self.__message_edited_handlers, new_message_edited)
+    def start_process_pool(self):
+        """
+        Forks the handler worker processes when processes is set, polling, poll_once, webhook and replay call it,
+        Call it yourself from the main thread before starting other threads (E.g. before BotRunner starts) since
+        only the calling thread survives a fork
+        """
+        if self.__process_pool:
+            self.__process_pool.start()
 
-    def __process_new_bot_started(self, new_bot_started):
-        self.__notify_update_handler(self.__bot_started_handlers, new_bot_started)
+    def __stop_worker_pool(self):
+        if self.__process_pool:
+            self.__process_pool.stop()
+        if self.__worker_pool and self.__own_worker_pool:
+            self.__worker_pool.stop()
 
-    def __process_new_bot_removed(self, new_bot_removed):
-        self.__notify_update_handler(self.__bot_removed_handlers, new_bot_removed)
+    def __enter_worker_process(self):
+        """
+        Runs in each forked worker process, Updates received there are handled inline
+        """
+        self.__process_pool = None
+        self.__worker_pool = None
 
-    def __process_new_user_added(self, new_user_added):
-        self.__notify_update_handler(self.__user_added_handlers, new_user_added)
+    def __handle_payload(self, payload):
+        """
+        Handles an update sent to a worker process as raw json, The poller already ran dedupe and the cache
+        invalidation of the update
+        :param bytes payload: raw update
+        """
+        update_class = objects.LazyUpdate if self.__lazy_updates else objects.Update
+        self.__handle_update(update_class.de_json(payload))
 
-    def __process_new_user_removed(self, new_user_removed):
-        self.__notify_update_handler(self.__user_removed_handlers, new_user_removed)
+    def __cached(self, key, load):
+        if self.__cache is None:
+            return load()
+        return self.__cache.get_or_load(key, load)
 
-    def __process_new_bot_added(self, new_bot_added):
-        self.__notify_update_handler(self.__bot_added_handlers, new_bot_added)
+    def __invalidate(self, chat_id, *lookups):
+        if self.__cache is not None:
+            self.__cache.invalidate(*((x, chat_id) for x in lookups))
 
-    def __process_new_chat_title_changed(self, new_chat_title_changed):
-        self.__notify_update_handler(self.__chat_title_changed_handlers, new_chat_title_changed)
+    def __throttle(self, chat_id=None):
+        if self.__rate_limiter:
+            self.__rate_limiter.acquire(chat_id)
 
-    def __process_new_message_construction_request(self, new_message_construction_request):
-        self.__notify_update_handler(self.__message_construction_request_handlers, new_message_construction_request)
+    @staticmethod
+    def __exec_task(task, *args, **kwargs):
+        try:
+            task(*args, **kwargs)
+        except Exception as e:
+            utils.logger.error(f"Handler {getattr(task, '__name__', task)} raised {e!r}")
 
-    def __process_new_message_constructed(self, new_message_constructed):
-        self.__notify_update_handler(self.__message_constructed_handlers, new_message_constructed)
+    @staticmethod
+    def __get_update_key(update):
+        """
+        Returns the ordering key of an update, Updates with the same key are handled in order
+        :param objects.Update update:
+        :return: chat or user identifier
+        """
+        if update.message and update.message.recipient:
+            return update.message.recipient.chat_id or update.message.recipient.user_id
+        if update.chat_id:
+            return update.chat_id
+        if update.user:
+            return update.user.user_id
+        return update.user_id
 
-    def __process_new_message_chat_created(self, new_message_chat_created):
-        self.__notify_update_handler(self.__message_chat_created_handlers, new_message_chat_created)
+    def __handle_update(self, update):
+        """
+        Executes the first update handler whose filters match the update
+        :param objects.Update update:
+        :return:
+        """
+        update_handler = self.__update_handlers.find_handler(update)
+        if update_handler:
+            self.__exec_task(update_handler['function'], update)
 
     def get_bot_info(self):
         """
@@ -338,8 +479,11 @@ class Bot:
         :return: On Success, a User object
         :rtype: objects.User
         """
-        resp = methods.get_bot_info(self.__access_token, self.__proxies)
-        return objects.User.de_json(resp)
+        def load():
+            resp = self.__api.get_bot_info()
+            return objects.User.de_json(resp)
+
+        return self.__cached(('get_bot_info',), load)
 
     def edit_bot_info(self, name=None, username=None, description=None, commands=None, photo=None):
         """
@@ -354,7 +498,10 @@ class Bot:
         :return: On Success, a User object
         :rtype: objects.User
         """
-        resp = methods.edit_bot_info(self.__access_token, name, username, description, commands, photo, self.__proxies)
+        resp = self.__api.edit_bot_info(name=name, username=username, description=description, commands=commands,
+                                        photo=photo)
+        if self.__cache is not None:
+            self.__cache.invalidate(('get_bot_info',))
         return objects.User.de_json(resp)
 
     def get_all_chats(self, count=50, marker=None):
@@ -365,9 +512,25 @@ class Bot:
         :return: On Success, ChatInfo Object
         :rtype: objects.ChatInfo
         """
-        resp = methods.get_all_chats(self.__access_token, count, marker, self.__proxies)
+        resp = self.__api.get_all_chats(count=count, marker=marker)
         return objects.ChatInfo.de_json(resp)
 
+    def iter_all_chats(self, count=100, marker=None, prefetch=True):
+        """
+        Iterate over all chats that bot participated in, following markers page by page,
+        The next page is fetched while the current one is consumed, So at most two pages are held in memory
+        :param int count: Number of chats requested per page
+        :param int or None marker: Marker of the first page, None to start from the beginning
+        :param bool prefetch: Fetch the next page while the current page is consumed
+        :return: generator of Chat Objects
+        :rtype: collections.abc.Iterator[objects.Chat]
+        """
+        def fetch_page(page_marker):
+            chat_info = self.get_all_chats(count, page_marker)
+            return chat_info.chats, chat_info.marker
+
+        return utils.iter_pages(fetch_page, marker, prefetch)
+
     def get_chat_by_link(self, chat_link):
         """
         Get chat/channel information by its public link or dialog with user by username
@@ -375,7 +538,7 @@ class Bot:
         :return: On Success, a Chat Object
         :rtype: objects.Chat
         """
-        resp = methods.get_chat_by_link(self.__access_token, chat_link, self.__proxies)
+        resp = self.__api.get_chat_by_link(chat_link=chat_link)
         return objects.Chat.de_json(resp)
 
     def get_chat(self, chat_link):
@@ -385,8 +548,11 @@ class Bot:
         :return: On Success, a Chat Object
         :rtype: objects.Chat
         """
-        resp = methods.get_chat(self.__access_token, chat_link, self.__proxies)
-        return objects.Chat.de_json(resp)
+        def load():
+            resp = self.__api.get_chat(chat_id=chat_link)
+            return objects.Chat.de_json(resp)
+
+        return self.__cached(('get_chat', chat_link), load)
 
     def edit_chat_info(self, chat_id, icon=None, title=None, pin=None, notify=True):
         """
@@ -399,7 +565,8 @@ class Bot:
         :return: On Success, a Chat Object
         :rtype: objects.Chat
         """
-        resp = methods.edit_chat_info(self.__access_token, chat_id, icon, title, pin, notify, self.__proxies)
+        resp = self.__api.edit_chat_info(chat_id=chat_id, icon=icon, title=title, pin=pin, notify=notify)
+        self.__invalidate(chat_id, 'get_chat')
         return objects.Chat.de_json(resp)
 
     def send_action(self, chat_id, action):
@@ -411,7 +578,8 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.send_action(self.__access_token, chat_id, action, self.__proxies)
+        self.__throttle(chat_id)
+        resp = self.__api.send_action(chat_id=chat_id, action=action)
         return objects.Response.de_json(resp)
 
     def get_pinned_message(self, chat_id):
@@ -421,7 +589,7 @@ class Bot:
         :return: On success, a Message Object
         :rtype: objects.Message
         """
-        resp = methods.get_pinned_message(self.__access_token, chat_id, self.__proxies)
+        resp = self.__api.get_pinned_message(chat_id=chat_id)
         if resp:
             return objects.Message.de_json(resp['message'])
         return resp
@@ -435,7 +603,7 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.pin_message(self.__access_token, chat_id, message_id, notify, self.__proxies)
+        resp = self.__api.pin_message(chat_id=chat_id, message_id=message_id, notify=notify)
         return objects.Response.de_json(resp)
 
     def unpin_message(self, chat_id):
@@ -445,7 +613,7 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.unpin_message(self.__access_token, chat_id, self.__proxies)
+        resp = self.__api.unpin_message(chat_id=chat_id)
         return objects.Response.de_json(resp)
 
     def get_chat_membership(self, chat_id):
@@ -455,8 +623,11 @@ class Bot:
         :return: User Object, On success
         :rtype: objects.User
         """
-        resp = methods.get_chat_membership(self.__access_token, chat_id, self.__proxies)
-        return objects.User.de_json(resp)
+        def load():
+            resp = self.__api.get_chat_membership(chat_id=chat_id)
+            return objects.User.de_json(resp)
+
+        return self.__cached(('get_chat_membership', chat_id), load)
 
     def leave_chat(self, chat_id):
         """
@@ -465,7 +636,8 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.leave_chat(self.__access_token, chat_id, self.__proxies)
+        resp = self.__api.leave_chat(chat_id=chat_id)
+        self.__invalidate(chat_id, *handlers.CHAT_LOOKUPS)
         return objects.Response.de_json(resp)
 
     def get_chat_admins(self, chat_id):
@@ -475,8 +647,11 @@ class Bot:
         :return: On success, MemberInfo
         :rtype: objects.MemberInfo
         """
-        resp = methods.get_chat_admins(self.__access_token, chat_id, self.__proxies)
-        return objects.MemberInfo.de_json(resp)
+        def load():
+            resp = self.__api.get_chat_admins(chat_id=chat_id)
+            return objects.MemberInfo.de_json(resp)
+
+        return self.__cached(('get_chat_admins', chat_id), load)
 
     def get_chat_members(self, chat_id, user_ids=None, marker=None, count=20):
         """
@@ -488,9 +663,26 @@ class Bot:
         :return: On success, MemberInfo
         :rtype: objects.MemberInfo
         """
-        resp = methods.get_members(self.__access_token, chat_id, user_ids, marker, count, self.__proxies)
+        resp = self.__api.get_members(chat_id=chat_id, user_ids=user_ids, marker=marker, count=count)
         return objects.MemberInfo.de_json(resp)
 
+    def iter_chat_members(self, chat_id, count=100, marker=None, prefetch=True):
+        """
+        Iterate over all users participated in chat, following markers page by page,
+        The next page is fetched while the current one is consumed, So at most two pages are held in memory
+        :param int chat_id: chat identifier
+        :param int count: Number of members requested per page
+        :param int or None marker: Marker of the first page, None to start from the beginning
+        :param bool prefetch: Fetch the next page while the current page is consumed
+        :return: generator of User Objects
+        :rtype: collections.abc.Iterator[objects.User]
+        """
+        def fetch_page(page_marker):
+            member_info = self.get_chat_members(chat_id, None, page_marker, count)
+            return member_info.members, member_info.marker
+
+        return utils.iter_pages(fetch_page, marker, prefetch)
+
     def add_members(self, chat_id, user_ids):
         """
         Adds members to chat
@@ -499,7 +691,8 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.add_members(self.__access_token, chat_id, user_ids, self.__proxies)
+        resp = self.__api.add_members(chat_id=chat_id, user_ids=user_ids)
+        self.__invalidate(chat_id, *handlers.CHAT_LOOKUPS)
         return objects.Response.de_json(resp)
 
     def remove_member(self, chat_id, user_ids, block=False):
@@ -511,7 +704,8 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.remove_member(self.__access_token, chat_id, user_ids, block, self.__proxies)
+        resp = self.__api.remove_member(chat_id=chat_id, user_id=user_ids, block=block)
+        self.__invalidate(chat_id, *handlers.CHAT_LOOKUPS)
         return objects.Response.de_json(resp)
 
     def get_messages(self, chat_id=None, message_ids=None, ffrom=None, to=None, count=50):
@@ -525,12 +719,37 @@ class Bot:
         :return: On Success, Array of Messages
         :rtype: list[objects.Message]
         """
-        resp = methods.get_messages(self.__access_token, chat_id, message_ids, ffrom, to, count, self.__proxies)
+        resp = self.__api.get_messages(chat_id=chat_id, message_ids=message_ids, ffrom=ffrom, to=to, count=count)
         messages = []
-        for x in resp:
+        for x in resp['messages']:
             messages.append(objects.Message.de_json(x))
         return messages
 
+    def iter_messages(self, chat_id, ffrom=None, to=None, count=100, prefetch=True):
+        """
+        Iterate over messages in chat from newest to oldest, page by page,
+        Each page starts at the oldest timestamp of the previous one, Messages sharing that timestamp are not repeated,
+        The next page is fetched while the current one is consumed, So at most two pages are held in memory
+        :param int chat_id: Chat identifier
+        :param int or None ffrom: Start time for requested messages, None for the latest message
+        :param int or None to: End time for requested messages, Must be less than ffrom
+        :param int count: Number of messages requested per page
+        :param bool prefetch: Fetch the next page while the current page is consumed
+        :return: generator of Message Objects
+        :rtype: collections.abc.Iterator[objects.Message]
+        """
+        def fetch_page(page_marker):
+            page_from, seen = page_marker or (ffrom, set())
+            messages = self.get_messages(chat_id, None, page_from, to, count)
+            page = [x for x in messages if x.body.mid not in seen]
+            if len(messages) < count or not page:
+                return page, None
+            oldest = min(x.timestamp for x in messages)
+            oldest_mids = {x.body.mid for x in messages if x.timestamp == oldest}
+            return page, (oldest, seen | oldest_mids if oldest == page_from else oldest_mids)
+
+        return utils.iter_pages(fetch_page, None, prefetch)
+
     def send_message(self, text, chat_id, user_id, attachments=None, link=None, formatter=None, notify=True,
                      disable_link_preview=False):
         """
@@ -546,10 +765,43 @@ class Bot:
         :return: On Success, a Message object
         :rtype: objects.Message
         """
-        resp = methods.send_message(self.__access_token, user_id, chat_id, disable_link_preview, text, attachments,
-                                    link, notify, formatter, self.__proxies)
+        self.__throttle(chat_id or ('user', user_id))
+        resp = self.__api.send_message(user_id=user_id, chat_id=chat_id, disable_link_preview=disable_link_preview,
+                                       text=text, attachments=attachments, link=link, notify=notify,
+                                       formatter=formatter)
         return objects.Message.de_json(resp)
 
+    def broadcast(self, text, recipients, attachments=None, link=None, formatter=None, notify=True,
+                  disable_link_preview=False, to='chat', concurrency=8, start=0):
+        """
+        Send the same message to many chats or users, The body is serialized once and sent with at most
+        concurrency requests in flight over the pooled connections, The rate_limiter of the bot is respected
+        :param str text: Message text
+        :param iterable recipients: chat identifiers, or user identifiers when to is 'user'
+        :param list[object] attachments: Message attachments
+        :param object or None link: Link to Message
+        :param str or None formatter: Enum: "markdown" "html" If set, message text will be formatted
+        :param bool notify: If false, chat participants would not be notified
+        :param bool disable_link_preview: If false, server will not generate media preview for links in text
+        :param str to: Enum: "chat" "user" Kind of identifiers in recipients
+        :param int concurrency: Maximum number of requests in flight
+        :param int start: Number of leading recipients to skip, Pass the checkpoint of an interrupted broadcast
+        :return: iterable of BroadcastResult in completion order, Its checkpoint attribute is the resume point
+        :rtype: broadcast.Broadcast
+        """
+        if to not in broadcast.RECIPIENT_TYPES:
+            raise ValueError(f"to should be one of {broadcast.RECIPIENT_TYPES}, not {to!r}")
+        json_body = utils.json_dumps_bytes(methods.build_message_body(text, attachments, link, notify, formatter))
+
+        def send(recipient):
+            chat_id, user_id = (recipient, None) if to == 'chat' else (None, recipient)
+            self.__throttle(chat_id or ('user', user_id))
+            resp = self.__api.send_message(user_id=user_id, chat_id=chat_id, disable_link_preview=disable_link_preview,
+                                           json_body=json_body)
+            return objects.Message.de_json(resp)
+
+        return broadcast.Broadcast(send, recipients, concurrency, start)
+
     def edit_message(self, message_id, text, attachments=None, link=None, notify=True, formatter=None):
         """
         Edit existing message
@@ -562,8 +814,9 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.edit_message(self.__access_token, message_id, text, attachments, link, notify, formatter,
-                                    self.__proxies)
+        self.__throttle()
+        resp = self.__api.edit_message(message_id=message_id, text=text, attachments=attachments, link=link,
+                                       notify=notify, formatter=formatter)
         return objects.Response.de_json(resp)
 
     def delete_message(self, message_id):
@@ -573,7 +826,8 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.delete_message(self.__access_token, message_id, self.__proxies)
+        self.__throttle()
+        resp = self.__api.delete_message(message_id=message_id)
         return objects.Response.de_json(resp)
 
     def get_message(self, message_id):
@@ -583,7 +837,7 @@ class Bot:
         :return: On Success, a Message Object
         :rtype: objects.Message
         """
-        resp = methods.get_message(self.__access_token, message_id, self.__proxies)
+        resp = self.__api.get_message(message_id=message_id)
         return objects.Message.de_json(resp)
 
     def answer_on_callback(self, callback_id, message=None, notification=False):
@@ -595,7 +849,8 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.answer_on_callback(self.__access_token, callback_id, message, notification, self.__proxies)
+        self.__throttle()
+        resp = self.__api.answer_on_callback(callback_id=callback_id, message=message, notification=notification)
         return objects.Response.de_json(resp)
 
     def construct_message(self, session_id, messages=None, allow_user_input=False, hint=None, data=None, keyboard=None,
@@ -614,8 +869,9 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.construct_message(self.__access_token, session_id, messages, allow_user_input, hint, data,
-                                         keyboard, placeholder, self.__proxies)
+        self.__throttle()
+        resp = self.__api.construct_message(session_id=session_id, messages=messages, allow_user_input=allow_user_input,
+                                            hint=hint, data=data, keyboard=keyboard, placeholder=placeholder)
         return objects.Response.de_json(resp)
 
     def get_subscriptions(self):
@@ -624,7 +880,7 @@ class Bot:
         :return: On Success, Array of Subscriptions object
         :rtype: list[objects.Subscription]
         """
-        resp = methods.get_subscriptions(self.__access_token, self.__proxies)
+        resp = self.__api.get_subscriptions()
         subscriptions = []
         for x in resp:
             subscriptions.append(objects.Subscription.de_json(x))
@@ -639,7 +895,7 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.subscribe(self.__proxies, url, update_types, version, self.__proxies)
+        resp = self.__api.subscribe(url=url, update_types=update_types, version=version)
         return objects.Response.de_json(resp)
 
     def unsubscribe(self, url):
@@ -649,7 +905,7 @@ class Bot:
         :return: On success, Response Object
         :rtype: objects.Response
         """
-        resp = methods.unsubscribe(self.__access_token, url, self.__proxies)
+        resp = self.__api.unsubscribe(url=url)
         return objects.Response.de_json(resp)
 
     def get_updates(self, limit=100, timeout=30, marker=None, types=None):
@@ -663,8 +919,17 @@ class Bot:
         :return: On Success, UpdateInfo object
         :rtype: objects.UpdateInfo
         """
-        resp = methods.get_update(self.__access_token, limit, timeout, marker, types, self.__proxies)
-        return objects.UpdateInfo.de_json(resp)
+        resp = self.__api.get_update(limit=limit, timeout=timeout, marker=marker, types=types)
+        return self.__parse_updates(resp)
+
+    def __parse_updates(self, resp):
+        """
+        Records a get_updates response and parses it
+        :rtype: objects.UpdateInfo
+        """
+        if self.__recorder is not None:
+            self.__recorder.record(resp)
+        return objects.UpdateInfo.de_json(resp, self.__lazy_dispatch)
 
     def get_upload_url(self, data, ttype):
         """
@@ -674,5 +939,64 @@ class Bot:
         :return: On Success, Url of uploaded file
         :rtype: str
         """
-        resp = methods.get_upload_url(self.__access_token, data, ttype, self.__proxies)
+        resp = self.__api.get_upload_url(data=data, ttype=ttype)
         return resp
+
+    def upload(self, source, ttype, filename=None, progress=None, chunk_size=1048576):
+        """
+        Uploads a file chunk by chunk, So the memory used does not depend on the file size,
+        A local file is read through a memory map, With an upload_cache a file already uploaded is not sent again,
+        A non seekable stream (E.g. a pipe or an HTTP response) is spooled to a temporary file first
+        :param str or os.PathLike or io.BufferedIOBase source: path of a local file or a binary file object
+        :param str ttype: Enum: "image" "video" "audio" "file" type of the file
+        :param str or None filename: file name sent to the server, Defaults to the base name of source
+        :param function or None progress: callable receiving (bytes sent, total bytes) as the upload goes on
+        :param int chunk_size: bytes read from the file at once
+        :return: On Success, the attachment payload holding the token of the uploaded file
+        :rtype: dict
+        """
+        spooled = utils.spool(source, chunk_size)
+        try:
+            key = None
+            if self.__upload_cache is not None:
+                key = self.__upload_cache.key(spooled, ttype, chunk_size)
+                payload = self.__upload_cache.get(key)
+                if payload is not None:
+                    return payload
+
+            resp = self.__api.get_upload_url(ttype=ttype)
+            with utils.MultipartStream(spooled, filename or utils.source_filename(source), chunk_size=chunk_size,
+                                       progress=progress) as stream:
+                result = self.__api.upload_file(resp['url'], stream)
+            payload = self.__upload_payload(resp, result)
+            if key is not None:
+                self.__upload_cache.set(key, payload)
+            return payload
+        finally:
+            if spooled is not source:
+                spooled.close()
+
+    def upload_many(self, sources, ttype, concurrency=4, progress=None, chunk_size=1048576):
+        """
+        Uploads many files at the same time, Each one chunk by chunk
+        :param list sources: paths of local files or binary file objects
+        :param str ttype: Enum: "image" "video" "audio" "file" type of the files
+        :param int concurrency: Maximum number of uploads running at the same time
+        :param function or None progress: callable receiving (source, bytes sent, total bytes) as each upload goes on
+        :param int chunk_size: bytes read from each file at once
+        :return: On Success, the attachment payloads in the order of sources
+        :rtype: list[dict]
+        """
+        def upload(source):
+            file_progress = functools.partial(progress, source) if progress else None
+            return self.upload(source, ttype, progress=file_progress, chunk_size=chunk_size)
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='Upload') as executor:
+            return list(executor.map(upload, sources))
+
+    @staticmethod
+    def __upload_payload(resp, result):
+        payload = dict(result) if isinstance(result, dict) else {}
+        if 'token' in resp:
+            payload.setdefault('token', resp['token'])
+        return payload
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.broadcast
+~~~~~~~~~~~~~~~~~~
+This submodule provides the broadcast objects returned by Bot.broadcast and AsyncBot.broadcast,
+One message is sent to many recipients with a bounded number of requests in flight,
+Results are streamed back in completion order and the progress can be resumed from a checkpoint.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import asyncio
+import heapq
+import itertools
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+BroadcastResult = namedtuple('BroadcastResult', ['index', 'recipient', 'message', 'error'])
+BroadcastResult.__doc__ = """
+The result of sending to one recipient,
+index is the position of the recipient in the recipients iterable,
+message is the sent objects.Message on success and error the raised exception on failure
+"""
+
+RECIPIENT_TYPES = ('chat', 'user')
+
+
+class BroadcastProgress(object):
+    """
+    This class represents the progress of a broadcast,
+    checkpoint is the number of leading recipients that are all done, sent or failed,
+    Pass it as start to a new broadcast to resume after a crash without sending twice to those recipients.
+    """
+
+    def __init__(self, start=0):
+        self.checkpoint = start
+        self.sent = 0
+        self.failed = 0
+        self.__done = []
+
+    def complete(self, result):
+        """
+        Records a finished recipient and advances checkpoint
+        :param BroadcastResult result:
+        :return: the result
+        :rtype: BroadcastResult
+        """
+        if result.error is None:
+            self.sent += 1
+        else:
+            self.failed += 1
+        heapq.heappush(self.__done, result.index)
+        while self.__done and self.__done[0] == self.checkpoint:
+            heapq.heappop(self.__done)
+            self.checkpoint += 1
+        return result
+
+    def pending(self, recipients, start):
+        return enumerate(itertools.islice(recipients, start, None), start)
+
+
+class Broadcast(BroadcastProgress):
+    """
+    This class represents a broadcast run on a pool of threads, Iterate it to send and get a BroadcastResult
+    per recipient, A failure is yielded as a result and never stops the broadcast.
+    Recipients are read lazily so the iterable can be a generator over a large table.
+    """
+
+    def __init__(self, send, recipients, concurrency=8, start=0):
+        """
+        :param function send: callable sending the message to one recipient and returning the sent message
+        :param iterable recipients: chat or user identifiers
+        :param int concurrency: maximum number of requests in flight
+        :param int start: number of leading recipients to skip, a checkpoint of a previous broadcast
+        """
+        super().__init__(start)
+        self.send = send
+        self.recipients = recipients
+        self.concurrency = concurrency
+        self.start = start
+
+    def __send(self, index, recipient):
+        try:
+            return BroadcastResult(index, recipient, self.send(recipient), None)
+        except Exception as e:
+            return BroadcastResult(index, recipient, None, e)
+
+    def __iter__(self):
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='Broadcast') as executor:
+            futures = set()
+            for index, recipient in self.pending(self.recipients, self.start):
+                if len(futures) >= self.concurrency:
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield self.complete(future.result())
+                futures.add(executor.submit(self.__send, index, recipient))
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield self.complete(future.result())
+
+
+class AsyncBroadcast(BroadcastProgress):
+    """
+    This class represents a broadcast run as tasks on the event loop, Iterate it with `async for`
+    to send and get a BroadcastResult per recipient, A failure is yielded as a result and never stops the broadcast.
+    """
+
+    def __init__(self, send, recipients, concurrency=100, start=0):
+        """
+        :param function send: coroutine function sending the message to one recipient and returning the sent message
+        :param iterable recipients: chat or user identifiers
+        :param int concurrency: maximum number of requests in flight
+        :param int start: number of leading recipients to skip, a checkpoint of a previous broadcast
+        """
+        super().__init__(start)
+        self.send = send
+        self.recipients = recipients
+        self.concurrency = concurrency
+        self.start = start
+
+    async def __send(self, index, recipient):
+        try:
+            return BroadcastResult(index, recipient, await self.send(recipient), None)
+        except Exception as e:
+            return BroadcastResult(index, recipient, None, e)
+
+    async def __run(self):
+        tasks = set()
+        try:
+            for index, recipient in self.pending(self.recipients, self.start):
+                if len(tasks) >= self.concurrency:
+                    done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield self.complete(task.result())
+                tasks.add(asyncio.ensure_future(self.__send(index, recipient)))
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield self.complete(task.result())
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks)
+
+    def __aiter__(self):
+        return self.__run()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.handlers
+~~~~~~~~~~~~~~~~~
+This submodule provides the update handlers registry that is consumed by Bot and AsyncBot,
+Handlers are indexed by update type so routing an update to its handler chain is a single dict lookup.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+import re
+
+
+ALLOWED_UPDATES = ('message_callback', 'message_created', 'message_removed', 'message_edited', 'bot_added',
+                   'bot_removed', 'user_added', 'user_removed', 'bot_started', 'chat_title_changed',
+                   'message_construction_request', 'message_constructed', 'message_chat_created')
+
+CHAT_LOOKUPS = ('get_chat', 'get_chat_membership', 'get_chat_admins')
+CACHE_INVALIDATIONS = {
+    'chat_title_changed': ('get_chat',),
+    'user_added': CHAT_LOOKUPS,
+    'user_removed': CHAT_LOOKUPS,
+    'bot_added': CHAT_LOOKUPS,
+    'bot_removed': CHAT_LOOKUPS
+}
+
+
+def get_text(update):
+    """
+    Returns the message text of an update or None
+    :param objects.Update update:
+    :return: str or None
+    """
+    if update.message and update.message.body:
+        return update.message.body.text
+    return None
+
+
+class CombinedRegexp(object):
+    """
+    This class represents the regexp filters of a handler chain merged into alternations,
+    The regexps are the leaves of a binary tree whose nodes are the alternation of their leaves,
+    One search of the root rejects a text that none of the regexps matches in a single pass,
+    Otherwise the tree is walked down to the first matching regexp in O(log n) searches.
+    Only regexps without groups and with the default flags are merged, the others are checked one by one.
+    """
+
+    DEFAULT_FLAGS = re.compile('', re.IGNORECASE).flags
+    MIN_PATTERNS = 2
+    LEAF_SIZE = 8
+
+    def __init__(self, update_handlers):
+        """
+        :param list[dict] update_handlers: handlers dictionaries whose regexp filter is combinable
+        """
+        self.__patterns = [x['filters']['regexp'] for x in update_handlers]
+        self.__index = {id(x): i for i, x in enumerate(update_handlers)}
+        self.__nodes = {}
+        self.__node(0, len(self.__patterns))
+
+    def __contains__(self, update_handler):
+        return id(update_handler) in self.__index
+
+    def index(self, update_handler):
+        return self.__index[id(update_handler)]
+
+    @classmethod
+    def is_combinable(cls, pattern):
+        return pattern is not None and not pattern.groups and pattern.flags == cls.DEFAULT_FLAGS
+
+    @classmethod
+    def build(cls, chain):
+        """
+        Builds the combined regexp of a handler chain
+        :param list[dict] chain: handlers dictionaries
+        :return: CombinedRegexp or None if the chain has less than MIN_PATTERNS combinable regexps
+        """
+        update_handlers = [x for x in chain if cls.is_combinable(x['filters'].get('regexp'))]
+        if len(update_handlers) < cls.MIN_PATTERNS:
+            return None
+        try:
+            return cls(update_handlers)
+        except re.error:
+            return None
+
+    def __node(self, lo, hi):
+        node = self.__nodes.get((lo, hi))
+        if node is None:
+            node = re.compile('|'.join(f'(?:{x.pattern})' for x in self.__patterns[lo:hi]), re.IGNORECASE)
+            self.__nodes[(lo, hi)] = node
+        return node
+
+    def __first(self, text, start, lo, hi):
+        if hi <= start:
+            return None
+        if hi - lo <= self.LEAF_SIZE:
+            for i in range(max(lo, start), hi):
+                if self.__patterns[i].search(text):
+                    return i
+            return None
+        if lo >= start and not self.__node(lo, hi).search(text):
+            return None
+        mid = (lo + hi) // 2
+        i = self.__first(text, start, lo, mid)
+        return i if i is not None else self.__first(text, start, mid, hi)
+
+    def first(self, text, start=0):
+        """
+        Returns the index of the first regexp, from start on, that is found in text
+        :param str or None text: message text
+        :param int start: index of the first regexp to consider
+        :return: int, or len of the regexps if none matches
+        """
+        i = self.__first(text, start, 0, len(self.__patterns)) if text else None
+        return len(self.__patterns) if i is None else i
+
+
+class HandlerRegistry(object):
+    """
+    This class represents the update handlers of a bot, keyed by update type,
+    Each update type owns a chain of handlers that is checked in registration order.
+    regexp filters are compiled once when the handler is added, and the CombinedRegexp of a chain is built
+    on the first update routed to it after a change.
+    """
+
+    def __init__(self):
+        self.__chains = {}
+        self.__combined = {}
+
+    def __len__(self):
+        return sum(len(x) for x in self.__chains.values())
+
+    @staticmethod
+    def build_handler_dict(handler, **filters):
+        """
+        Builds a dictionary for a handler
+        :param handler: functions name
+        :param filters: functions filters
+        :return: Return Dictionary type for handlers
+        :rtype: dict
+        """
+        return {
+            'function': handler,
+            'filters': filters
+        }
+
+    def add(self, update_type, handler, **filters):
+        """
+        Registers a handler for one or many update types
+        :param str or list update_type: one or a list of allowed_updates
+        :param function handler: handler function
+        :param filters: handler filters (chat_type, bot_command, regexp, func)
+        :return: the handler dictionary
+        :rtype: dict
+        """
+        update_types = [update_type] if isinstance(update_type, str) else list(update_type)
+        for x in update_types:
+            if x not in ALLOWED_UPDATES:
+                raise ValueError(f"update_type should be one of {ALLOWED_UPDATES}, not {x!r}")
+
+        if isinstance(filters.get('regexp'), str):
+            filters['regexp'] = re.compile(filters['regexp'], re.IGNORECASE)
+
+        update_handler = self.build_handler_dict(handler, **filters)
+        for x in update_types:
+            chain = self.__chains.setdefault(x, [])
+            chain.append(update_handler)
+            self.__combined.pop(x, None)
+        return update_handler
+
+    def get(self, update_type):
+        """
+        Returns the handler chain of an update type
+        :param str update_type: one of allowed_updates
+        :return: list of handlers dictionaries, empty if no handler is registered
+        :rtype: list[dict]
+        """
+        return self.__chains.get(update_type, [])
+
+    def find_handler(self, update):
+        """
+        Returns the first handler whose filters match the update
+        :param objects.Update update:
+        :return: handler dictionary or None
+        :rtype: dict or None
+        """
+        if update.update_type in self.__combined:
+            combined = self.__combined[update.update_type]
+        else:
+            combined = self.__combined[update.update_type] = CombinedRegexp.build(self.get(update.update_type))
+        next_match = -1
+        for update_handler in self.__chains.get(update.update_type, ()):
+            if combined is not None and update_handler in combined:
+                i = combined.index(update_handler)
+                if next_match < i:
+                    next_match = combined.first(get_text(update), i)
+                if next_match == i and self.check_update_handler(update_handler, update, skip_regexp=True):
+                    return update_handler
+            elif self.check_update_handler(update_handler, update):
+                return update_handler
+        return None
+
+    def check_update_handler(self, update_handler, update, skip_regexp=False):
+        """
+        check update handler
+        :param update_handler:
+        :param update:
+        :param bool skip_regexp: Do not check the regexp filter, It was already checked by a CombinedRegexp
+        :return:
+        """
+        for filters, filter_value in update_handler['filters'].items():
+            if filter_value is None or (skip_regexp and filters == 'regexp'):
+                continue
+
+            if not self.check_filter(filters, filter_value, update):
+                return False
+
+        return True
+
+    @staticmethod
+    def check_filter(filters, filter_value, update):
+        """
+        check filters
+        :param filters:
+        :param filter_value:
+        :param update:
+        :return:
+        """
+        if filters == 'chat_type':
+            return update.message.recipient.chat_type in filter_value
+        elif filters == 'regexp':
+            return update.message.body.text and filter_value.search(update.message.body.text)
+        elif filters == 'func':
+            return filter_value(update)
+        elif filters == 'bot_command':
+            return update.message.body.text in filter_value
+        else:
+            return False
@@ -6,433 +6,471 @@ ttbotapi.methods
 This submodule provides a TamTam Available methods,
 All methods in the Bot API are case-insensitive,
 On successful call, a JSON-object containing the result will be returned.
+Every method is described once in ENDPOINTS and sent through the same path, Api prebuilds the urls of one bot.
 :copyright: (c) 2022 by Mustafa Asaad.
 :license: GPLv2, see LICENSE for more details.
 """
-from .utils import make_request
 
+from keyword import iskeyword
+from string import Formatter
+
+from .utils import make_request, BASE_URL
+
+HTTP_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+
+def get_based_url(transport):
+    return transport.base_url if transport else BASE_URL
+
+
+class Endpoint(object):
+    """
+    This class represents the request template of one API method, It is validated once when it is created,
+    Its query and body fields are kept as (name, key, required) tuples so a call only loops over them,
+    bind closes a function of the fields, Specialized to the shape of the endpoint, over the url prefix, access token
+    and transport of a bot.
+    Query and body fields are sent only when their value is true, Unless they are listed in required,
+    Python names that are not valid API names (E.g. ffrom) are mapped by aliases
+    """
+
+    def __init__(self, name, http_method, path, query=(), body=(), required=(), aliases=None, files=None):
+        """
+        :param str name: method name, Also the name of its Api attribute (E.g. 'get_chat')
+        :param str http_method: HTTP method ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
+        :param str path: url path under the base url, With {field} placeholders (E.g. 'chats/{chat_id}/pin')
+        :param tuple query: names of the query string fields
+        :param tuple body: names of the JSON body fields
+        :param tuple required: names of the query and body fields sent even when their value is false
+        :param dict or None aliases: Mapping of a field name to the name the API expects
+        :param str or None files: name of the field holding the request files
+        """
+        if not name.isidentifier() or iskeyword(name) or name.startswith('_'):
+            raise ValueError(f"Endpoint name {name!r} is not a valid identifier")
+        if http_method not in HTTP_METHODS:
+            raise ValueError(f"Unknown HTTP method {http_method!r}")
+        if not path or path.startswith('/') or '?' in path:
+            raise ValueError(f"Endpoint path {path!r} must be relative and without a query string")
+        parsed = list(Formatter().parse(path))
+        if any(x[2] or x[3] for x in parsed):
+            raise ValueError(f"Endpoint path {path!r} placeholders must not have a conversion or a format spec")
+        path_fields = tuple(x[1] for x in parsed if x[1] is not None)
+        names = path_fields + tuple(query) + tuple(body) + ((files,) if files else ())
+        for x in names:
+            if not x.isidentifier() or iskeyword(x) or x.startswith('_') or x == 'json_body':
+                raise ValueError(f"Endpoint {path!r} field {x!r} is not a valid argument name")
+        if len(set(names)) != len(names):
+            raise ValueError(f"Endpoint {path!r} declares a field twice")
+        aliases = aliases or {}
+        unknown = (set(required) | set(aliases)) - set(query) - set(body)
+        if unknown:
+            raise ValueError(f"Endpoint {path!r} has unknown fields {sorted(unknown)}")
+
+        self.name = name
+        self.http_method = http_method
+        self.api_method = path.split('/', 1)[0]
+        self.path = path
+        self.path_fields = path_fields
+        self.query = tuple((x, aliases.get(x, x), x in required) for x in query)
+        self.body = tuple((x, aliases.get(x, x), x in required) for x in body)
+        self.files = files
+        self.arguments = frozenset(names + ('json_body',))
+        self.__bound = None
+
+    def __repr__(self):
+        return f'Endpoint({self.name}: {self.http_method} /{self.path})'
+
+    def check(self, fields):
+        """
+        Raises TypeError like a Python function would when fields has an unknown field or misses a path field
+        :param dict fields: request fields
+        """
+        unknown = fields.keys() - self.arguments
+        if unknown:
+            raise TypeError(f"{self.name}() got unexpected keyword arguments {sorted(unknown)}")
+        missing = [x for x in self.path_fields if x not in fields]
+        if missing:
+            raise TypeError(f"{self.name}() missing required keyword arguments {missing}")
+
+    def build_params(self, fields):
+        """
+        Returns the query string of fields, None when the endpoint has no query fields
+        :param dict fields: request fields
+        :rtype: dict or None
+        """
+        if not self.query:
+            return None
+        params = {}
+        for name, key, required in self.query:
+            value = fields.get(name)
+            if required or value:
+                params[key] = value
+        return params
+
+    def build_body(self, fields):
+        """
+        Returns the JSON body of fields, The json_body field replaces it when given
+        :param dict fields: request fields
+        :rtype: dict or bytes or None
+        """
+        json_body = fields.get('json_body')
+        if json_body is not None or not self.body:
+            return json_body
+        json_body = {}
+        for name, key, required in self.body:
+            value = fields.get(name)
+            if required or value:
+                json_body[key] = value
+        return json_body
+
+    def bind(self, prefix, suffix, proxies, transport):
+        """
+        Returns the endpoint as a function of its fields only, It is specialized once here,
+        The url is built once when there are no path fields, Concatenated around the one path field otherwise,
+        Endpoints without query or body fields skip building them, check only runs when a call has an unknown field
+        or misses a path field
+        :param str prefix: base url ending with a slash
+        :param str suffix: access token query string
+        :param dict or None proxies: Dictionary mapping protocol to the URL of the proxy
+        :param any transport: Transport or AsyncTransport the requests are sent through
+        :rtype: function
+        """
+        http_method, api_method, arguments, check = self.http_method, self.api_method, self.arguments, self.check
+        files, has_query, has_body = self.files, bool(self.query), bool(self.body)
+        # A call loops over the fields it was given, slots maps each of them to (in query, key, required)
+        slots = {x: (True, key, required) for x, key, required in self.query}
+        slots.update((x, (False, key, required)) for x, key, required in self.body)
+        required = [(x, key, slot) for x, (slot, key, needed) in slots.items() if needed]
+        path_fields = frozenset(self.path_fields)
+        parsed = list(Formatter().parse(self.path))
+        static_url = None if path_fields else f'{prefix}{self.path}{suffix}'
+        if len(parsed) <= 2 and len(path_fields) == 1:
+            head, field = f'{prefix}{parsed[0][0]}', parsed[0][1]
+            tail = f'{parsed[1][0] if len(parsed) == 2 else ""}{suffix}'
+        else:
+            head = field = tail = None
+
+        if not has_query and not has_body and not files and static_url is not None:
+            def method(**fields):
+                if not fields:
+                    return make_request(http_method, api_method, static_url, None, None, None, proxies, transport)
+                if not arguments.issuperset(fields):
+                    check(fields)
+                return make_request(http_method, api_method, static_url, None, None, fields.get('json_body'), proxies,
+                                    transport)
+        elif not has_query and not has_body and not files and field is not None:
+            def method(**fields):
+                if len(fields) == 1 and field in fields:
+                    return make_request(http_method, api_method, f'{head}{fields[field]}{tail}', None, None, None,
+                                        proxies, transport)
+                if field not in fields or not arguments.issuperset(fields):
+                    check(fields)
+                return make_request(http_method, api_method, f'{head}{fields[field]}{tail}', None, None,
+                                    fields.get('json_body'), proxies, transport)
+        else:
+            def method(**fields):
+                if not arguments.issuperset(fields) or path_fields and not path_fields.issubset(fields):
+                    check(fields)
+                if static_url is not None:
+                    api_url = static_url
+                elif field is not None:
+                    api_url = f'{head}{fields[field]}{tail}'
+                else:
+                    api_url = f'{prefix}{self.path.format(**fields)}{suffix}'
+                params = {} if has_query else None
+                json_body = {} if has_body else None
+                for x, value in fields.items():
+                    slot = slots.get(x)
+                    if slot is not None and (value or slot[2]):
+                        if slot[0]:
+                            params[slot[1]] = value
+                        else:
+                            json_body[slot[1]] = value
+                for x, key, in_query in required:
+                    if x not in fields:
+                        (params if in_query else json_body)[key] = None
+                if fields.get('json_body') is not None:
+                    json_body = fields['json_body']
+                return make_request(http_method, api_method, api_url, params, fields.get(files) if files else None,
+                                    json_body, proxies, transport)
+
+        method.__name__ = method.__qualname__ = self.name
+        return method
+
+    def send(self, prefix, suffix, proxies, transport, **fields):
+        """
+        Sends a request right away, With the same arguments as bind and the fields of the endpoint,
+        The function bound for the last arguments is kept so the module functions of one bot do not bind every call
+        :return: json, or an awaitable of json when transport is asynchronous
+        """
+        key = (prefix, suffix, proxies, transport)
+        bound = self.__bound
+        if bound is None or bound[0] != key:
+            bound = self.__bound = (key, self.bind(prefix, suffix, proxies, transport))
+        return bound[1](**fields)
+
+
+MESSAGE_BODY = ('text', 'attachments', 'link', 'notify', 'formatter')
+MESSAGE_ALIASES = {'formatter': 'format'}
+
+ENDPOINTS = {x.name: x for x in (
+    # bots
+    Endpoint('get_bot_info', 'GET', 'me'),
+    Endpoint('edit_bot_info', 'PATCH', 'me', body=('name', 'username', 'description', 'commands', 'photo')),
+    # chats
+    Endpoint('get_all_chats', 'GET', 'chats', query=('count', 'marker')),
+    Endpoint('get_chat_by_link', 'GET', 'chats/{chat_link}'),
+    Endpoint('get_chat', 'GET', 'chats/{chat_id}'),
+    Endpoint('edit_chat_info', 'PATCH', 'chats/{chat_id}', body=('icon', 'title', 'pin', 'notify')),
+    Endpoint('send_action', 'POST', 'chats/{chat_id}', body=('action',), required=('action',)),
+    Endpoint('get_pinned_message', 'GET', 'chats/{chat_id}/pin'),
+    Endpoint('pin_message', 'PUT', 'chats/{chat_id}/pin', body=('message_id', 'notify'),
+             required=('message_id', 'notify')),
+    Endpoint('unpin_message', 'DELETE', 'chats/{chat_id}/pin'),
+    Endpoint('get_chat_membership', 'GET', 'chats/{chat_id}/members/me'),
+    Endpoint('leave_chat', 'DELETE', 'chats/{chat_id}/members/me'),
+    Endpoint('get_chat_admins', 'GET', 'chats/{chat_id}/members/admins'),
+    Endpoint('get_members', 'GET', 'chats/{chat_id}/members', query=('user_ids', 'marker', 'count')),
+    Endpoint('add_members', 'POST', 'chats/{chat_id}/members', body=('user_ids',)),
+    Endpoint('remove_member', 'DELETE', 'chats/{chat_id}/members', query=('user_id', 'block')),
+    # messages
+    Endpoint('get_messages', 'GET', 'messages', query=('chat_id', 'message_ids', 'ffrom', 'to', 'count'),
+             aliases={'ffrom': 'from'}),
+    Endpoint('send_message', 'POST', 'messages', query=('user_id', 'chat_id', 'disable_link_preview'),
+             body=MESSAGE_BODY, aliases=MESSAGE_ALIASES),
+    Endpoint('edit_message', 'PUT', 'messages', query=('message_id',), body=MESSAGE_BODY, aliases=MESSAGE_ALIASES),
+    Endpoint('delete_message', 'DELETE', 'messages', query=('message_id',)),
+    Endpoint('get_message', 'GET', 'messages/{message_id}'),
+    Endpoint('answer_on_callback', 'POST', 'answer/{callback_id}', body=('message', 'notification')),
+    Endpoint('construct_message', 'POST', 'answer/constructor', query=('session_id',), required=('session_id',),
+             body=('messages', 'allow_user_input', 'hint', 'data', 'keyboard', 'placeholder')),
+    # subscriptions
+    Endpoint('get_subscriptions', 'GET', 'subscription'),
+    Endpoint('subscribe', 'POST', 'subscription', body=('url', 'update_types', 'version')),
+    Endpoint('unsubscribe', 'DELETE', 'subscription', query=('url',)),
+    Endpoint('get_update', 'GET', 'updates', query=('limit', 'timeout', 'marker', 'types'), required=('timeout',)),
+    # upload
+    Endpoint('get_upload_url', 'POST', 'uploads', query=('ttype',), aliases={'ttype': 'type'}, files='data'),
+)}
+
+
+class Api(object):
+    """
+    This class represents the ENDPOINTS bound to one bot, Every method is an attribute (E.g. api.get_chat(chat_id=1))
+    bound once to the url prefix, access token and transport, So a call does not rebuild them.
+    It works with any transport, A coroutine is returned when the transport is asynchronous
+    """
+
+    def __init__(self, access_token, proxies=None, transport=None, endpoints=None):
+        """
+        :param str access_token: Bot access token
+        :param dict or None proxies: Dictionary mapping protocol to the URL of the proxy
+        :param any transport: Transport or AsyncTransport the requests are sent through
+        :param dict or None endpoints: Mapping of a method name to its Endpoint, ENDPOINTS if None
+        """
+        self.proxies = proxies
+        self.transport = transport
+        self.prefix = f'{get_based_url(transport)}/'
+        self.suffix = f'?access_token={access_token}'
+        self.endpoints = ENDPOINTS if endpoints is None else endpoints
+        for name, endpoint in self.endpoints.items():
+            if hasattr(self, name):
+                raise ValueError(f"Endpoint name {name!r} shadows an Api attribute")
+            setattr(self, name, endpoint.bind(self.prefix, self.suffix, proxies, transport))
+
+    def call(self, name, **kwargs):
+        """
+        Sends a request to a method by its name
+        :param str name: method name (E.g. 'get_chat')
+        :param kwargs: request fields declared by the method Endpoint, json_body replaces the body fields
+        :return: json, or an awaitable of json when transport is asynchronous
+        """
+        if name not in self.endpoints:
+            raise ValueError(f"Unknown API method {name!r}")
+        return getattr(self, name)(**kwargs)
+
+    def upload_file(self, upload_url, stream):
+        """
+        Uploads a file to the url returned by get_upload_url
+        :param str upload_url: upload url
+        :param any stream: file content, or a MultipartStream sent chunk by chunk
+        :return: json, or an awaitable of json when transport is asynchronous
+        """
+        return upload_file(upload_url, stream, self.proxies, self.transport)
+
+
+def route(access_token, proxies, transport):
+    """
+    Returns the url prefix, access token query string, proxies and transport arguments of Endpoint.send
+    :rtype: tuple
+    """
+    return f'{get_based_url(transport)}/', f'?access_token={access_token}', proxies, transport
+
+
+def call(name, access_token, proxies, transport=None, **kwargs):
+    """
+    Sends a request to a method without a prebuilt Api
+    :param str name: method name (E.g. 'get_chat')
+    :param str access_token: Bot access token
+    :param dict or None proxies: Dictionary mapping protocol to the URL of the proxy
+    :param any transport: Transport or AsyncTransport the request is sent through
+    :return: json, or an awaitable of json when transport is asynchronous
+    """
+    return ENDPOINTS[name].send(*route(access_token, proxies, transport), **kwargs)
 
+
+#######################################################################################################################
 # bots
-def get_bot_info(access_token, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'me'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = None
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def get_bot_info(access_token, proxies, transport=None):
+    return ENDPOINTS['get_bot_info'].send(*route(access_token, proxies, transport))
 
 
-def edit_bot_info(access_token, name, username, description, commands, photo, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'PATCH'
-    api_method = r'me'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = None
-    files = None
-    json_body = {}
-    if name:
-        json_body['name'] = name
-    if username:
-        json_body['username'] = username
-    if description:
-        json_body['description'] = description
-    if commands:
-        json_body['commands'] = commands
-    if photo:
-        json_body['photo'] = photo
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def edit_bot_info(access_token, name, username, description, commands, photo, proxies, transport=None):
+    return ENDPOINTS['edit_bot_info'].send(*route(access_token, proxies, transport), name=name, username=username,
+                                           description=description, commands=commands, photo=photo)
 
 
 #######################################################################################################################
 # chats
-def get_all_chats(access_token, count, marker, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = {}
-    if count:
-        params['count'] = count
-    if marker:
-        params['marker'] = marker
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def get_all_chats(access_token, count, marker, proxies, transport=None):
+    return ENDPOINTS['get_all_chats'].send(*route(access_token, proxies, transport), count=count, marker=marker)
 
 
-def get_chat_by_link(access_token, chat_link, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_link}?access_token={access_token}'
-    params = None
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def get_chat_by_link(access_token, chat_link, proxies, transport=None):
+    return ENDPOINTS['get_chat_by_link'].send(*route(access_token, proxies, transport), chat_link=chat_link)
 
 
-def get_chat(access_token, chat_id, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}?access_token={access_token}'
-    params = None
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def get_chat(access_token, chat_id, proxies, transport=None):
+    return ENDPOINTS['get_chat'].send(*route(access_token, proxies, transport), chat_id=chat_id)
 
 
-def edit_chat_info(access_token, chat_id, icon, title, pin, notify, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'PATCH'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}?access_token={access_token}'
-    params = None
-    files = None
-    json_body = {}
-    if icon:
-        json_body['icon'] = icon
-    if title:
-        json_body['title'] = title
-    if pin:
-        json_body['pin'] = pin
-    if notify:
-        json_body['notify'] = notify
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
-
-
-def send_action(access_token, chat_id, action, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'POST'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}?access_token={access_token}'
-    params = None
-    files = None
-    json_body = {'action': action}
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def edit_chat_info(access_token, chat_id, icon, title, pin, notify, proxies, transport=None):
+    return ENDPOINTS['edit_chat_info'].send(*route(access_token, proxies, transport), chat_id=chat_id, icon=icon,
+                                            title=title, pin=pin, notify=notify)
 
 
-def get_pinned_message(access_token, chat_id, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}/pin?access_token={access_token}'
-    params = None
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def send_action(access_token, chat_id, action, proxies, transport=None):
+    return ENDPOINTS['send_action'].send(*route(access_token, proxies, transport), chat_id=chat_id, action=action)
 
 
-def pin_message(access_token, chat_id, message_id, notify, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'PUT'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}/pin?access_token={access_token}'
-    params = None
-    files = None
-    json_body = {'message_id': message_id, 'notify': notify}
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def get_pinned_message(access_token, chat_id, proxies, transport=None):
+    return ENDPOINTS['get_pinned_message'].send(*route(access_token, proxies, transport), chat_id=chat_id)
 
 
-def unpin_message(access_token, chat_id, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'DELETE'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}/pin?access_token={access_token}'
-    params = None
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def pin_message(access_token, chat_id, message_id, notify, proxies, transport=None):
+    return ENDPOINTS['pin_message'].send(*route(access_token, proxies, transport), chat_id=chat_id,
+                                         message_id=message_id, notify=notify)
 
 
-def get_chat_membership(access_token, chat_id, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}/members/me?access_token={access_token}'
-    params = None
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def unpin_message(access_token, chat_id, proxies, transport=None):
+    return ENDPOINTS['unpin_message'].send(*route(access_token, proxies, transport), chat_id=chat_id)
 
 
-def leave_chat(access_token, chat_id, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'DELETE'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}/members/me?access_token={access_token}'
-    params = None
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def get_chat_membership(access_token, chat_id, proxies, transport=None):
+    return ENDPOINTS['get_chat_membership'].send(*route(access_token, proxies, transport), chat_id=chat_id)
 
 
-def get_chat_admins(access_token, chat_id, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}/members/admins?access_token={access_token}'
-    params = None
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
-
-
-def get_members(access_token, chat_id, user_ids, marker, count, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}/members?access_token={access_token}'
-    params = {}
-    if user_ids:
-        params['user_ids'] = user_ids
-    if marker:
-        params['marker'] = marker
-    if count:
-        params['count'] = count
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def leave_chat(access_token, chat_id, proxies, transport=None):
+    return ENDPOINTS['leave_chat'].send(*route(access_token, proxies, transport), chat_id=chat_id)
 
 
-def add_members(access_token, chat_id, user_ids, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'POST'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}/members?access_token={access_token}'
-    params = None
-    files = None
-    json_body = {}
-    if user_ids:
-        json_body['user_ids'] = user_ids
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
-
-
-def remove_member(access_token, chat_id, user_id, block, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'DELETE'
-    api_method = r'chats'
-    api_url = f'{based_url}/{api_method}/{chat_id}/members?access_token={access_token}'
-    params = {}
-    if user_id:
-        params['user_id'] = user_id
-    if block:
-        params['block'] = block
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def get_chat_admins(access_token, chat_id, proxies, transport=None):
+    return ENDPOINTS['get_chat_admins'].send(*route(access_token, proxies, transport), chat_id=chat_id)
+
+
+def get_members(access_token, chat_id, user_ids, marker, count, proxies, transport=None):
+    return ENDPOINTS['get_members'].send(*route(access_token, proxies, transport), chat_id=chat_id, user_ids=user_ids,
+                                         marker=marker, count=count)
+
+
+def add_members(access_token, chat_id, user_ids, proxies, transport=None):
+    return ENDPOINTS['add_members'].send(*route(access_token, proxies, transport), chat_id=chat_id, user_ids=user_ids)
+
+
+def remove_member(access_token, chat_id, user_id, block, proxies, transport=None):
+    return ENDPOINTS['remove_member'].send(*route(access_token, proxies, transport), chat_id=chat_id, user_id=user_id,
+                                           block=block)
 
 
 #######################################################################################################################
 # messages
-def get_messages(access_token, chat_id, message_ids, ffrom, to, count, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'messages'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = {}
-    if chat_id:
-        params['chat_id'] = chat_id
-    if message_ids:
-        params['message_ids'] = message_ids
-    if ffrom:
-        params['from'] = ffrom
-    if to:
-        params['to'] = to
-    if count:
-        params['count'] = count
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def get_messages(access_token, chat_id, message_ids, ffrom, to, count, proxies, transport=None):
+    return ENDPOINTS['get_messages'].send(*route(access_token, proxies, transport), chat_id=chat_id,
+                                          message_ids=message_ids, ffrom=ffrom, to=to, count=count)
+
+
+def build_message_body(text, attachments, link, notify, formatter):
+    return ENDPOINTS['send_message'].build_body({'text': text, 'attachments': attachments, 'link': link,
+                                                 'notify': notify, 'formatter': formatter})
 
 
 def send_message(access_token, user_id, chat_id, disable_link_preview, text, attachments, link, notify, formatter,
-                 proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'POST'
-    api_method = r'messages'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = {}
-    if user_id:
-        params['user_id'] = user_id
-    if chat_id:
-        params['chat_id'] = chat_id
-    if disable_link_preview:
-        params['disable_link_preview'] = disable_link_preview
-    files = None
-    json_body = {}
-    if text:
-        json_body['text'] = text
-    if attachments:
-        json_body['attachments'] = attachments
-    if link:
-        json_body['link'] = link
-    if notify:
-        json_body['notify'] = notify
-    if formatter:
-        json_body['format'] = formatter
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
-
-
-def edit_message(access_token, message_id, text, attachments, link, notify, formatter, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'PUT'
-    api_method = r'messages'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = {}
-    if message_id:
-        params['message_id'] = message_id
-    files = None
-    json_body = {}
-    if text:
-        json_body['text'] = text
-    if attachments:
-        json_body['attachments'] = attachments
-    if link:
-        json_body['link'] = link
-    if notify:
-        json_body['notify'] = notify
-    if formatter:
-        json_body['format'] = formatter
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
-
-
-def delete_message(access_token, message_id, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'DELETE'
-    api_method = r'messages'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = {}
-    if message_id:
-        params['message_id'] = message_id
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+                 proxies, transport=None):
+    return ENDPOINTS['send_message'].send(*route(access_token, proxies, transport), user_id=user_id, chat_id=chat_id,
+                                          disable_link_preview=disable_link_preview, text=text, attachments=attachments,
+                                          link=link, notify=notify, formatter=formatter)
 
 
-def get_message(access_token, message_id, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'messages'
-    api_url = f'{based_url}/{api_method}/{message_id}?access_token={access_token}'
-    params = None
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def send_message_body(access_token, user_id, chat_id, disable_link_preview, json_body, proxies, transport=None):
+    return ENDPOINTS['send_message'].send(*route(access_token, proxies, transport), user_id=user_id, chat_id=chat_id,
+                                          disable_link_preview=disable_link_preview, json_body=json_body)
 
 
-def answer_on_callback(access_token, callback_id, message, notification, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'POST'
-    api_method = r'answer'
-    api_url = f'{based_url}/{api_method}/{callback_id}?access_token={access_token}'
-    params = None
-    files = None
-    json_body = {}
-    if message:
-        json_body['message'] = message
-    if notification:
-        json_body['notification'] = notification
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def edit_message(access_token, message_id, text, attachments, link, notify, formatter, proxies, transport=None):
+    return ENDPOINTS['edit_message'].send(*route(access_token, proxies, transport), message_id=message_id, text=text,
+                                          attachments=attachments, link=link, notify=notify, formatter=formatter)
 
 
-def construct_message(access_token, session_id, messages, allow_user_input, hint, data, keyboard, placeholder, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'POST'
-    api_method = r'answer'
-    api_url = f'{based_url}/{api_method}/constructor?access_token={access_token}'
-    params = {'session_id': session_id}
-    files = None
-    json_body = {}
-    if messages:
-        json_body['messages'] = messages
-    if allow_user_input:
-        json_body['allow_user_input'] = allow_user_input
-    if hint:
-        json_body['hint'] = hint
-    if data:
-        json_body['data'] = data
-    if keyboard:
-        json_body['keyboard'] = keyboard
-    if placeholder:
-        json_body['placeholder'] = placeholder
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def delete_message(access_token, message_id, proxies, transport=None):
+    return ENDPOINTS['delete_message'].send(*route(access_token, proxies, transport), message_id=message_id)
+
+
+def get_message(access_token, message_id, proxies, transport=None):
+    return ENDPOINTS['get_message'].send(*route(access_token, proxies, transport), message_id=message_id)
+
+
+def answer_on_callback(access_token, callback_id, message, notification, proxies, transport=None):
+    return ENDPOINTS['answer_on_callback'].send(*route(access_token, proxies, transport), callback_id=callback_id,
+                                                message=message, notification=notification)
+
+
+def construct_message(access_token, session_id, messages, allow_user_input, hint, data, keyboard, placeholder, proxies,
+                      transport=None):
+    return ENDPOINTS['construct_message'].send(*route(access_token, proxies, transport), session_id=session_id,
+                                               messages=messages, allow_user_input=allow_user_input, hint=hint,
+                                               data=data, keyboard=keyboard, placeholder=placeholder)
 
 
 #######################################################################################################################
 # subscriptions
-def get_subscriptions(access_token, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'subscription'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = None
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def get_subscriptions(access_token, proxies, transport=None):
+    return ENDPOINTS['get_subscriptions'].send(*route(access_token, proxies, transport))
 
 
-def subscribe(access_token, url, update_types, version, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'POST'
-    api_method = r'subscription'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = None
-    files = None
-    json_body = {}
-    if url:
-        json_body['url'] = url
-    if update_types:
-        json_body['update_types'] = update_types
-    if version:
-        json_body['version'] = version
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
-
-
-def unsubscribe(access_token, url, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'DELETE'
-    api_method = r'subscription'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = {}
-    if url:
-        params['url'] = url
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
-
-
-def get_update(access_token, limit, timeout, marker, types, proxies):
-    based_url = 'https://botapi.tamtam.chat'
-    http_method = 'GET'
-    api_method = r'updates'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = {}
-    if limit:
-        params['limit'] = limit
-    if timeout:
-        params['timeout'] = timeout
-    if marker:
-        params['marker'] = marker
-    if types:
-        params['types'] = types
-    files = None
-    json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+def subscribe(access_token, url, update_types, version, proxies, transport=None):
+    return ENDPOINTS['subscribe'].send(*route(access_token, proxies, transport), url=url, update_types=update_types,
+                                       version=version)
+
+
+def unsubscribe(access_token, url, proxies, transport=None):
+    return ENDPOINTS['unsubscribe'].send(*route(access_token, proxies, transport), url=url)
+
+
+def get_update(access_token, limit, timeout, marker, types, proxies, transport=None):
+    return ENDPOINTS['get_update'].send(*route(access_token, proxies, transport), limit=limit, timeout=timeout,
+                                        marker=marker, types=types)
 
 
 ######################################################################################################################
 # upload
-def get_upload_url(access_token, data, ttype, proxies):
-    based_url = 'https://botapi.tamtam.chat'
+def get_upload_url(access_token, data, ttype, proxies, transport=None):
+    return ENDPOINTS['get_upload_url'].send(*route(access_token, proxies, transport), data=data, ttype=ttype)
+
+
+def upload_file(upload_url, stream, proxies, transport=None):
     http_method = 'POST'
-    api_method = r'uploads'
-    api_url = f'{based_url}/{api_method}?access_token={access_token}'
-    params = {}
-    if ttype:
-        params['type'] = ttype
-    files = data
+    api_method = r'upload'
+    api_url = upload_url
+    params = None
+    files = stream
     json_body = None
-    return make_request(http_method, api_method, api_url, params, files, json_body, proxies)
+    return make_request(http_method, api_method, api_url, params, files, json_body, proxies, transport)
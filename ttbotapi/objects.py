@@ -8,10 +8,12 @@ All objects used in the Bot API responses are represented as JSON-objects.
 :copyright: (c) 2022 by Mustafa Asaad.
 :license: GPLv2, see LICENSE for more details.
 """
-from .utils import JsonDeserializable, JsonSerializable
+from .utils import JsonDeserializable, JsonSerializable, LazyJsonDeserializable
 
 
 class Response(JsonDeserializable):
+    __slots__ = ('success', 'message')
+
     def __init__(self, success, message):
         self.success = success
         self.message = message
@@ -25,6 +27,8 @@ class Response(JsonDeserializable):
 
 
 class MemberInfo(JsonDeserializable):
+    __slots__ = ('members', 'marker')
+
     def __init__(self, members, marker):
         self.members = members
         self.marker = marker
@@ -32,8 +36,10 @@ class MemberInfo(JsonDeserializable):
     @classmethod
     def de_json(cls, obj_type):
         obj = cls.check_type(obj_type)
-        members = obj['members']
-        marker = obj['marker']
+        members = MemberInfo.parse_members(obj['members'])
+        marker = None
+        if 'marker' in obj:
+            marker = obj['marker']
         return cls(members, marker)
 
     @staticmethod
@@ -41,9 +47,13 @@ class MemberInfo(JsonDeserializable):
         members = []
         for x in obj:
             members.append(User.de_json(x))
+        return members
 
 
 class User(JsonDeserializable):
+    __slots__ = ('user_id', 'name', 'username', 'is_bot', 'last_activity_time', 'description', 'avatar_url',
+                 'full_avatar_url', 'commands', 'last_access_time', 'is_owner', 'is_admin', 'join_time', 'permissions')
+
     def __init__(self, user_id, name, username, is_bot, last_activity_time, description, avatar_url, full_avatar_url,
                  commands, last_access_time, is_owner, is_admin, join_time, permissions):
         self.user_id = user_id
@@ -110,6 +120,8 @@ class User(JsonDeserializable):
 
 
 class Permissions(JsonDeserializable):
+    __slots__ = ('read_all_messages', 'add_remove_members', 'add_admins', 'change_chat_info', 'pin_message', 'write')
+
     def __init__(self, read_all_messages, add_remove_members, add_admins, change_chat_info, pin_message, write):
         self.read_all_messages = read_all_messages
         self.add_remove_members = add_remove_members
@@ -143,6 +155,8 @@ class Permissions(JsonDeserializable):
 
 
 class Recipient(JsonDeserializable):
+    __slots__ = ('chat_id', 'chat_type', 'user_id')
+
     def __init__(self, chat_id, chat_type, user_id):
         self.chat_id = chat_id
         self.chat_type = chat_type
@@ -158,6 +172,10 @@ class Recipient(JsonDeserializable):
 
 
 class Chat(JsonDeserializable):
+    __slots__ = ('chat_id', 'ttype', 'status', 'title', 'icon', 'last_event_time', 'participants_count', 'owner_id',
+                 'participants', 'is_public', 'link', 'description', 'dialog_with_user', 'messages_count',
+                 'chat_message_id', 'pinned_message')
+
     def __init__(self, chat_id, ttype, status, title, icon, last_event_time, participants_count, owner_id, participants,
                  is_public, link, description, dialog_with_user, messages_count, chat_message_id, pinned_message):
         self.chat_id = chat_id
@@ -223,6 +241,8 @@ class Chat(JsonDeserializable):
 
 
 class ChatInfo(JsonDeserializable):
+    __slots__ = ('chats', 'marker')
+
     def __init__(self, chats, marker):
         self.chats = chats
         self.marker = marker
@@ -230,8 +250,10 @@ class ChatInfo(JsonDeserializable):
     @classmethod
     def de_json(cls, obj_type):
         obj = cls.check_type(obj_type)
-        chats = ChatInfo.parse_chats(obj['chat_id'])
-        marker = obj['marker']
+        chats = ChatInfo.parse_chats(obj['chats'])
+        marker = None
+        if 'marker' in obj:
+            marker = obj['marker']
         return cls(chats, marker)
 
     @staticmethod
@@ -243,6 +265,8 @@ class ChatInfo(JsonDeserializable):
 
 
 class Message(JsonDeserializable):
+    __slots__ = ('sender', 'recipient', 'timestamp', 'link', 'body', 'stat', 'url', 'constructor')
+
     def __init__(self, sender, recipient, timestamp, link, body, stat, url, constructor):
         self.sender = sender
         self.recipient = recipient
@@ -284,6 +308,8 @@ class Message(JsonDeserializable):
 
 
 class NewMessage(JsonDeserializable):
+    __slots__ = ('text', 'attachments', 'link', 'notify', 'formatter')
+
     def __init__(self, text, attachments, link, notify, formatter):
         self.text = text
         self.attachments = attachments
@@ -314,6 +340,8 @@ class NewMessage(JsonDeserializable):
 
 
 class Attachment(JsonDeserializable):
+    __slots__ = ('ttype', 'payload')
+
     def __init__(self, ttype, payload):
         self.ttype = ttype
         self.payload = payload
@@ -329,6 +357,8 @@ class Attachment(JsonDeserializable):
 
 
 class Body(JsonDeserializable):
+    __slots__ = ('mid', 'seq', 'text', 'attachments', 'markup')
+
     def __init__(self, mid, seq, text, attachments, markup):
         self.mid = mid
         self.seq = seq
@@ -366,6 +396,8 @@ class Body(JsonDeserializable):
 
 
 class MarkupElement(JsonDeserializable):
+    __slots__ = ('ttype', 'ffrom', 'length', 'url', 'user_link', 'user_id')
+
     def __init__(self, ttype, ffrom, length, url, user_link, user_id):
         self.ttype = ttype
         self.ffrom = ffrom
@@ -393,6 +425,8 @@ class MarkupElement(JsonDeserializable):
 
 
 class Subscription(JsonDeserializable):
+    __slots__ = ('url', 'time', 'update_types', 'version')
+
     def __init__(self, url, time, update_types, version):
         self.url = url
         self.time = time
@@ -418,6 +452,10 @@ class Subscription(JsonDeserializable):
 
 
 class Update(JsonDeserializable):
+    __slots__ = ('update_type', 'timestamp', 'callback', 'message', 'user_locale', 'message_id', 'chat_id', 'user_id',
+                 'session_id', 'inviter_id', 'admin_id', 'user', 'is_channel', 'payload', 'title', 'data', 'iinput',
+                 'start_payload')
+
     def __init__(self, update_type, timestamp, callback, message, user_locale, message_id, chat_id, user_id, session_id,
                  inviter_id, admin_id, user, is_channel, payload, title, data, iinput, start_payload):
         self.update_type = update_type
@@ -496,27 +534,85 @@ class Update(JsonDeserializable):
                    inviter_id, admin_id, user, is_channel, payload, title, data, iinput, start_payload)
 
 
+class LazyBody(LazyJsonDeserializable, Body):
+    __slots__ = ('raw',)
+    lazy_fields = {
+        'mid': ('mid', None),
+        'seq': ('seq', None),
+        'text': ('text', None),
+        'attachments': ('attachments', Body.parse_attachments),
+        'markup': ('markup', Body.parse_markup)
+    }
+
+
+class LazyMessage(LazyJsonDeserializable, Message):
+    __slots__ = ('raw',)
+    lazy_fields = {
+        'sender': ('sender', User.de_json),
+        'recipient': ('recipient', Recipient.de_json),
+        'timestamp': ('timestamp', None),
+        'link': ('link', None),
+        'body': ('body', LazyBody.de_json),
+        'stat': ('stat', None),
+        'url': ('url', None),
+        'constructor': ('constructor', None)
+    }
+
+
+class LazyUpdate(LazyJsonDeserializable, Update):
+    """
+    An Update that is built from the raw dict on attribute access, Routing only reads update_type,
+    So updates that no handler asks for are never parsed
+    """
+    __slots__ = ('raw',)
+    lazy_fields = {
+        'update_type': ('update_type', None),
+        'timestamp': ('timestamp', None),
+        'callback': ('callback', None),
+        'message': ('message', LazyMessage.de_json),
+        'user_locale': ('user_locale', None),
+        'message_id': ('message_id', None),
+        'chat_id': ('chat_id', None),
+        'user_id': ('user_id', None),
+        'session_id': ('session_id', None),
+        'inviter_id': ('inviter_id', None),
+        'admin_id': ('admin_id', None),
+        'user': ('user', User.de_json),
+        'is_channel': ('is_channel', None),
+        'payload': ('payload', None),
+        'title': ('title', None),
+        'data': ('data', None),
+        'iinput': ('input', None),
+        'start_payload': ('start_payload', None)
+    }
+
+
 class UpdateInfo(JsonDeserializable):
+    __slots__ = ('updates', 'marker')
+
     def __init__(self, updates, marker):
         self.updates = updates
         self.marker = marker
 
     @classmethod
-    def de_json(cls, obj_type):
+    def de_json(cls, obj_type, lazy=False):
         obj = cls.check_type(obj_type)
-        updates = UpdateInfo.parse_updates(obj['updates'])
+        updates = UpdateInfo.parse_updates(obj['updates'], lazy)
         marker = obj['marker']
         return cls(updates, marker)
 
     @staticmethod
-    def parse_updates(obj):
+    def parse_updates(obj, lazy=False):
         updates = []
+        update_class = LazyUpdate if lazy else Update
         for x in obj:
-            updates.append(Update.de_json(x))
+            updates.append(update_class.de_json(x))
         return updates
 
 
 class BotCommand(JsonDeserializable, JsonSerializable):
+    __slots__ = ('name', 'description')
+
     def __init__(self, name, description):
         self.name = name
         self.description = description
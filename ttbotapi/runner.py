@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.runner
+~~~~~~~~~~~~~~~
+This submodule provides BotRunner, which hosts many bots in one process,
+The bots share one HTTP transport and one handler worker pool, Their long polls run on one asyncio event loop.
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import utils
+from . import methods
+from .bot import Bot
+
+
+class BotStats(object):
+    """
+    This class represents the polling counters of one bot hosted by a BotRunner
+    """
+    __slots__ = ('name', 'polls', 'updates', 'errors', 'consecutive_errors', 'last_error', 'last_poll')
+
+    def __init__(self, name):
+        self.name = name
+        self.polls = 0
+        self.updates = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.last_error = None
+        self.last_poll = None
+
+    def to_dict(self):
+        return {x: getattr(self, x) for x in self.__slots__}
+
+
+class BotRunner(object):
+    """
+    This class represents a host for many bots, The bots share one pooled Transport and one WorkerPool for handlers,
+    The long polls of every bot are in flight together on one event loop thread through an AsyncTransport, So a bot
+    waiting for updates holds no thread. Each received batch is handed to one of a few dispatcher threads, Which
+    feeds it to the shared WorkerPool, And the bot is polled again once it is dispatched.
+    A failed poll is retried after a jittered backoff while the other bots keep polling.
+    It requires aiohttp, install it with `pip install ttbotapi[async]`
+    """
+
+    def __init__(self, transport=None, pool_size=100, workers=8, queue_size=100, dispatchers=4, limit=100,
+                 timeout=30, idle_interval=1.0, types=None, poll_transport=None):
+        """
+        :param utils.Transport or None transport: pooled HTTP transport shared by every bot
+        :param int pool_size: Maximum number of keep-alive connections when the runner creates its own transport
+        :param int workers: Number of handler worker threads shared by every bot
+        :param int queue_size: Maximum number of pending updates per worker before polling waits
+        :param int dispatchers: Number of threads handing received batches to the worker pool
+        :param int limit: Maximum number of updates retrieved per poll
+        :param int timeout: Timeout in seconds for long polling
+        :param float idle_interval: Seconds before a bot is polled again after an empty batch when timeout is 0
+        :param list[str] or None types: update types the bots want to receive
+        :param utils.AsyncTransport or None poll_transport: transport of the long polls, Defaults to an
+                                                            AsyncTransport with one connection per bot
+        """
+        self.transport = transport or utils.Transport(pool_maxsize=pool_size)
+        self.poll_transport = poll_transport or utils.AsyncTransport(pool_size=0, base_url=self.transport.base_url)
+        self.worker_pool = utils.WorkerPool(workers, queue_size, name='RunnerWorker')
+        self.dispatchers = dispatchers
+        self.limit = limit
+        self.timeout = timeout
+        self.idle_interval = idle_interval
+        self.types = types
+        self.bots = {}
+        self.__apis = {}
+        self.__stats = {}
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__loop = None
+        self.__stop_event = None
+        self.__thread = None
+        self.__executor = None
+
+    def add(self, access_token, name=None, **kwargs):
+        """
+        Creates a bot on the shared transport and worker pool, Register its handlers before or after run is called
+        :param str access_token: Bot token gain by @PrimeBot
+        :param str or None name: Name of the bot in stats, Defaults to the last characters of the token
+        :param kwargs: other Bot parameters (E.g. lazy_updates, rate_limiter, cache), Add bots with processes
+                       before run since their worker processes are forked when it starts
+        :return: the new bot
+        :rtype: Bot
+        """
+        name = name or access_token[-8:]
+        if name in self.bots:
+            raise ValueError(f"A bot named {name!r} is already added")
+        bot = Bot(access_token, transport=self.transport, worker_pool=self.worker_pool, **kwargs)
+        with self.__lock:
+            self.bots[name] = bot
+            self.__apis[name] = methods.Api(access_token, kwargs.get('proxies'), self.poll_transport)
+            self.__stats[name] = BotStats(name)
+            loop = self.__loop
+        if loop is not None:
+            bot.start_process_pool()
+            loop.call_soon_threadsafe(self.__spawn, name)
+        return bot
+
+    def __spawn(self, name):
+        asyncio.ensure_future(self.__poll(name))
+
+    async def __poll(self, name):
+        bot, api, stats = self.bots[name], self.__apis[name], self.__stats[name]
+        loop = asyncio.get_running_loop()
+        while not self.__stopped.is_set():
+            delay = 0
+            try:
+                resp = await api.get_update(limit=self.limit, timeout=self.timeout, marker=bot.next_marker,
+                                            types=self.types)
+                updates = await loop.run_in_executor(self.__executor, bot.dispatch_updates, resp)
+                stats.polls += 1
+                stats.updates += updates
+                stats.consecutive_errors = 0
+                if not updates and not self.timeout:
+                    delay = self.idle_interval
+            except Exception as e:
+                utils.logger.error(f"Bot {name} polling failed {e!r}")
+                stats.errors += 1
+                stats.last_error = repr(e)
+                delay = utils.backoff_delay(stats.consecutive_errors, 0.25, 30)
+                stats.consecutive_errors += 1
+            stats.last_poll = time.time()
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def __main(self, ready):
+        """
+        Runs on the event loop thread, Polls every bot until stop is called, Then cancels the polls in flight
+        """
+        self.__stop_event = asyncio.Event()
+        with self.__lock:
+            self.__loop = asyncio.get_running_loop()
+            names = list(self.bots)
+            stopped = self.__stopped.is_set()
+        for name in names:
+            self.__spawn(name)
+        ready.set()
+        try:
+            if not stopped:
+                await self.__stop_event.wait()
+        finally:
+            with self.__lock:
+                self.__loop = None
+            tasks = [x for x in asyncio.all_tasks() if x is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.poll_transport.close()
+
+    def start(self):
+        """
+        Starts polling every bot on the event loop thread and returns, The worker processes of bots with processes
+        are forked first
+        """
+        self.__stopped.clear()
+        for bot in self.bots.values():
+            bot.start_process_pool()
+        self.__executor = ThreadPoolExecutor(max_workers=self.dispatchers, thread_name_prefix='RunnerDispatcher')
+        ready = threading.Event()
+        self.__thread = threading.Thread(target=asyncio.run, args=(self.__main(ready),), name='RunnerLoop',
+                                         daemon=True)
+        self.__thread.start()
+        ready.wait()
+
+    def run(self):
+        """
+        Polls every bot until stop is called or a KeyboardInterrupt occurs, Then waits for the handlers already
+        queued to finish
+        """
+        utils.logger.info(f'RUNNER STARTED WITH {len(self.bots)} BOTS')
+        self.start()
+        try:
+            while not self.__stopped.wait(1):
+                pass
+        except KeyboardInterrupt:
+            utils.logger.info("KeyboardInterrupt Occurred")
+            self.stop()
+        self.join()
+
+    def stop(self):
+        """
+        Stops every bot gracefully, The polls in flight are cancelled, The batches already received are dispatched
+        and the queued handlers still run, It can be called from a handler
+        """
+        with self.__lock:
+            self.__stopped.set()
+            loop = self.__loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.__stop_event.set)
+
+    def join(self):
+        """
+        Blocks until polling ends and the queued handlers finish, after stop, Then stops every bot
+        """
+        thread, self.__thread = self.__thread, None
+        if thread is not None:
+            thread.join()
+        executor, self.__executor = self.__executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.worker_pool.stop()
+        for bot in self.bots.values():
+            bot.stop()
+        utils.logger.info('RUNNER STOPPED')
+
+    def stats(self):
+        """
+        Returns the polling counters of each bot and the pending handlers of each worker
+        :return: dict with bots, a dict of name to counters, and pending
+        :rtype: dict
+        """
+        return {'bots': {name: x.to_dict() for name, x in self.__stats.items()},
+                'pending': self.worker_pool.pending()}
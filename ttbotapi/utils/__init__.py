@@ -10,5 +10,18 @@ ttbotapi
 from .api_exceptions import *
 from .api_functions import *
 from .api_handler import *
+from .async_handler import *
+from .checkpoint import *
+from .dedupe import *
 from .json_helper import *
 from .logger import *
+from .pagination import *
+from .process_pool import *
+from .rate_limiter import *
+from .retry_policy import *
+from .ttl_cache import *
+from .update_log import *
+from .upload_cache import *
+from .upload_stream import *
+from .webhook_server import *
+from .worker_pool import *
@@ -15,9 +15,13 @@ class ApiException(Exception):
     In addition to an informative message, it has a `function_name` and a `result` attribute, which respectively
     contain the name of the failed function and the returned result that made the function to be considered  as
     failed.
+    `status_code` and `retry_after` hold the HTTP status and the Retry-After header of the response when there is one.
     """
 
     def __init__(self, msg, function_name, result):
         super(ApiException, self).__init__(f"{msg}")
         self.function_name = function_name
-        self.result = result
\ No newline at end of file
+        self.result = result
+        self.status_code = getattr(result, 'status_code', None) or getattr(result, 'status', None)
+        headers = getattr(result, 'headers', None)
+        self.retry_after = headers.get('Retry-After') if headers is not None else None
\ No newline at end of file
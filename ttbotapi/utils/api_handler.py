@@ -8,15 +8,66 @@ This submodule provides api handler functions that are consumed internally
 :license: GPLv2, see LICENSE for more details.
 """
 
+import os
 import threading
+import time
 import requests
+import requests.adapters
 from .logger import logger
 from .api_exceptions import ApiException
+from .json_helper import json_loads, json_dumps_bytes
+from .retry_policy import RetryPolicy
+from .upload_stream import MultipartStream
 
 
+BASE_URL = 'https://botapi.tamtam.chat'
+JSON_HEADERS = {'Content-Type': 'application/json'}
 thread_local = threading.local()
 
 
+def parse_response_body(content):
+    """
+    Parses a response body once with the selected json backend
+    :param bytes content: response body
+    :return: json, or the body as text if it is not json
+    """
+    try:
+        return json_loads(content)
+    except ValueError:
+        return content.decode('utf-8', 'replace')
+
+
+def encode_json_body(json_body):
+    """
+    Serializes a request body, A body that is already bytes is sent as it is
+    :param dict or bytes or None json_body:
+    :return: bytes or None
+    """
+    if json_body is None or isinstance(json_body, (bytes, bytearray)):
+        return json_body
+    return json_dumps_bytes(json_body)
+
+
+def rewind_files(files):
+    """
+    Seeks the file objects of a files dictionary back to their start so the request can be sent again
+    :param dict or MultipartStream or None files: mapping of field name to file object or (filename, file object, ...)
+                                                  tuple, or a streamed upload body
+    :return: False if a file object can not be rewound
+    :rtype: bool
+    """
+    if isinstance(files, MultipartStream):
+        return files.rewind()
+    for value in (files or {}).values():
+        obj = value[1] if isinstance(value, tuple) else value
+        if isinstance(obj, (bytes, bytearray, str)):
+            continue
+        if not (hasattr(obj, 'seek') and getattr(obj, 'seekable', lambda: True)()):
+            return False
+        obj.seek(0)
+    return True
+
+
 def per_thread(key, construct_value, reset=True):
     if reset or not hasattr(thread_local, key):
         value = construct_value()
@@ -29,32 +80,165 @@ def get_req_session(reset=True):
     return per_thread('req_session', lambda: requests.session(), reset)
 
 
-def make_request(http_method, api_method, api_url, params=None, files=None, json_body=None, proxies=None):
+class Transport(object):
+    """
+    This class represents a pooled keep-alive HTTP transport,
+    It keeps one requests.Session per proxy config (or per thread and proxy config when per_thread is set),
+    So TCP+TLS connections are reused across all api calls instead of being opened on every request.
+    Failed requests are retried according to retry_policy.
+    """
+
+    connection_errors = (requests.ConnectionError, requests.Timeout)
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, per_thread=False, base_url=BASE_URL, retry_policy=None):
+        """
+        :param int pool_connections: Number of connection pools to cache (one per host)
+        :param int pool_maxsize: Maximum number of keep-alive connections to save in each pool
+        :param bool per_thread: Use a Session per thread instead of sharing one Session between threads
+        :param str base_url: TamTam Bot API server url, Override it to talk to a local stub server
+        :param RetryPolicy or None retry_policy: Retry policy of failed requests, Defaults to RetryPolicy(),
+                                                 Pass RetryPolicy(max_retries=0) to never retry
+        """
+        self.base_url = base_url
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.per_thread = per_thread
+        self.__sessions = {}
+        self.__thread_sessions = []
+        self.__generation = 0
+        self.__lock = threading.Lock()
+        self.__pid = os.getpid()
+
+    @staticmethod
+    def proxies_key(proxies):
+        """
+        Returns a hashable key for a proxies dictionary
+        :param dict or None proxies: Dictionary mapping protocol to the URL of the proxy
+        :return: tuple
+        """
+        return tuple(sorted(proxies.items())) if proxies else ()
+
+    def __new_session(self, proxies):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_connections,
+                                                pool_maxsize=self.pool_maxsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if proxies:
+            session.proxies.update(proxies)
+        return session
+
+    def __new_thread_session(self, proxies):
+        # Tracked so close() also releases the pooled connections of every thread
+        session = self.__new_session(proxies)
+        with self.__lock:
+            self.__thread_sessions.append(session)
+        return session
+
+    def get_session(self, proxies=None):
+        """
+        Returns the keep-alive Session bound to the given proxy config
+        :param dict or None proxies: Dictionary mapping protocol to the URL of the proxy
+        :return: requests.Session
+        """
+        key = self.proxies_key(proxies)
+        if self.__pid != os.getpid():
+            # A forked process must not share the keep-alive sockets of its parent
+            self.__sessions = {}
+            self.__thread_sessions = []
+            self.__lock = threading.Lock()
+            self.__pid = os.getpid()
+        if self.per_thread:
+            return per_thread(f'req_session_{id(self)}_{self.__pid}_{self.__generation}_{key}',
+                              lambda: self.__new_thread_session(proxies), reset=False)
+
+        session = self.__sessions.get(key)
+        if session is None:
+            with self.__lock:
+                session = self.__sessions.get(key)
+                if session is None:
+                    session = self.__new_session(proxies)
+                    self.__sessions[key] = session
+        return session
+
+    def request(self, http_method, api_method, api_url, params, files, json_body, proxies, timeout):
+        """
+        Sends a request, Retrying it while retry_policy allows
+        :return: json
+        """
+        json_body = encode_json_body(json_body)
+        attempt = 0
+        while True:
+            try:
+                return self.send(http_method, api_method, api_url, params, files, json_body, proxies, timeout)
+            except (ApiException,) + self.connection_errors as e:
+                delay = self.retry_policy.get_delay(http_method, api_method, attempt, e)
+                if delay is None or not rewind_files(files):
+                    raise
+                logger.warning("Retrying %s in %.2f seconds after %r", api_method, delay, e)
+                time.sleep(delay)
+                attempt += 1
+
+    def send(self, http_method, api_method, api_url, params, files, json_body, proxies, timeout):
+        """
+        Sends a request once through the pooled Session
+        :return: json
+        """
+        session = self.get_session(proxies)
+        if isinstance(files, MultipartStream):
+            data, files, headers = files, None, {'Content-Type': files.content_type}
+        else:
+            data = encode_json_body(json_body)
+            headers = JSON_HEADERS if data else None
+        resp = session.request(method=http_method, url=api_url, params=params, files=files, timeout=timeout,
+                               allow_redirects=False, data=data, headers=headers)
+        result = parse_response_body(resp.content)
+
+        if resp.status_code != 200:
+            raise ApiException(f"The Server Returned {result} ", api_method, resp)
+        else:
+            logger.info("Response -> %s", result)
+            return result
+
+    def close(self):
+        """
+        Closes all shared and per thread Sessions and their pooled connections
+        """
+        with self.__lock:
+            sessions = list(self.__sessions.values()) + self.__thread_sessions
+            self.__sessions.clear()
+            self.__thread_sessions = []
+            # Threads that keep using the transport get new Sessions instead of the closed ones
+            self.__generation += 1
+        for session in sessions:
+            session.close()
+
+
+default_transport = Transport()
+
+
+def make_request(http_method, api_method, api_url, params=None, files=None, json_body=None, proxies=None,
+                 transport=None):
     """
     Makes a request to the TamTam API
     :param str http_method: HTTP method ['get', 'post', 'put', 'delete']
     :param str api_method: Name of the API method to be called. (E.g. 'me')
     :param str api_url: tamtam api url for api_method
     :param dict or None params: Should be a dictionary with key-value pairs
-    :param any data: body content's a data
-    :param any files: files content's a data
-    :param dict or None json_body: Should be a dictionary with key-value pairs
+    :param any files: files content's a data, or a MultipartStream sent chunk by chunk
+    :param dict or bytes or None json_body: Should be a dictionary with key-value pairs, or its serialized bytes
     :param dict or None proxies: Dictionary mapping protocol to the URL of the proxy
-    :return: json
+    :param Transport or None transport: pooled transport to send the request through, default_transport if None
+    :return: json, or an awaitable of json when transport is asynchronous
     :rtype: json
     """
-    logger.info(f"Request -> http_method='{http_method}' api_method='{api_method}' params={params} files={files}")
+    logger.info("Request -> http_method='%s' api_method='%s' params=%s files=%s", http_method, api_method, params,
+                files)
     timeout = 14.99
     if params:
-        if 'timeout' in params:
+        if params.get('timeout') is not None:
             timeout = params['timeout'] + 10
 
-    resp = requests.request(method=http_method, url=api_url, params=params, data=None, headers=None, cookies=None,
-                            files=files, auth=None, timeout=timeout, allow_redirects=False, proxies=proxies, hooks=None,
-                            stream=None, verify=None, cert=None, json=json_body)
-
-    if resp.status_code != 200:
-        raise ApiException(f"The Server Returned {resp.json()} ", api_method, resp)
-    else:
-        logger.info(f"Response -> {resp.json()}")
-        return resp.json()
+    return (transport or default_transport).request(http_method, api_method, api_url, params, files, json_body,
+                                                    proxies, timeout)
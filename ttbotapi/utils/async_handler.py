@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.async_handler
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides asyncio api handler objects that are consumed internally,
+It requires aiohttp, install it with `pip install ttbotapi[async]`
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import asyncio
+from .logger import logger
+from .api_exceptions import ApiException
+from .api_handler import BASE_URL, JSON_HEADERS, encode_json_body, parse_response_body, rewind_files
+from .retry_policy import RetryPolicy
+from .upload_stream import MultipartStream
+
+
+class AsyncTransport(object):
+    """
+    This class represents a pooled keep-alive asyncio HTTP transport built on aiohttp,
+    A single ClientSession is shared by all requests, So thousands of requests can be in flight on one event loop.
+    make_request returns an awaitable when it is called with an AsyncTransport.
+    Failed requests are retried according to retry_policy.
+    """
+
+    def __init__(self, pool_size=100, base_url=BASE_URL, retry_policy=None):
+        """
+        :param int pool_size: Maximum number of simultaneous connections, 0 for no limit
+        :param str base_url: TamTam Bot API server url, Override it to talk to a local stub server
+        :param RetryPolicy or None retry_policy: Retry policy of failed requests, Defaults to RetryPolicy(),
+                                                 Pass RetryPolicy(max_retries=0) to never retry
+        """
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("AsyncTransport requires aiohttp, install it with `pip install ttbotapi[async]`")
+
+        self.__aiohttp = aiohttp
+        self.connection_errors = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+        self.base_url = base_url
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.pool_size = pool_size
+        self.__session = None
+
+    def get_session(self):
+        """
+        Returns the shared ClientSession, It is created on first use inside the running event loop
+        :return: aiohttp.ClientSession
+        """
+        if self.__session is None or self.__session.closed:
+            connector = self.__aiohttp.TCPConnector(limit=self.pool_size)
+            self.__session = self.__aiohttp.ClientSession(connector=connector)
+        return self.__session
+
+    @staticmethod
+    def build_params(params):
+        """
+        Converts a params dictionary into query pairs the same way requests does,
+        Lists are sent as repeated keys and every value is sent as its str()
+        :param dict or None params: Should be a dictionary with key-value pairs
+        :return: list of (key, value) pairs
+        """
+        pairs = []
+        if params:
+            for key, value in params.items():
+                if isinstance(value, (list, tuple)):
+                    pairs.extend((key, str(x)) for x in value)
+                elif value is not None:
+                    pairs.append((key, str(value)))
+        return pairs
+
+    def build_form(self, files):
+        """
+        Converts a requests-style files dictionary into aiohttp FormData
+        :param dict files: mapping of field name to file object or (filename, file object) tuple
+        :return: aiohttp.FormData
+        """
+        form = self.__aiohttp.FormData()
+        for name, value in files.items():
+            if isinstance(value, tuple):
+                form.add_field(name, value[1], filename=value[0])
+            else:
+                form.add_field(name, value)
+        return form
+
+    async def request(self, http_method, api_method, api_url, params, files, json_body, proxies, timeout):
+        """
+        Sends a request, Retrying it while retry_policy allows
+        :return: json
+        """
+        json_body = encode_json_body(json_body)
+        attempt = 0
+        while True:
+            try:
+                return await self.send(http_method, api_method, api_url, params, files, json_body, proxies, timeout)
+            except (ApiException,) + self.connection_errors as e:
+                delay = self.retry_policy.get_delay(http_method, api_method, attempt, e)
+                if delay is None or not rewind_files(files):
+                    raise
+                logger.warning("Retrying %s in %.2f seconds after %r", api_method, delay, e)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def send(self, http_method, api_method, api_url, params, files, json_body, proxies, timeout):
+        """
+        Sends a request once through the shared ClientSession
+        :return: json
+        """
+        proxy = None
+        if proxies:
+            proxy = proxies.get('https') or proxies.get('http')
+        headers = None
+        client_timeout = self.__aiohttp.ClientTimeout(total=timeout)
+        if isinstance(files, MultipartStream):
+            data = files.iter_chunks_async()
+            headers = {'Content-Type': files.content_type, 'Content-Length': str(len(files))}
+            client_timeout = self.__aiohttp.ClientTimeout(sock_connect=timeout, sock_read=timeout)
+        elif files:
+            data = self.build_form(files)
+        elif json_body is not None:
+            data = encode_json_body(json_body)
+            headers = JSON_HEADERS
+        else:
+            data = None
+        async with self.get_session().request(http_method, api_url, params=self.build_params(params), data=data,
+                                              headers=headers, proxy=proxy, allow_redirects=False,
+                                              timeout=client_timeout) as resp:
+            result = parse_response_body(await resp.read())
+
+        if resp.status != 200:
+            raise ApiException(f"The Server Returned {result} ", api_method, resp)
+        else:
+            logger.info("Response -> %s", result)
+            return result
+
+    async def close(self):
+        """
+        Closes the shared ClientSession and its pooled connections
+        """
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.checkpoint
+~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides the durable polling marker stores that are consumed internally
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+
+class CheckpointStore(object):
+    """
+    This class represents a durable store of the polling marker,
+    The bot commits the marker of a batch once all its handlers finished, Commits are kept in memory and written
+    to disk when interval seconds passed or every commits were made since the last write, So a crash replays at most
+    that many batches (at-least-once) while the cost of fsync is shared by many batches.
+    Polling calls flush_due periodically, So the last commit is written even when no further batch arrives.
+    Subclasses implement load and write.
+    """
+
+    def __init__(self, interval=1.0, every=100):
+        """
+        :param float interval: Maximum seconds a committed marker waits before it is written, 0 writes every commit
+        :param int every: Maximum number of commits before the marker is written
+        """
+        self.interval = interval
+        self.every = every
+        self.marker = None
+        self.writes = 0
+        self.__written = None
+        self.__commits = 0
+        self.__last_write = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def load(self):
+        """
+        Returns the last written marker
+        :rtype: int or None
+        """
+        raise NotImplementedError
+
+    def write(self, marker):
+        """
+        Durably writes the marker
+        :param int marker:
+        """
+        raise NotImplementedError
+
+    def commit(self, marker):
+        """
+        Records the marker of a batch whose handlers finished, Writes it when the interval or every is reached
+        :param int marker: polling marker
+        """
+        with self.__lock:
+            self.marker = marker
+            self.__commits += 1
+            if self.__commits >= self.every or time.monotonic() - self.__last_write >= self.interval:
+                self.__write()
+
+    def flush(self):
+        """
+        Writes the last committed marker if it was not written yet
+        """
+        with self.__lock:
+            self.__write()
+
+    def flush_due(self):
+        """
+        Writes the last committed marker if it was not written yet and interval seconds passed since the last write
+        """
+        with self.__lock:
+            if self.marker != self.__written and time.monotonic() - self.__last_write >= self.interval:
+                self.__write()
+
+    def __write(self):
+        if self.marker is not None and self.marker != self.__written:
+            self.write(self.marker)
+            self.__written = self.marker
+            self.writes += 1
+        self.__commits = 0
+        self.__last_write = time.monotonic()
+
+    def close(self):
+        """
+        Flushes the store
+        """
+        self.flush()
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    This class represents a marker stored in a small text file,
+    Each write goes to a temporary file that is fsynced and renamed over path, So path always holds a whole marker.
+    """
+
+    def __init__(self, path, interval=1.0, every=100):
+        """
+        :param str path: marker file, Created on the first write
+        :param float interval: Maximum seconds a committed marker waits before it is written, 0 writes every commit
+        :param int every: Maximum number of commits before the marker is written
+        """
+        super().__init__(interval, every)
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def write(self, marker):
+        temp = f'{self.path}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(str(marker))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.path)
+        if hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+class SqliteCheckpointStore(CheckpointStore):
+    """
+    This class represents markers stored in a sqlite database, One row per key, So many bots can share a database
+    """
+
+    def __init__(self, path, key='marker', interval=1.0, every=100):
+        """
+        :param str path: sqlite database file, Created if it does not exist
+        :param str key: name of the marker, E.g. the bot name
+        :param float interval: Maximum seconds a committed marker waits before it is written, 0 writes every commit
+        :param int every: Maximum number of commits before the marker is written
+        """
+        super().__init__(interval, every)
+        self.path = path
+        self.key = key
+        self.__db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__db.execute('PRAGMA journal_mode=WAL')
+        self.__db.execute('PRAGMA synchronous=FULL')
+        self.__db.execute('CREATE TABLE IF NOT EXISTS checkpoints (key TEXT PRIMARY KEY, marker INTEGER NOT NULL)')
+
+    def load(self):
+        row = self.__db.execute('SELECT marker FROM checkpoints WHERE key = ?', (self.key,)).fetchone()
+        return row[0] if row else None
+
+    def write(self, marker):
+        self.__db.execute('INSERT OR REPLACE INTO checkpoints (key, marker) VALUES (?, ?)', (self.key, marker))
+
+    def close(self):
+        """
+        Flushes the store and closes the sqlite database
+        """
+        super().close()
+        self.__db.close()
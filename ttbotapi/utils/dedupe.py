@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.dedupe
+~~~~~~~~~~~~~~~~~~~~~
+This submodule provides the duplicate update filter that is consumed internally by the dispatcher
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def update_identity(update):
+    """
+    Returns a key that is the same for every delivery of an update,
+    The message mid for new messages, The mid and timestamp for other message updates since a message is edited
+    many times, The callback id for callbacks, The session id for constructor updates,
+    Otherwise the chat, user and timestamp of the update
+    :param objects.Update update:
+    :rtype: tuple
+    """
+    if update.update_type == 'message_callback' and update.callback:
+        callback = update.callback
+        callback_id = callback.get('callback_id') if isinstance(callback, dict) else callback.callback_id
+        if callback_id:
+            return update.update_type, callback_id
+    if update.session_id:
+        return update.update_type, update.session_id, update.timestamp
+    if update.message is not None and update.message.body is not None and update.message.body.mid:
+        if update.update_type == 'message_created':
+            return update.update_type, update.message.body.mid
+        return update.update_type, update.message.body.mid, update.timestamp
+    user_id = update.user.user_id if update.user is not None else update.user_id
+    return update.update_type, update.timestamp, update.chat_id, user_id, update.message_id
+
+
+class DedupeFilter(object):
+    """
+    This class represents a bounded set of the update identities seen in the last window seconds,
+    An update whose identity is in the set is a duplicate and is dropped before its handlers run.
+    The oldest identities are forgotten when they leave the window or when maxsize identities are held,
+    So memory stays fixed whatever the traffic.
+    """
+
+    def __init__(self, maxsize=100000, window=3600.0, key=update_identity):
+        """
+        :param int maxsize: Maximum number of remembered identities
+        :param float window: Seconds an identity is remembered
+        :param function key: callable returning the hashable identity of an update
+        """
+        self.maxsize = maxsize
+        self.window = window
+        self.key = key
+        self.passed = 0
+        self.dropped = 0
+        self.__seen = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__seen)
+
+    def is_duplicate(self, update):
+        """
+        Returns whether the update was already seen in the window, Remembers it otherwise
+        :param objects.Update update:
+        :rtype: bool
+        """
+        identity = self.key(update)
+        now = time.monotonic()
+        with self.__lock:
+            seen = self.__seen
+            while seen and next(iter(seen.values())) <= now:
+                seen.popitem(last=False)
+            if identity in seen:
+                self.dropped += 1
+                return True
+            if len(seen) >= self.maxsize:
+                seen.popitem(last=False)
+            seen[identity] = now + self.window
+            self.passed += 1
+            return False
+
+    def stats(self):
+        """
+        Returns the filter counters
+        :return: dict with size, passed and dropped
+        :rtype: dict
+        """
+        return {'size': len(self), 'passed': self.passed, 'dropped': self.dropped}
@@ -9,6 +9,88 @@ This submodule provides json utility objects that are consumed internally
 """
 
 import json
+import importlib
+
+
+JSON_BACKENDS = ('orjson', 'ujson', 'json')
+json_backend = None
+
+
+def set_json_backend(name=None):
+    """
+    Selects the json library used to parse and serialize api objects and request/response bodies
+    :param str or None name: one of JSON_BACKENDS, None picks the fastest installed one
+    :return: the selected backend name
+    :rtype: str
+    """
+    global json_backend
+    for backend in ([name] if name else JSON_BACKENDS):
+        if backend not in JSON_BACKENDS:
+            raise ValueError(f"json backend should be one of {JSON_BACKENDS}, not {backend!r}")
+        try:
+            json_backend = importlib.import_module(backend)
+            return backend
+        except ImportError:
+            if name:
+                raise
+    return None
+
+
+def get_json_backend():
+    """
+    Returns the name of the selected json backend
+    :rtype: str
+    """
+    return json_backend.__name__
+
+
+def json_loads(data):
+    """
+    Parses a json document with the selected backend, Falls back to the json module on inputs the backend rejects
+    :param str or bytes or bytearray data: json document
+    :return: parsed object
+    """
+    try:
+        return json_backend.loads(data)
+    except ValueError:
+        if json_backend is json:
+            raise
+        return json.loads(data)
+
+
+def json_dumps_bytes(obj, default=None):
+    """
+    Serializes obj to compact utf-8 json bytes with the selected backend, Every backend gives the same bytes,
+    Falls back to the json module on objects the backend can not serialize (E.g. integers over 64 bits)
+    :param any obj: object to serialize
+    :param function or None default: called for objects that are not serializable
+    :return: bytes
+    """
+    if json_backend.__name__ == 'orjson':
+        try:
+            return json_backend.dumps(obj, default=default)
+        except TypeError:
+            pass
+    elif json_backend.__name__ == 'ujson' and default is None:
+        try:
+            return json_backend.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+        except (TypeError, OverflowError):
+            pass
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_dumps(obj, default=None):
+    """
+    Serializes obj to a json string with the json module, Whatever the selected backend,
+    So to_json and repr of api objects read the same everywhere
+    :param any obj: object to serialize
+    :param function or None default: called for objects that are not serializable
+    :return: str
+    """
+    return json.dumps(obj, default=default)
+
+
+set_json_backend()
 
 
 class JsonDeserializable(object):
@@ -17,6 +99,8 @@ class JsonDeserializable(object):
     All subclasses of this class must override de_json.
     """
 
+    __slots__ = ()
+
     @classmethod
     def de_json(cls, obj_type):
         """
@@ -31,18 +115,51 @@ class JsonDeserializable(object):
     def check_type(obj_type):
         """
         implement
-        Checks whether obj_type is a dict or a string. If it is already a dict, it is returned as-is,
-        If it is not, it is converted to a dict by means of json.loads(obj_type),
-        :param str or dict obj_type:
+        Checks whether obj_type is a dict, a string or bytes. If it is already a dict, it is returned as-is,
+        If it is not, it is converted to a dict by means of json_loads(obj_type),
+        :param str or bytes or dict obj_type:
         :return: dict
         """
 
-        if type(obj_type) == dict:
+        if isinstance(obj_type, dict):
             return obj_type
-        elif type(obj_type) == str:
-            return json.loads(obj_type)
+        elif isinstance(obj_type, (str, bytes, bytearray)):
+            return json_loads(obj_type)
         else:
-            raise ValueError("obj_type should be a dict or string.")
+            raise ValueError("obj_type should be a dict, string or bytes.")
+
+
+class LazyJsonDeserializable(JsonDeserializable):
+    """
+    Subclasses of this class keep the json-style dict they are created from and build each attribute from it
+    on first access, The value is then cached on the instance,
+    All subclasses of this class must define lazy_fields, a dict mapping an attribute name to a tuple of
+    (json key, parser or None), Missing keys give None.
+    """
+
+    __slots__ = ()
+    lazy_fields = {}
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    @classmethod
+    def de_json(cls, obj_type):
+        """
+        Returns an instance of this class that wraps the given json dict or string without parsing it.
+        :return: an instance of this class
+        """
+        return cls(cls.check_type(obj_type))
+
+    def __getattr__(self, name):
+        if name == 'raw' or name not in self.lazy_fields:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        key, parser = self.lazy_fields[name]
+        value = self.raw.get(key)
+        if value is not None and parser is not None:
+            value = parser(value)
+        setattr(self, name, value)
+        return value
 
 
 class JsonSerializable(object):
@@ -51,6 +168,8 @@ class JsonSerializable(object):
     All subclasses of this class must override to_json.
     """
 
+    __slots__ = ()
+
     def to_dict(self):
         """
         Returns a Dict string representation of this class.
@@ -65,7 +184,7 @@ class JsonSerializable(object):
         Returns a JSON string representation of this class.
         :return: a JSON formatted string.
         """
-        return json.dumps(self, default=self.custom_serializer)
+        return json_dumps(self, default=self.custom_serializer)
 
     def __repr__(self):
         return self.to_json()
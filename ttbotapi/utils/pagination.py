@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.pagination
+~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides the prefetching page iterators that are consumed internally by the iter_* bot methods
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+def iter_pages(fetch_page, marker=None, prefetch=True):
+    """
+    Yields the items of every page, following markers,
+    While the caller consumes a page the next one is fetched on a background thread, So at most two pages are held
+    :param function fetch_page: callable taking a marker and returning (items, next marker or None)
+    :param any marker: marker of the first page, None for the first page
+    :param bool prefetch: Fetch the next page while the current page is consumed
+    :return: generator of items
+    """
+    if not prefetch:
+        while True:
+            items, marker = fetch_page(marker)
+            yield from items
+            if marker is None:
+                return
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='PagePrefetcher')
+    try:
+        future = executor.submit(fetch_page, marker)
+        while future is not None:
+            items, marker = future.result()
+            future = executor.submit(fetch_page, marker) if marker is not None else None
+            yield from items
+    finally:
+        executor.shutdown(wait=False)
+
+
+async def aiter_pages(fetch_page, marker=None, prefetch=True):
+    """
+    Yields the items of every page, following markers,
+    While the caller consumes a page the next one is fetched in a task, So at most two pages are held
+    :param function fetch_page: coroutine function taking a marker and returning (items, next marker or None)
+    :param any marker: marker of the first page, None for the first page
+    :param bool prefetch: Fetch the next page while the current page is consumed
+    :return: async generator of items
+    """
+    task = asyncio.ensure_future(fetch_page(marker))
+    try:
+        while task is not None:
+            items, marker = await task
+            task = None
+            if marker is not None:
+                task = asyncio.ensure_future(fetch_page(marker)) if prefetch else None
+            for x in items:
+                yield x
+            if marker is not None and task is None:
+                task = asyncio.ensure_future(fetch_page(marker))
+    finally:
+        if task is not None:
+            task.cancel()
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.process_pool
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides a keyed worker process pool that is consumed internally by the dispatcher
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import multiprocessing
+import signal
+import threading
+import time
+from .logger import logger
+
+
+class ProcessPool(object):
+    """
+    This class represents a pool of forked worker processes with one pipe per process,
+    Payloads are sharded by key like WorkerPool, So payloads submitted with the same key always reach the same process
+    in submission order, While payloads with different keys are handled on other cores.
+    Payloads are bytes written as they are to the pipe, Nothing is pickled, Each process passes them to target.
+    target and everything it uses (E.g. handlers) are inherited by fork, So register them before the pool starts,
+    And start it from the thread that owns the program before other threads are started.
+    submit blocks when the pipe of the target process is full, which gives back pressure to the poller.
+    A worker process that died is forked again by the next submit to it, The payloads it had not handled are lost,
+    They are logged and counted as handled so marks taken before do not wait for them.
+    """
+
+    def __init__(self, target, processes=2, initializer=None, name='WorkerProcess'):
+        """
+        :param function target: callable receiving each payload in a worker process
+        :param int processes: Number of worker processes
+        :param function or None initializer: callable run once in each worker process before the first payload
+        :param str name: Worker processes name prefix
+        """
+        self.target = target
+        self.processes = processes
+        self.initializer = initializer
+        self.name = name
+        self.__workers = []
+        self.__submitted = [0] * processes
+        self.__generation = 0
+        self.__lock = threading.Lock()
+
+    def start(self):
+        """
+        Forks the worker processes, It must be called before submit,
+        Call it before starting other threads since only the calling thread survives a fork
+        """
+        with self.__lock:
+            if self.__workers:
+                return
+            workers = []
+            for i in range(self.processes):
+                workers.append(self.__fork(i, 0, [x[1] for x in workers]) + (threading.Lock(),))
+            # The counters and the marks taken from them start over with the new processes
+            self.__submitted = [0] * self.processes
+            self.__generation += 1
+            self.__workers = workers
+
+    def __fork(self, i, handled, writers):
+        """
+        Forks worker process i
+        :param int i: index of the worker
+        :param int handled: initial value of its handled counter
+        :param list writers: pipes of the other workers, Closed in the new process
+        :return: (process, writer, handled)
+        """
+        context = multiprocessing.get_context('fork')
+        reader, writer = context.Pipe(duplex=False)
+        counter = context.Value('q', handled, lock=False)
+        process = context.Process(target=self.__run, name=f'{self.name}-{i}', daemon=True,
+                                  args=(reader, counter, writers + [writer]))
+        process.start()
+        reader.close()
+        return process, writer, counter
+
+    def __restart(self, i):
+        """
+        Forks worker i again after it died, Its lock must be held
+        """
+        process, writer, handled, lock = self.__workers[i]
+        lost = self.__submitted[i] - handled.value
+        logger.error(f"Worker process {process.name} exited with {process.exitcode}, {lost} payloads were lost")
+        writer.close()
+        process.join()
+        others = [x[1] for j, x in enumerate(self.__workers) if j != i]
+        self.__workers[i] = self.__fork(i, self.__submitted[i], others) + (lock,)
+
+    @property
+    def is_running(self):
+        return bool(self.__workers)
+
+    def pending(self):
+        """
+        Returns the number of payloads submitted to each worker process and not handled yet
+        :return: list[int]
+        """
+        return [submitted - x[2].value for submitted, x in zip(self.__submitted, self.__workers)]
+
+    def submit(self, key, payload):
+        """
+        Sends a payload to the worker process that owns key
+        :param any key: hashable ordering key, payloads with an equal key are handled in order by one process
+        :param bytes payload: serialized task, Must not be empty
+        """
+        if not self.__workers:
+            raise ValueError("ProcessPool is not started, Call start before submitting payloads")
+        i = hash(key) % self.processes
+        lock = self.__workers[i][3]
+        with lock:
+            if not self.__workers[i][0].is_alive():
+                self.__restart(i)
+            try:
+                self.__workers[i][1].send_bytes(payload)
+            except OSError:
+                # The process died after the check, So its pipe is broken
+                self.__restart(i)
+                self.__workers[i][1].send_bytes(payload)
+            self.__submitted[i] += 1
+
+    def mark(self):
+        """
+        Returns a mark of the payloads submitted so far, Pass it to done to know when they have all been handled
+        :rtype: tuple
+        """
+        return self.__generation, tuple(self.__submitted)
+
+    def done(self, mark):
+        """
+        Returns whether every payload submitted before mark was taken has been handled,
+        The payloads of processes that were stopped since then count as handled
+        :param tuple mark: value returned by mark
+        :rtype: bool
+        """
+        generation, counts = mark
+        workers = self.__workers
+        if not workers or generation != self.__generation:
+            return True
+        return all(x[2].value >= submitted for x, submitted in zip(workers, counts))
+
+    def join(self, interval=0.01):
+        """
+        Blocks until every submitted payload has been handled
+        """
+        while any(self.pending()):
+            time.sleep(interval)
+
+    def stop(self, wait=True):
+        """
+        Stops the worker processes after they handle their submitted payloads
+        :param bool wait: Block until the worker processes exit
+        """
+        with self.__lock:
+            workers = self.__workers
+            self.__workers = []
+        for process, writer, handled, lock in workers:
+            with lock:
+                try:
+                    writer.send_bytes(b'')
+                except OSError:
+                    pass
+                writer.close()
+        if wait:
+            for process, *_ in workers:
+                process.join()
+
+    def __run(self, reader, handled, writers):
+        # The parent stops the pool gracefully, So a Ctrl+C on the terminal must not kill a worker mid queue
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        for writer in writers:
+            writer.close()
+        if self.initializer is not None:
+            self.initializer()
+        while True:
+            try:
+                payload = reader.recv_bytes()
+            except EOFError:
+                break
+            if not payload:
+                break
+            try:
+                self.target(payload)
+            except Exception as e:
+                logger.error(f"Worker process task raised {e!r}")
+            finally:
+                handled.value += 1
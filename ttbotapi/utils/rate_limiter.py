@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.rate_limiter
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides outbound rate limiting objects that are consumed internally
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucket(object):
+    """
+    This class represents a token bucket of `rate` tokens per second holding up to `capacity` tokens,
+    Callers reserve a token and get back how long they must wait before using it, Reservations are made under
+    a lock in arrival order, So the rate holds with any number of threads or tasks waiting at the same time.
+    It is implemented as a generic cell rate algorithm, The bucket state is a single theoretical arrival time.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        :param float rate: tokens added per second
+        :param int or None capacity: maximum burst size, Defaults to max(1, rate)
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.__interval = 1.0 / rate
+        self.__tolerance = (self.capacity - 1) * self.__interval
+        self.__tat = 0.0
+        self.__lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Reserves a token
+        :return: monotonic time at which the token can be used
+        :rtype: float
+        """
+        with self.__lock:
+            now = time.monotonic()
+            tat = max(self.__tat, now)
+            allowed_at = max(now, tat - self.__tolerance)
+            self.__tat = tat + self.__interval
+            return allowed_at
+
+    def is_idle(self, now=None):
+        """
+        Returns True if the bucket is full, A full bucket holds no state and can be dropped
+        """
+        return self.__tat <= (now or time.monotonic())
+
+    def state(self):
+        """
+        Returns the current bucket state
+        :return: dict with rate, capacity, tokens available now and seconds until the bucket is full
+        :rtype: dict
+        """
+        now = time.monotonic()
+        backlog = max(0.0, self.__tat - now)
+        return {
+            'rate': self.rate,
+            'capacity': self.capacity,
+            'tokens': max(0.0, self.capacity - backlog / self.__interval),
+            'refill_in': backlog
+        }
+
+
+class RateLimiter(object):
+    """
+    This class represents an outbound rate limiter with a global token bucket and one token bucket per chat,
+    A call first waits for its chat slot, then takes a global token at the time it is really sent,
+    So a busy chat waits for its own slots without holding back the global bucket of the other chats.
+    Calls are delayed, never rejected.
+    Idle chat buckets are dropped first when more than max_chats chats are tracked.
+    """
+
+    def __init__(self, rate=30, burst=None, chat_rate=1, chat_burst=None, max_chats=10000):
+        """
+        :param float rate: global requests per second
+        :param int or None burst: global burst size, Defaults to rate
+        :param float or None chat_rate: requests per second to one chat, None for no per chat limit
+        :param int or None chat_burst: per chat burst size, Defaults to chat_rate
+        :param int max_chats: maximum number of chat buckets kept
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_chats = max_chats
+        self.waits = 0
+        self.wait_time = 0.0
+        self.__chats = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def chat_bucket(self, chat_id):
+        """
+        Returns the token bucket of a chat, creating it if needed
+        :param any chat_id: chat identifier
+        :return: TokenBucket
+        """
+        with self.__lock:
+            bucket = self.__chats.get(chat_id)
+            if bucket is None:
+                if len(self.__chats) >= self.max_chats:
+                    self.__evict()
+                bucket = self.__chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            else:
+                self.__chats.move_to_end(chat_id)
+            return bucket
+
+    def __evict(self):
+        now = time.monotonic()
+        for chat_id in [k for k, v in self.__chats.items() if v.is_idle(now)]:
+            del self.__chats[chat_id]
+        while len(self.__chats) >= self.max_chats:
+            self.__chats.popitem(last=False)
+
+    def reserve_chat(self, chat_id):
+        """
+        Reserves the next slot of a chat, The global bucket is not touched
+        :param any chat_id: chat identifier, None for no chat slot
+        :return: seconds to wait before taking the global token with reserve
+        :rtype: float
+        """
+        if chat_id is None or not self.chat_rate:
+            return 0.0
+        return max(0.0, self.chat_bucket(chat_id).reserve() - time.monotonic())
+
+    def reserve(self):
+        """
+        Reserves a global token now, Call it once the chat slot is reached
+        :return: seconds to wait before sending
+        :rtype: float
+        """
+        return max(0.0, self.bucket.reserve() - time.monotonic())
+
+    def __count(self, wait):
+        if wait > 0:
+            with self.__lock:
+                self.waits += 1
+                self.wait_time += wait
+
+    def acquire(self, chat_id=None):
+        """
+        Blocks the calling thread until a request to chat_id is allowed
+        :param any chat_id: chat identifier
+        """
+        chat_wait = self.reserve_chat(chat_id)
+        if chat_wait:
+            time.sleep(chat_wait)
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        self.__count(chat_wait + wait)
+
+    async def acquire_async(self, chat_id=None):
+        """
+        Suspends the calling task until a request to chat_id is allowed
+        :param any chat_id: chat identifier
+        """
+        chat_wait = self.reserve_chat(chat_id)
+        if chat_wait:
+            await asyncio.sleep(chat_wait)
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        self.__count(chat_wait + wait)
+
+    def chat_state(self, chat_id):
+        """
+        Returns the bucket state of a chat, or None if the chat is not tracked
+        :param any chat_id: chat identifier
+        :rtype: dict or None
+        """
+        bucket = self.__chats.get(chat_id)
+        return bucket.state() if bucket else None
+
+    def stats(self):
+        """
+        Returns the limiter state
+        :return: dict with the global bucket state, number of tracked chats, delayed calls and total delay
+        :rtype: dict
+        """
+        return {
+            'global': self.bucket.state(),
+            'chats': len(self.__chats),
+            'waits': self.waits,
+            'wait_time': self.wait_time
+        }
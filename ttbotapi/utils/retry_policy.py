@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.retry_policy
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides the retry policy objects that are consumed internally by the transports
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from .api_exceptions import ApiException
+
+
+def backoff_delay(attempt, backoff=0.25, max_backoff=30.0):
+    """
+    Returns a capped exponential backoff delay with full jitter,
+    The delay is drawn uniformly from [0, min(max_backoff, backoff * 2 ** attempt)] so many clients failing at
+    the same time do not retry at the same time
+    :param int attempt: Number of failed attempts so far, starting at 0
+    :param float backoff: Delay ceiling of the first retry in seconds
+    :param float max_backoff: Maximum delay ceiling in seconds
+    :return: seconds
+    :rtype: float
+    """
+    return random.uniform(0, min(max_backoff, backoff * 2 ** min(attempt, 32)))
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header value, either delay seconds or an HTTP date
+    :param str or None value: header value
+    :return: seconds to wait, or None if value is missing or invalid
+    :rtype: float or None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class RetryPolicy(object):
+    """
+    This class represents the retry policy of a transport,
+    Responses with a status in retry_statuses (429 and 5xx by default) and connection errors or timeouts are retried,
+    Any other ApiException is permanent and raised at once.
+    Only idempotent HTTP methods are retried on errors other than 429 by default, A POST (E.g. send_message) that
+    timed out or got a 5xx may have been handled by the server already, So retrying it could send a message twice.
+    A Retry-After header sent with the response is honored, Otherwise the delay is a capped jittered exponential
+    backoff, Each request starts again from the first delay.
+    Retries, and failed requests that are not retried anymore, are counted per api_method.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    IDEMPOTENT_METHODS = ('GET', 'PUT', 'PATCH', 'DELETE')
+
+    def __init__(self, max_retries=3, backoff=0.5, max_backoff=30.0, max_retry_after=60.0,
+                 retry_statuses=RETRY_STATUSES, http_methods=IDEMPOTENT_METHODS):
+        """
+        :param int max_retries: Maximum number of retries of a request, 0 disables retrying
+        :param float backoff: Delay ceiling of the first retry in seconds
+        :param float max_backoff: Maximum delay ceiling in seconds
+        :param float max_retry_after: Longest Retry-After honored, A longer one raises the ApiException
+        :param tuple retry_statuses: HTTP statuses that are retried
+        :param tuple or None http_methods: HTTP methods retried on errors other than 429, Idempotent methods by
+                                           default, Pass None to also retry POST at the risk of sending a message
+                                           twice when the server received it but the response was lost
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = retry_statuses
+        self.http_methods = http_methods
+        self.retries = Counter()
+        self.failures = Counter()
+        self.__lock = threading.Lock()
+
+    def get_delay(self, http_method, api_method, attempt, error):
+        """
+        Returns how long to wait before retrying a failed request, or None if it should not be retried,
+        A returned delay is counted as a retry of api_method
+        :param str http_method: HTTP method of the request
+        :param str api_method: Name of the API method (E.g. 'messages')
+        :param int attempt: Number of failed attempts so far, starting at 0
+        :param Exception error: ApiException, or a connection error or timeout of the transport
+        :return: seconds or None
+        :rtype: float or None
+        """
+        delay = None
+        if attempt < self.max_retries:
+            status = getattr(error, 'status_code', None) if isinstance(error, ApiException) else None
+            if status == 429 or self.http_methods is None or http_method.upper() in self.http_methods:
+                if not isinstance(error, ApiException) or status in self.retry_statuses:
+                    delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+                    retry_after = parse_retry_after(getattr(error, 'retry_after', None))
+                    if retry_after is not None:
+                        delay = retry_after if retry_after <= self.max_retry_after else None
+
+        with self.__lock:
+            if delay is None:
+                self.failures[api_method] += 1
+            else:
+                self.retries[api_method] += 1
+        return delay
+
+    def stats(self):
+        """
+        Returns the retry counters
+        :return: dict with retries and failures, each mapping api_method to a count
+        :rtype: dict
+        """
+        with self.__lock:
+            return {'retries': dict(self.retries), 'failures': dict(self.failures)}
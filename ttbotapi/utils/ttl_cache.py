@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.ttl_cache
+~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides the lookup cache objects that are consumed internally
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache(object):
+    """
+    This class represents a thread-safe cache whose entries expire ttl seconds after they are stored,
+    When maxsize entries are stored the least recently used one is evicted.
+    A value loaded while an invalidation happens is not stored, So an update can not be overwritten by a stale lookup.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0):
+        """
+        :param int maxsize: Maximum number of entries
+        :param float ttl: Seconds an entry stays valid
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.__generation = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key, default=None):
+        """
+        Returns the value of a key, or default if it is missing or expired
+        :param tuple key: entry key
+        :param any default: value returned on a miss
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self.__entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """
+        Stores a value, Evicting the least recently used entry when the cache is full
+        :param tuple key: entry key
+        :param any value: value to store
+        """
+        with self.__lock:
+            self.__store(key, value)
+
+    def __store(self, key, value):
+        self.__entries[key] = (time.monotonic() + self.ttl, value)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_load(self, key, load):
+        """
+        Returns the cached value of a key, Calling load and storing its result on a miss
+        :param tuple key: entry key
+        :param function load: callable returning the value
+        """
+        value = self.get(key, self)
+        if value is self:
+            generation = self.__generation
+            value = load()
+            with self.__lock:
+                if generation == self.__generation:
+                    self.__store(key, value)
+        return value
+
+    async def get_or_load_async(self, key, load):
+        """
+        Returns the cached value of a key, Awaiting load and storing its result on a miss
+        :param tuple key: entry key
+        :param function load: coroutine function returning the value
+        """
+        value = self.get(key, self)
+        if value is self:
+            generation = self.__generation
+            value = await load()
+            with self.__lock:
+                if generation == self.__generation:
+                    self.__store(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        """
+        Removes entries
+        :param tuple keys: entries keys
+        """
+        with self.__lock:
+            self.__generation += 1
+            for key in keys:
+                if self.__entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        """
+        Removes every entry
+        """
+        with self.__lock:
+            self.__generation += 1
+            self.invalidations += len(self.__entries)
+            self.__entries.clear()
+
+    def stats(self):
+        """
+        Returns the cache counters
+        :return: dict with size, hits, misses, evictions and invalidations
+        :rtype: dict
+        """
+        return {
+            'size': len(self.__entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.update_log
+~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides the recording and replay objects of update streams that are consumed internally
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import asyncio
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+from .json_helper import json_dumps_bytes, json_loads
+
+
+INDEX_RECORD = struct.Struct('<QdI')
+
+
+class UpdateRecorder(object):
+    """
+    This class represents an append-only log of the raw update batches received by get_updates,
+    Every batch is one JSON line {"time", "marker", "updates"} appended to path, Empty batches are not recorded.
+    A sidecar index (path.idx) holds the offset, time and size of each batch as fixed-size records,
+    So a replay can count batches and seek to a time without reading the log.
+    """
+
+    def __init__(self, path, fsync=False):
+        """
+        :param str path: log file, Batches are appended when it already exists
+        :param bool fsync: Flush each batch to disk before returning, Survives a crash of the machine
+        """
+        self.path = path
+        self.fsync = fsync
+        self.batches = 0
+        self.updates = 0
+        self.__lock = threading.Lock()
+        self.__log = open(path, 'ab')
+        self.__index = open(path + '.idx', 'ab')
+
+    def record(self, resp):
+        """
+        Appends a batch as it was returned by the API
+        :param dict resp: raw get_updates response with updates and marker
+        """
+        updates = resp.get('updates')
+        if not updates:
+            return
+        now = time.time()
+        line = json_dumps_bytes({'time': now, 'marker': resp.get('marker'), 'updates': updates}) + b'\n'
+        with self.__lock:
+            offset = self.__log.tell()
+            self.__log.write(line)
+            self.__index.write(INDEX_RECORD.pack(offset, now, len(updates)))
+            self.__log.flush()
+            self.__index.flush()
+            if self.fsync:
+                os.fsync(self.__log.fileno())
+                os.fsync(self.__index.fileno())
+            self.batches += 1
+            self.updates += len(updates)
+
+    def close(self):
+        """
+        Closes the log and its index
+        """
+        with self.__lock:
+            self.__log.close()
+            self.__index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class UpdateLog(object):
+    """
+    This class represents a recorded update log read through a memory map, So archives larger than memory are
+    streamed, Pages already read are released from the mapping.
+    The index written by UpdateRecorder is used when it matches the log, Otherwise the log is scanned once.
+    """
+
+    def __init__(self, path, chunk_size=16777216):
+        """
+        :param str path: log file written by UpdateRecorder
+        :param int chunk_size: bytes read before the pages behind are released
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.__file = open(path, 'rb')
+        self.__size = os.fstat(self.__file.fileno()).st_size
+        self.__mmap = None
+        if self.__size:
+            self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__offsets, self.__times, self.__counts = self.__read_index()
+
+    def __read_index(self):
+        try:
+            with open(self.path + '.idx', 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = b''
+        records = list(INDEX_RECORD.iter_unpack(data[:len(data) - len(data) % INDEX_RECORD.size]))
+        # The index matches when its last batch is the last line of the log
+        last = records[-1][0] if records else self.__size
+        if last < self.__size and self.__mmap.find(b'\n', last) == self.__size - 1:
+            return [x[0] for x in records], [x[1] for x in records], [x[2] for x in records]
+        return self.__scan()
+
+    def __scan(self):
+        offsets, times, counts = [], [], []
+        position = 0
+        while position < self.__size:
+            end = self.__mmap.find(b'\n', position)
+            if end == -1:
+                break
+            batch = json_loads(self.__mmap[position:end])
+            offsets.append(position)
+            times.append(batch['time'])
+            counts.append(len(batch['updates']))
+            position = end + 1
+        return offsets, times, counts
+
+    def __len__(self):
+        return len(self.__offsets)
+
+    @property
+    def updates(self):
+        """
+        Number of updates in the log
+        :rtype: int
+        """
+        return sum(self.__counts)
+
+    @property
+    def duration(self):
+        """
+        Seconds between the first and the last recorded batch
+        :rtype: float
+        """
+        return self.__times[-1] - self.__times[0] if self.__times else 0.0
+
+    def iter_batches(self, start=None, end=None):
+        """
+        Yields (recorded time, list of raw update dicts) in recorded order
+        :param float or None start: Skip batches recorded before this unix time
+        :param float or None end: Stop at the first batch recorded after this unix time
+        """
+        first = bisect.bisect_left(self.__times, start) if start is not None else 0
+        released = self.__offsets[first] // mmap.PAGESIZE * mmap.PAGESIZE if first < len(self) else 0
+        for i in range(first, len(self)):
+            if end is not None and self.__times[i] > end:
+                break
+            offset = self.__offsets[i]
+            line_end = self.__mmap.find(b'\n', offset)
+            batch = json_loads(self.__mmap[offset:line_end])
+            if hasattr(mmap, 'MADV_DONTNEED') and line_end - released >= self.chunk_size:
+                release = line_end // mmap.PAGESIZE * mmap.PAGESIZE
+                self.__mmap.madvise(mmap.MADV_DONTNEED, released, release - released)
+                released = release
+            yield self.__times[i], batch['updates']
+
+    def replay(self, speed=1.0, start=None, end=None):
+        """
+        Yields lists of raw update dicts paced like they were recorded
+        :param float or None speed: 1.0 for the original speed, 2.0 for twice as fast, None or 0 for full speed
+        :param float or None start: Skip batches recorded before this unix time
+        :param float or None end: Stop at the first batch recorded after this unix time
+        """
+        origin = started = None
+        for recorded, updates in self.iter_batches(start, end):
+            if speed:
+                if origin is None:
+                    origin, started = recorded, time.monotonic()
+                delay = (recorded - origin) / speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            yield updates
+
+    async def replay_async(self, speed=1.0, start=None, end=None):
+        """
+        Same as replay, Waiting with asyncio.sleep instead of blocking the event loop
+        """
+        loop = asyncio.get_running_loop()
+        origin = started = None
+        for recorded, updates in self.iter_batches(start, end):
+            if speed:
+                if origin is None:
+                    origin, started = recorded, loop.time()
+                delay = (recorded - origin) / speed - (loop.time() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield updates
+
+    def close(self):
+        """
+        Releases the memory map and closes the log
+        """
+        if self.__mmap is not None:
+            self.__mmap.close()
+            self.__mmap = None
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.upload_cache
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides the content addressed upload cache objects that are consumed internally
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from .json_helper import json_dumps, json_loads
+
+
+def hash_source(source, chunk_size=1048576):
+    """
+    Returns the sha256 hex digest of a file, reading it chunk by chunk
+    :param str or os.PathLike or io.BufferedIOBase source: path of a local file or a binary file object,
+                                                           A file object is hashed from its current position
+                                                           and moved back there, It must be seekable
+    :param int chunk_size: bytes read at once
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    else:
+        if not getattr(source, 'seekable', lambda: False)():
+            raise ValueError("Only a seekable file object can be hashed, Spool it to a file first")
+        start = source.tell()
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+        source.seek(start)
+    return digest.hexdigest()
+
+
+class UploadCache(object):
+    """
+    This class represents an in-memory cache of upload payloads keyed by file type and content hash,
+    So a file that was already uploaded is sent again by its token without touching the network.
+    Entries expire ttl seconds after they are stored and the least recently used one is evicted above maxsize.
+    """
+
+    def __init__(self, maxsize=10000, ttl=None):
+        """
+        :param int maxsize: Maximum number of entries
+        :param float or None ttl: Seconds an entry stays valid, None to keep entries until they are evicted
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def key(source, ttype, chunk_size=1048576):
+        """
+        Returns the cache key of a file
+        :param str or os.PathLike or io.BufferedIOBase source: path of a local file or a binary file object
+        :param str ttype: type of the file
+        :param int chunk_size: bytes read at once while hashing
+        :rtype: str
+        """
+        return f'{ttype}:{hash_source(source, chunk_size)}'
+
+    def expires_at(self):
+        return time.time() + self.ttl if self.ttl else None
+
+    def get(self, key):
+        """
+        Returns the payload stored for key, or None if it is missing or expired
+        :param str key: cache key
+        :rtype: dict or None
+        """
+        payload = self.load(key)
+        with self.__lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return payload
+
+    def set(self, key, payload):
+        """
+        Stores the payload of an uploaded file
+        :param str key: cache key
+        :param dict payload: attachment payload returned by the upload
+        """
+        self.store(key, payload)
+
+    def load(self, key):
+        """
+        Returns the stored payload of key without counting a hit or a miss,
+        Override it together with store to change the backend
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] <= time.time():
+                del self.__entries[key]
+                return None
+            self.__entries.move_to_end(key)
+            return entry[1]
+
+    def store(self, key, payload):
+        with self.__lock:
+            self.__entries[key] = (self.expires_at(), payload)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def stats(self):
+        """
+        Returns the cache counters
+        :return: dict with size, hits and misses
+        :rtype: dict
+        """
+        return {'size': len(self), 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        pass
+
+
+class SqliteUploadCache(UploadCache):
+    """
+    This class represents an upload cache persisted in a local sqlite file, So tokens survive restarts and can be
+    shared by the processes of one host.
+    """
+
+    def __init__(self, path, maxsize=100000, ttl=None):
+        """
+        :param str path: sqlite database file, Created if it does not exist
+        :param int maxsize: Maximum number of entries
+        :param float or None ttl: Seconds an entry stays valid, None to keep entries until they are evicted
+        """
+        super().__init__(maxsize, ttl)
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__db.execute('PRAGMA journal_mode=WAL')
+        self.__db.execute('CREATE TABLE IF NOT EXISTS uploads '
+                          '(key TEXT PRIMARY KEY, payload TEXT NOT NULL, expires REAL, used REAL NOT NULL)')
+        self.__db.execute('CREATE INDEX IF NOT EXISTS uploads_used ON uploads (used)')
+        self.__db.execute('CREATE INDEX IF NOT EXISTS uploads_expires ON uploads (expires)')
+
+    def load(self, key):
+        now = time.time()
+        with self.__lock:
+            row = self.__db.execute('SELECT payload, expires FROM uploads WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] <= now:
+                self.__db.execute('DELETE FROM uploads WHERE key = ?', (key,))
+                return None
+            self.__db.execute('UPDATE uploads SET used = ? WHERE key = ?', (now, key))
+        return json_loads(row[0])
+
+    def store(self, key, payload):
+        now = time.time()
+        with self.__lock:
+            self.__db.execute('INSERT OR REPLACE INTO uploads (key, payload, expires, used) VALUES (?, ?, ?, ?)',
+                              (key, json_dumps(payload), self.expires_at(), now))
+            self.__db.execute('DELETE FROM uploads WHERE expires <= ?', (now,))
+            self.__db.execute('DELETE FROM uploads WHERE key IN (SELECT key FROM uploads ORDER BY used DESC '
+                              'LIMIT -1 OFFSET ?)', (self.maxsize,))
+
+    def __len__(self):
+        with self.__lock:
+            return self.__db.execute('SELECT COUNT(*) FROM uploads').fetchone()[0]
+
+    def close(self):
+        """
+        Closes the sqlite database
+        """
+        with self.__lock:
+            self.__db.close()
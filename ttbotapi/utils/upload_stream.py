@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.upload_stream
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides the streaming multipart upload objects that are consumed internally
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import asyncio
+import mmap
+import os
+import shutil
+import tempfile
+import uuid
+
+
+def source_filename(source):
+    """
+    Returns the base name of a file path or of the name of a file object, 'file' if it has none
+    :param str or os.PathLike or io.BufferedIOBase source: path of a local file or a binary file object
+    :rtype: str
+    """
+    name = source if isinstance(source, (str, bytes, os.PathLike)) else getattr(source, 'name', None)
+    if not isinstance(name, (str, bytes, os.PathLike)):
+        return 'file'
+    return os.path.basename(os.fsdecode(name))
+
+
+def spool(source, chunk_size=1048576):
+    """
+    Returns a seekable file holding a non seekable stream (E.g. a pipe, a socket or an HTTP response),
+    It is copied chunk by chunk to a temporary file on disk, So the memory used does not depend on its size.
+    Paths and seekable file objects are returned as they are, Close the returned file when it is not source
+    :param str or os.PathLike or io.BufferedIOBase source: path of a local file or a binary file object
+    :param int chunk_size: bytes read at once
+    :rtype: str or os.PathLike or io.BufferedIOBase
+    """
+    if isinstance(source, (str, bytes, os.PathLike)) or getattr(source, 'seekable', lambda: False)():
+        return source
+    spooled = tempfile.TemporaryFile()
+    try:
+        shutil.copyfileobj(source, spooled, chunk_size)
+        spooled.seek(0)
+    except BaseException:
+        spooled.close()
+        raise
+    return spooled
+
+
+class MultipartStream(object):
+    """
+    This class represents a multipart/form-data body holding a single file that is read chunk by chunk while it is
+    sent, So the memory used does not depend on the file size.
+    A local file is read through a read-only memory map, Pages already sent are released from the mapping,
+    A file object is read with read(chunk_size).
+    It is a file-like object with a length, So requests sends it with a Content-Length instead of loading it.
+    """
+
+    def __init__(self, source, filename=None, field='data', chunk_size=1048576, progress=None):
+        """
+        :param str or os.PathLike or io.BufferedIOBase source: path of a local file or a binary file object
+        :param str or None filename: file name sent to the server, Defaults to the base name of source
+        :param str field: form field name of the file
+        :param int chunk_size: bytes read from the file at once
+        :param function or None progress: callable receiving (bytes sent, total bytes) each time another chunk_size
+                                          bytes of the file are sent and at the end
+        """
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.sent = 0
+        self.__own_file = isinstance(source, (str, bytes, os.PathLike))
+        self.__file = open(source, 'rb') if self.__own_file else source
+        self.__start = 0 if self.__own_file else self.__file.tell()
+        self.file_size = self.__get_file_size()
+        self.__mmap = None
+        if self.__own_file and self.file_size:
+            self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self.__mmap.madvise(mmap.MADV_SEQUENTIAL)
+
+        if filename is None:
+            filename = source_filename(source)
+        boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+        filename = filename.replace('"', '%22')
+        self.__head = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                       f'Content-Type: application/octet-stream\r\n\r\n').encode()
+        self.__tail = f'\r\n--{boundary}--\r\n'.encode()
+        self.__length = len(self.__head) + self.file_size + len(self.__tail)
+        self.__position = 0
+        self.__released = 0
+
+    def __get_file_size(self):
+        try:
+            return os.fstat(self.__file.fileno()).st_size - self.__start
+        except (AttributeError, OSError, ValueError):
+            end = self.__file.seek(0, os.SEEK_END)
+            self.__file.seek(self.__start)
+            return end - self.__start
+
+    def __len__(self):
+        return self.__length
+
+    def __read_file(self, offset, size):
+        if self.__mmap is None:
+            return self.__file.read(size)
+        data = self.__mmap[offset:offset + size]
+        if hasattr(mmap, 'MADV_DONTNEED'):
+            release = (offset + len(data)) // mmap.PAGESIZE * mmap.PAGESIZE
+            if release - self.__released >= self.chunk_size:
+                self.__mmap.madvise(mmap.MADV_DONTNEED, self.__released, release - self.__released)
+                self.__released = release
+        return data
+
+    def read(self, size=-1):
+        """
+        Returns the next bytes of the body, b'' at the end
+        :param int size: maximum number of bytes, chunk_size when negative
+        :rtype: bytes
+        """
+        if size is None or size < 0:
+            size = self.chunk_size
+        size = min(size, self.chunk_size)
+        head, tail = len(self.__head), len(self.__head) + self.file_size
+        position = self.__position
+        if position < head:
+            data = self.__head[position:position + size]
+        elif position < tail:
+            data = self.__read_file(position - head, min(size, tail - position))
+            if not data:
+                raise IOError(f"File ended after {position - head} of {self.file_size} bytes")
+            self.sent += len(data)
+            if self.progress and (self.sent == self.file_size or
+                                  self.sent // self.chunk_size != (self.sent - len(data)) // self.chunk_size):
+                self.progress(self.sent, self.file_size)
+        else:
+            data = self.__tail[position - tail:position - tail + size]
+        self.__position += len(data)
+        return data
+
+    def __iter__(self):
+        data = self.read()
+        while data:
+            yield data
+            data = self.read()
+
+    async def iter_chunks_async(self):
+        """
+        Yields the body chunk by chunk, Reading the file on the default executor so the event loop never waits on disk
+        """
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, self.read)
+        while data:
+            yield data
+            data = await loop.run_in_executor(None, self.read)
+
+    def rewind(self):
+        """
+        Moves back to the start of the body so it can be sent again
+        :return: True
+        """
+        self.__position = 0
+        self.__released = 0
+        self.sent = 0
+        if self.__mmap is None:
+            self.__file.seek(self.__start)
+        return True
+
+    def close(self):
+        """
+        Releases the memory map and closes the file if it was opened from a path
+        """
+        if self.__mmap is not None:
+            self.__mmap.close()
+            self.__mmap = None
+        if self.__own_file:
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.webhook_server
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides a webhook receiver server that is consumed internally
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import hmac
+import queue
+import ssl
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from .logger import logger
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    """
+    This class represents a request of the WebhookServer, It reaches the WebhookServer through server.webhook
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, msg, *args):
+        logger.debug(f"Webhook -> {msg % args}")
+
+    def setup(self):
+        self.handshake_failed = False
+        if isinstance(self.request, ssl.SSLSocket):
+            try:
+                self.request.settimeout(self.server.webhook.handshake_timeout)
+                self.request.do_handshake()
+                self.request.settimeout(None)
+            except (ssl.SSLError, OSError) as e:
+                logger.debug(f"Webhook TLS handshake failed {e!r}")
+                self.handshake_failed = True
+        super().setup()
+
+    def handle(self):
+        if not self.handshake_failed:
+            super().handle()
+
+    def reply(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        webhook = self.server.webhook
+        if not hmac.compare_digest(self.path.encode(), webhook.url_path.encode()):
+            self.close_connection = True
+            return self.reply(404)
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            return self.reply(400)
+        if length > webhook.max_body_size:
+            self.close_connection = True
+            return self.reply(413)
+        body = self.rfile.read(length)
+        try:
+            webhook.intake.put_nowait(body)
+        except queue.Full:
+            webhook.count(rejected=1)
+            return self.reply(503)
+        webhook.count(received=1)
+        self.reply(200)
+
+
+class WebhookServer(object):
+    """
+    This class represents a threaded HTTP server that receives WebHook pushes,
+    Request threads only validate the path and put the raw body in a bounded intake queue,
+    A single consumer thread hands the queued bodies in batches to on_updates.
+    When the queue is full the server answers 503 so the update is delivered again later.
+    With TLS the handshake runs on the request thread, So a slow client does not hold up the accept loop.
+    A server serves once, stop ends it even when it is called before serving started.
+    """
+    handshake_timeout = 10.0
+
+    def __init__(self, on_updates, host='0.0.0.0', port=8080, path='/', secret=None, queue_size=1000,
+                 max_batch=100, max_body_size=1048576, certfile=None, keyfile=None):
+        """
+        :param function on_updates: callable receiving a list of raw update bodies (bytes)
+        :param str host: Interface to listen on
+        :param int port: Port to listen on, 0 picks a free port
+        :param str path: Url path of the webhook
+        :param str or None secret: Secret path segment appended to path, Requests to any other path get 404
+        :param int queue_size: Maximum number of received updates waiting to be dispatched
+        :param int max_batch: Maximum number of updates handed to on_updates at once
+        :param int max_body_size: Maximum accepted body size in bytes
+        :param str or None certfile: TLS certificate file, Serve https when set
+        :param str or None keyfile: TLS private key file
+        """
+        self.on_updates = on_updates
+        self.url_path = path.rstrip('/') + (f'/{secret}' if secret else '') or '/'
+        self.max_batch = max_batch
+        self.max_body_size = max_body_size
+        self.intake = queue.Queue(maxsize=queue_size)
+        self.received = 0
+        self.rejected = 0
+        self.__stop = threading.Event()
+        self.__consumer = None
+        self.__serving = False
+        self.__counter_lock = threading.Lock()
+        self.__state_lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), WebhookRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.webhook = self
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True,
+                                                    do_handshake_on_connect=False)
+
+    @property
+    def server_port(self):
+        return self.httpd.server_port
+
+    def count(self, received=0, rejected=0):
+        """
+        Adds to the received and rejected counters, Request threads call it concurrently
+        """
+        with self.__counter_lock:
+            self.received += received
+            self.rejected += rejected
+
+    def __consume(self):
+        while not self.__stop.is_set() or not self.intake.empty():
+            try:
+                bodies = [self.intake.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(bodies) < self.max_batch:
+                try:
+                    bodies.append(self.intake.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.on_updates(bodies)
+            except Exception as e:
+                logger.error(f"Webhook dispatch raised {e!r}")
+
+    def __begin(self):
+        """
+        Marks the server as serving and starts the consumer thread
+        :return: False when stop was already called
+        :rtype: bool
+        """
+        # stop checks __serving under the same lock, So it either sees the server serving and shuts it down,
+        # Or it runs first and the server never starts
+        with self.__state_lock:
+            if self.__stop.is_set():
+                return False
+            self.__serving = True
+            self.__consumer = threading.Thread(target=self.__consume, name='WebhookConsumer', daemon=True)
+            self.__consumer.start()
+        logger.info(f'WEBHOOK STARTED on port {self.server_port} path {self.url_path}')
+        return True
+
+    def start(self):
+        """
+        Starts the consumer thread and serves requests on a background thread
+        """
+        if self.__begin():
+            threading.Thread(target=self.httpd.serve_forever, name='WebhookServer', daemon=True).start()
+
+    def serve_forever(self):
+        """
+        Starts the consumer thread and serves requests until stop is called
+        """
+        if not self.__begin():
+            return
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.__stop.set()
+            self.__consumer.join()
+            self.httpd.server_close()
+            logger.info('WEBHOOK STOPPED')
+
+    def stop(self):
+        """
+        Stops serving, The updates already received are dispatched before the consumer exits
+        """
+        with self.__state_lock:
+            self.__stop.set()
+            serving, self.__serving = self.__serving, False
+        # shutdown waits for serve_forever to return, So it would block forever if it never ran
+        if serving:
+            self.httpd.shutdown()
+        if self.__consumer is not None and self.__consumer is not threading.current_thread():
+            self.__consumer.join()
+        self.httpd.server_close()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+"""
+ttbotapi.utils.worker_pool
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+This submodule provides a keyed worker pool that is consumed internally by the dispatcher
+:copyright: (c) 2022 by Mustafa Asaad.
+:license: GPLv2, see LICENSE for more details.
+"""
+
+import queue
+import threading
+from .logger import logger
+
+
+class WorkerPool(object):
+    """
+    This class represents a pool of worker threads with one bounded queue per worker,
+    Tasks are sharded by key, So tasks submitted with the same key (E.g. a chat_id) always run on the same worker
+    in submission order, While tasks with different keys run concurrently.
+    submit blocks when the target queue is full, which gives back pressure to the poller.
+    """
+
+    def __init__(self, workers=4, queue_size=100, name='WorkerThread'):
+        """
+        :param int workers: Number of worker threads
+        :param int queue_size: Maximum number of pending tasks per worker, 0 for no limit
+        :param str name: Worker threads name prefix
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.name = name
+        self.__queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.__submitted = [0] * workers
+        self.__handled = [0] * workers
+        self.__threads = []
+        self.__lock = threading.Lock()
+        self.__submit_lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts the worker threads, It is called on first submit
+        """
+        with self.__lock:
+            if self.__threads:
+                return
+            for i, q in enumerate(self.__queues):
+                thread = threading.Thread(target=self.__run, args=(i, q), name=f'{self.name}-{i}', daemon=True)
+                thread.start()
+                self.__threads.append(thread)
+
+    @property
+    def is_running(self):
+        return bool(self.__threads)
+
+    def pending(self):
+        """
+        Returns the number of queued tasks per worker
+        :return: list[int]
+        """
+        return [q.qsize() for q in self.__queues]
+
+    def submit(self, key, task, *args, **kwargs):
+        """
+        Queues a task on the worker that owns key
+        :param any key: hashable ordering key, tasks with an equal key never run concurrently
+        :param function task: callable to be executed
+        """
+        if not self.__threads:
+            self.start()
+        i = hash(key) % self.workers
+        with self.__submit_lock:
+            self.__submitted[i] += 1
+        self.__queues[i].put((task, args, kwargs))
+
+    def mark(self):
+        """
+        Returns a mark of the tasks submitted so far, Pass it to done to know when they have all been executed
+        :rtype: tuple
+        """
+        with self.__submit_lock:
+            return tuple(self.__submitted)
+
+    def done(self, mark):
+        """
+        Returns whether every task submitted before mark was taken has been executed
+        :param tuple mark: value returned by mark
+        :rtype: bool
+        """
+        return all(handled >= submitted for handled, submitted in zip(self.__handled, mark))
+
+    def join(self):
+        """
+        Blocks until every queued task has been executed
+        """
+        for q in self.__queues:
+            q.join()
+
+    def stop(self, wait=True):
+        """
+        Stops the worker threads after they finish their queued tasks
+        :param bool wait: Block until the worker threads exit
+        """
+        with self.__lock:
+            threads = self.__threads
+            self.__threads = []
+        for q in self.__queues:
+            if threads:
+                q.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def __run(self, i, q):
+        while True:
+            item = q.get()
+            try:
+                if item is None:
+                    break
+                task, args, kwargs = item
+                task(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Worker task raised {e!r}")
+            finally:
+                if item is not None:
+                    self.__handled[i] += 1
+                q.task_done()